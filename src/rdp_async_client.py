@@ -0,0 +1,141 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+asyncio interface to the RDP APIs direct calls for many universes.
+
+The RDPAsyncClient class sends the Historical Pricing, ESG, Business summary and IPA requests for a list of universes
+with at most `concurrency` requests in flight, and yields each result as soon as it finishes. It is not an asyncio HTTP
+client: the blocking requests calls run in a concurrent.futures.ThreadPoolExecutor of `concurrency` threads on top of the
+pooled rdp_http_client.RDPHttpClient object, and the coroutines only wait for the thread pool. The application keeps
+the same requests connection pool, token manager and error handling as the synchronous code.
+
+Example:
+
+    async for result in async_client.fetch_many('esg', ['IBM.N', 'MSFT.O', 'AAPL.O']):
+        print(result.universe, result.status_code)
+'''
+
+import asyncio
+import collections
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import rdp_metrics
+from rdp_http_client import RDPHttpClient
+
+
+# universe is a RIC for the data services, and an IPA request message for 'ipa'
+FetchResult = collections.namedtuple('FetchResult', ['universe', 'status_code', 'data', 'error'])
+
+ENDPOINTS = {
+    'historical-pricing': lambda client, universe, **kwargs: client.get_historical_pricing_events(universe, **kwargs),
+    'historical-pricing-universes': lambda client, universes, **kwargs: client.get_historical_pricing_events_universes(universes, **kwargs),
+    'esg': lambda client, universe, **kwargs: client.get_esg_scores_full(universe, **kwargs),
+    'business-summary': lambda client, universe, **kwargs: client.get_business_summary(universe, **kwargs),
+    'ipa': lambda client, ipa_request_message, **kwargs: client.post_financial_contracts(ipa_request_message, **kwargs),
+}
+
+
+class RDPAsyncClient(object):
+    '''
+    Fan out RDP APIs requests for many universes with a bounded number of concurrent requests.
+
+    If client is not given, a new RDPHttpClient object is created with token_manager and a pool of `concurrency`
+    keep-alive connections. close() closes this client only, a client of the caller (i.e. get_shared_client()) stays
+    open.
+    '''
+
+    def __init__(self, client = None, token_manager = None, concurrency = 16):
+        self._owns_client = client is None
+        if client is None:
+            client = RDPHttpClient(token_manager, pool_maxsize = concurrency)
+        self.client = client
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers = concurrency)
+
+    async def fetch(self, endpoint, universe, **kwargs):
+        '''
+        Send one request to endpoint ('historical-pricing', 'historical-pricing-universes', 'esg',
+        'business-summary' or 'ipa') and return a FetchResult.
+        '''
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._fetch_sync, ENDPOINTS[endpoint], universe, kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    async def fetch_many(self, endpoint, universes, **kwargs):
+        '''
+        Async generator, yield a FetchResult for every universe in the completion order. If the caller stops the
+        iteration early, the requests that are not started yet are cancelled.
+        '''
+        universes = iter(universes)
+        pending = set()
+
+        def fill():
+            for universe in universes:
+                pending.add(asyncio.ensure_future(self.fetch(endpoint, universe, **kwargs)))
+                if len(pending) >= self.concurrency:
+                    break
+
+        try:
+            fill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+                fill()
+        finally:
+            # a request running in a thread finishes, the queued requests are not sent
+            for task in pending:
+                task.cancel()
+
+    async def fetch_all(self, endpoint, universes, **kwargs):
+        '''
+        Return a list of FetchResult for all universes in the completion order.
+        '''
+        return [result async for result in self.fetch_many(endpoint, universes, **kwargs)]
+
+    def close(self):
+        self._executor.shutdown(wait = True)
+        if self._owns_client:
+            self.client.close()
+
+    # -- Internal functions
+
+    def _fetch_sync(self, send, universe, kwargs):
+        # runs in the thread pool, the JSON message is decoded here to keep the event loop free
+        try:
+            response = send(self.client, universe, **kwargs)
+        except Exception as exp:
+            return FetchResult(universe, None, None, exp)
+
+        if response.status_code == 200:  # HTTP Status 'OK'
+            try:
+                return FetchResult(universe, response.status_code, rdp_metrics.decode_json(response), None)
+            except ValueError as exp:
+                # a truncated or non JSON body is the result of this universe only
+                return FetchResult(universe, response.status_code, None, exp)
+        return FetchResult(universe, response.status_code, None, '%s %s' % (response.reason, response.text))
+
+
+def fetch_all(endpoint, universes, client = None, token_manager = None, concurrency = 16, **kwargs):
+    '''
+    Synchronous helper for scripts, run RDPAsyncClient.fetch_all() in a new event loop.
+    '''
+    async_client = RDPAsyncClient(client, token_manager, concurrency)
+    try:
+        return asyncio.run(async_client.fetch_all(endpoint, universes, **kwargs))
+    finally:
+        # keep a caller supplied client open
+        async_client._executor.shutdown(wait = True)
+        if client is None:
+            async_client.client.close()
@@ -0,0 +1,418 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Benchmark of the RDP Libraries layers versus the RDP APIs direct calls.
+
+The benchmark starts the local rdp_mock_server, then runs the same workloads (historical pricing, ESG, business summary
+and IPA requests) through every request path, each path in its own Python process. It reports the per-request latency
+percentiles, the throughput, the peak RSS memory and the import time of each path.
+
+Request paths:
+- direct: module level requests.get()/requests.post() as in the demo applications
+- pooled: rdp_http_client.RDPHttpClient with rdp_token_manager.RDPTokenManager
+- async: rdp_async_client.RDPAsyncClient with `concurrency` requests in flight
+- function, content, delivery: the RDP Libraries layers, they need the refinitiv-dataplatform package. The Function
+  and Content Layers provide the historical pricing and ESG content only, the other workloads are reported as skipped.
+
+The library workers get an rdplibconfig.benchmark.json configuration file (RDPLIB_ENV and RDPLIB_ENV_DIR) with the
+server URL as the platform session base-url, so the library authenticates with the mock server Auth Service and sends
+all its requests to the mock server like the other paths. The RDP_APP_KEY, RDP_LOGIN and RDP_PASSWORD environment
+variables are used if they are set (i.e. with --base-url https://api.refinitiv.com), the mock server accepts any
+credentials. A path that cannot run is reported as skipped.
+
+Run it in a console with:
+
+    $>python rdp_benchmark.py --requests 200 --latency 0.02 --paths direct pooled async
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+workloads = ['pricing', 'esg', 'summary', 'ipa']
+paths = ['direct', 'pooled', 'async', 'function', 'content', 'delivery']
+
+# the paths that run the RDP Libraries
+library_paths = ['function', 'content', 'delivery']
+
+universes = ['IBM.N', 'MSFT.O', 'AAPL.O', 'GOOGL.O', 'AMZN.O', 'JPM.N', 'VOD.L', 'BARC.L', 'BP.L', 'HSBA.L']
+
+events_count = 500
+
+ipa_request_message = {
+    'fields': ['InstrumentTag', 'StartDate', 'EndDate', 'FxSpot', 'FxSwapsCcy1Ccy2', 'FxOutrightCcy1Ccy2'],
+    'outputs': ['Data', 'Headers'],
+    'universe': [{
+        'instrumentType': 'FxCross',
+        'instrumentDefinition': {
+            'instrumentTag': 'FX_deal_%03d' % index,
+            'fxCrossType': 'FxForward',
+            'fxCrossCode': 'EURGBP',
+            'legs': [{'tenor': '3M10D'}]
+        },
+        'pricingParameters': {'valuationDate': '2019-02-02T00:00:00Z', 'priceSide': 'Mid'}
+    } for index in range(20)]
+}
+
+
+# -- Results
+
+def percentile(values, ratio):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(ratio * (len(values) - 1))))]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': _ms(percentile(latencies, 0.5)),
+        'p90_ms': _ms(percentile(latencies, 0.9)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'throughput': round(len(latencies) / elapsed, 1) if elapsed > 0 else None
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 2) if seconds is not None else None
+
+
+# -- Request paths, every function returns (list of latencies in seconds, number of errors)
+
+def run_sequential(send, request_count):
+    latencies = []
+    errors = 0
+    for index in range(request_count):
+        started = time.perf_counter()
+        try:
+            ok = send(universes[index % len(universes)])
+        except Exception:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def direct_path(base_url, workload, request_count, concurrency):
+    import requests
+    import rdp_endpoints
+
+    response = requests.post(rdp_endpoints.auth_token_url(base_url), headers = {'Accept':'application/json'},
+                             data = {'username': '', 'password': '', 'grant_type': 'password', 'scope': rdp_endpoints.scope,
+                                     'takeExclusiveSignOnControl': 'true'}, auth = ('', ''))
+    headers = {'Authorization': 'Bearer {}'.format(response.json()['access_token'])}
+
+    def send(universe):
+        if workload == 'pricing':
+            response = requests.get(rdp_endpoints.historical_pricing_events_url(universe, base_url), headers = headers,
+                                    params = {'eventTypes': 'trade', 'count': events_count})
+        elif workload == 'esg':
+            response = requests.get(rdp_endpoints.esg_scores_full_url(base_url), headers = headers, params = {'universe': universe})
+        elif workload == 'summary':
+            response = requests.get(rdp_endpoints.business_summary_url(universe, base_url), headers = headers)
+        else:
+            response = requests.post(rdp_endpoints.financial_contracts_url(base_url), data = json.dumps(ipa_request_message),
+                                     headers = dict(headers, **{'Content-Type': 'application/json'}))
+        response.json()
+        return response.status_code == 200
+
+    return run_sequential(send, request_count)
+
+
+def _pooled_client(base_url, concurrency):
+    from rdp_http_client import RDPHttpClient
+    from rdp_token_manager import RDPTokenManager
+
+    client = RDPHttpClient(base_url = base_url, pool_maxsize = concurrency)
+    client.token_manager = RDPTokenManager('', '', '', base_url = base_url, http = client.session)
+    client.token_manager.open()
+    return client
+
+
+def _pooled_send(client, workload, universe):
+    if workload == 'pricing':
+        return client.get_historical_pricing_events(universe, params = {'eventTypes': 'trade', 'count': events_count})
+    if workload == 'esg':
+        return client.get_esg_scores_full(universe)
+    if workload == 'summary':
+        return client.get_business_summary(universe)
+    return client.post_financial_contracts(ipa_request_message)
+
+
+def pooled_path(base_url, workload, request_count, concurrency):
+    import rdp_json_codec
+
+    client = _pooled_client(base_url, concurrency)
+
+    def send(universe):
+        response = _pooled_send(client, workload, universe)
+        rdp_json_codec.decode_response(response)
+        return response.status_code == 200
+
+    try:
+        return run_sequential(send, request_count)
+    finally:
+        client.token_manager.close()
+        client.close()
+
+
+def async_path(base_url, workload, request_count, concurrency):
+    import asyncio
+    from rdp_async_client import RDPAsyncClient
+
+    client = _pooled_client(base_url, concurrency)
+    async_client = RDPAsyncClient(client, concurrency = concurrency)
+    endpoint = {'pricing': 'historical-pricing', 'esg': 'esg', 'summary': 'business-summary', 'ipa': 'ipa'}[workload]
+    kwargs = {'params': {'eventTypes': 'trade', 'count': events_count}} if workload == 'pricing' else {}
+    latencies = []
+    errors = []
+
+    async def timed(index):
+        universe = ipa_request_message if workload == 'ipa' else universes[index % len(universes)]
+        started = time.perf_counter()
+        result = await async_client.fetch(endpoint, universe, **kwargs)
+        if result.error is None:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(result.error)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(index):
+            async with semaphore:
+                await timed(index)
+
+        await asyncio.gather(*[bounded(index) for index in range(request_count)])
+
+    try:
+        asyncio.run(run())
+        return latencies, len(errors)
+    finally:
+        client.token_manager.close()
+        async_client.close()
+
+
+def _library_session():
+    import refinitiv.dataplatform as rdp
+
+    # the platform session URL is the benchmark server (library_config()), it accepts any credentials
+    session = rdp.open_platform_session(
+        os.environ.get('RDP_APP_KEY') or 'benchmark',
+        rdp.GrantPassword(
+            username = os.environ.get('RDP_LOGIN') or 'benchmark',
+            password = os.environ.get('RDP_PASSWORD') or 'benchmark'
+        )
+    )
+    if session.get_open_state() != rdp.Session.State.Open:
+        raise RuntimeError('The RDP Libraries platform session is not opened')
+    return rdp, session
+
+
+def library_config(config_dir, base_url):
+    '''
+    Write the RDP Libraries configuration file of base_url in config_dir, return the environment variables that select it.
+    '''
+    config = {'sessions': {'platform': {'default-session': {'base-url': base_url}}}}
+    with open(os.path.join(config_dir, 'rdplibconfig.benchmark.json'), 'w') as config_file:
+        json.dump(config, config_file)
+    return {'RDPLIB_ENV': 'benchmark', 'RDPLIB_ENV_DIR': config_dir}
+
+
+def function_path(base_url, workload, request_count, concurrency):
+    if workload not in ('pricing', 'esg'):
+        raise NotImplementedError('The Function Layer does not provide the %s content' % workload)
+    rdp, session = _library_session()
+
+    def send(universe):
+        if workload == 'pricing':
+            frame = rdp.get_historical_price_events(universe = universe, eventTypes = rdp.EventTypes.TRADE, count = events_count)
+        else:
+            frame = rdp.get_esg_full_scores(universe = universe)
+        return frame is not None
+
+    try:
+        return run_sequential(send, request_count)
+    finally:
+        rdp.close_session()
+
+
+def content_path(base_url, workload, request_count, concurrency):
+    if workload not in ('pricing', 'esg'):
+        raise NotImplementedError('The Content Layer does not provide the %s content' % workload)
+    rdp, session = _library_session()
+
+    def send(universe):
+        if workload == 'pricing':
+            response = rdp.HistoricalPricing.get_events(universe = universe, eventTypes = rdp.EventTypes.TRADE,
+                                                        count = events_count)
+        else:
+            response = rdp.ESG.get_full_scores(universe = universe)
+        return response.is_success and response.data.df is not None
+
+    try:
+        return run_sequential(send, request_count)
+    finally:
+        rdp.close_session()
+
+
+def delivery_path(base_url, workload, request_count, concurrency):
+    import rdp_endpoints
+    rdp, session = _library_session()
+
+    def send(universe):
+        if workload == 'pricing':
+            endpoint = rdp.Endpoint(session, rdp_endpoints.historical_pricing_events_url(universe, base_url))
+            response = endpoint.send_request(query_parameters = {'eventTypes': 'trade', 'count': events_count})
+        elif workload == 'esg':
+            endpoint = rdp.Endpoint(session, rdp_endpoints.esg_scores_full_url(base_url))
+            response = endpoint.send_request(query_parameters = {'universe': universe})
+        elif workload == 'summary':
+            endpoint = rdp.Endpoint(session, rdp_endpoints.business_summary_url(universe, base_url))
+            response = endpoint.send_request()
+        else:
+            endpoint = rdp.Endpoint(session, rdp_endpoints.financial_contracts_url(base_url))
+            response = endpoint.send_request(method = rdp.Endpoint.RequestMethod.POST, body_parameters = ipa_request_message)
+        return response.is_success
+
+    try:
+        return run_sequential(send, request_count)
+    finally:
+        rdp.close_session()
+
+
+path_functions = {
+    'direct': (direct_path, ['requests']),
+    'pooled': (pooled_path, ['requests', 'rdp_http_client', 'rdp_token_manager']),
+    'async': (async_path, ['requests', 'asyncio', 'rdp_async_client']),
+    'function': (function_path, ['refinitiv.dataplatform']),
+    'content': (content_path, ['refinitiv.dataplatform']),
+    'delivery': (delivery_path, ['refinitiv.dataplatform'])
+}
+
+
+def run_worker(path, base_url, workload, request_count, concurrency):
+    '''
+    Run one path and workload in this process and return the result dict.
+    '''
+    import importlib
+
+    function, modules = path_functions[path]
+    result = {'path': path, 'workload': workload}
+
+    started = time.perf_counter()
+    try:
+        for module in modules:
+            importlib.import_module(module)
+    except ImportError as exp:
+        result['skipped'] = str(exp)
+        return result
+    result['import_ms'] = _ms(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        latencies, errors = function(base_url, workload, request_count, concurrency)
+    except Exception as exp:
+        result['skipped'] = str(exp)
+        return result
+    result.update(summarize(latencies, errors, time.perf_counter() - started))
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+# -- Benchmark runner
+
+def run_benchmark(selected_paths, selected_workloads, request_count, concurrency, base_url):
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        library_env = dict(os.environ, **library_config(config_dir, base_url))
+        for path in selected_paths:
+            for workload in selected_workloads:
+                command = [sys.executable, os.path.abspath(__file__), '--worker', path, '--workload', workload,
+                           '--base-url', base_url, '--requests', str(request_count), '--concurrency', str(concurrency)]
+                output = subprocess.run(command, stdout = subprocess.PIPE, cwd = os.path.dirname(os.path.abspath(__file__)),
+                                        env = library_env if path in library_paths else None, universal_newlines = True)
+                lines = output.stdout.strip().splitlines()
+                try:
+                    results.append(json.loads(lines[-1]))
+                except (IndexError, ValueError):
+                    results.append({'path': path, 'workload': workload, 'skipped': 'worker exit code %d' % output.returncode})
+    return results
+
+
+def print_results(results):
+    columns = ['path', 'workload', 'requests', 'errors', 'p50_ms', 'p90_ms', 'p99_ms', 'throughput', 'peak_rss_mb', 'import_ms']
+    print(''.join('%-12s' % column for column in columns))
+    for result in results:
+        if 'skipped' in result:
+            print('%-12s%-12sskipped: %s' % (result['path'], result['workload'], result['skipped']))
+        else:
+            print(''.join('%-12s' % ('' if result.get(column) is None else result.get(column)) for column in columns))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'RDP Libraries layers versus RDP APIs direct calls benchmark')
+    parser.add_argument('--paths', nargs = '+', choices = paths, default = paths)
+    parser.add_argument('--workloads', nargs = '+', choices = workloads, default = workloads)
+    parser.add_argument('--requests', type = int, default = 100, help = 'number of requests for each path and workload')
+    parser.add_argument('--concurrency', type = int, default = 8, help = 'requests in flight for the async path')
+    parser.add_argument('--latency', type = float, default = 0.02, help = 'mock server response delay in seconds')
+    parser.add_argument('--jitter', type = float, default = 0.005, help = 'mock server random extra delay in seconds')
+    parser.add_argument('--base-url', help = 'use a running server instead of starting the mock server')
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    parser.add_argument('--worker', choices = paths, help = argparse.SUPPRESS)
+    parser.add_argument('--workload', choices = workloads, help = argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.base_url, args.workload, args.requests, args.concurrency)))
+        return
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from rdp_mock_server import start_mock_server
+        server = start_mock_server(latency = args.latency, jitter = args.jitter)
+        base_url = server.base_url
+
+    try:
+        results = run_benchmark(args.paths, args.workloads, args.requests, args.concurrency, base_url)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent = 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Command line interface of the RDP APIs direct calls and the RDP Libraries calls.
+
+The demo applications import refinitiv.dataplatform, pandas and dateutil at start up and always run both paths. This
+command runs one request on one path and imports only the modules that the path needs:
+- direct (default): requests and the rdp_* modules of this project, pandas only for the table output of pricing,
+- library: refinitiv.dataplatform.
+
+The credentials are the --app-key, --login and --password options, or the RDP_APP_KEY, RDP_LOGIN and RDP_PASSWORD
+environment variables.
+
+Run it in a console with:
+
+    $>python rdp_cli.py auth
+    $>python rdp_cli.py pricing IBM.N --count 15 --output json
+    $>python rdp_cli.py esg IBM.N --path library
+    $>python rdp_cli.py summary IBM.N
+    $>python rdp_cli.py ipa --file ipa_request_message.json
+    $>python rdp_cli.py pricing IBM.N --count 100000 --sink ibm_trades.parquet
+
+The startup-check command measures the start up time of every command with --dry-run (parse the options and import the
+modules, no request), compares it with the baseline file and exits with status 1 if a command is slower than the
+baseline by more than the tolerance, or if a direct command that does not need them imports pandas, numpy or
+refinitiv.dataplatform. The baseline of the direct commands is rdp_startup_baseline.json next to this file, a missing
+baseline is a failure. It keeps the start up time of every command divided by the `python -c pass` time, and the check
+compares it with the `python -c pass` time measured next to every command, so the committed baseline holds on a slower or
+faster machine. Run it in a CI job or before the cron jobs are deployed:
+
+    $>python rdp_cli.py startup-check --repeat 5
+    $>python rdp_cli.py startup-check --update-baseline
+'''
+
+import argparse
+import os
+import sys
+
+commands = ['auth', 'pricing', 'esg', 'summary', 'ipa']
+default_universe = 'IBM.N'
+
+# the modules a direct command must not import (pricing --output table needs pandas)
+heavy_modules = ['pandas', 'numpy', 'refinitiv', 'dateutil']
+
+# committed next to this file, the start up times of the direct commands divided by the `python -c pass` start up time
+default_baseline_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rdp_startup_baseline.json')
+
+default_ipa_request_message = {
+    'fields': ['InstrumentTag', 'StartDate', 'EndDate', 'FxSpot', 'FxSwapsCcy1Ccy2', 'FxOutrightCcy1Ccy2'],
+    'outputs': ['Data', 'Headers'],
+    'universe': [{
+        'instrumentType': 'FxCross',
+        'instrumentDefinition': {
+            'instrumentTag': 'FX_deal_001',
+            'fxCrossType': 'FxForward',
+            'fxCrossCode': 'EURGBP',
+            'legs': [{'tenor': '3M10D'}]
+        },
+        'pricingParameters': {'valuationDate': '2019-02-02T00:00:00Z', 'priceSide': 'Mid'}
+    }]
+}
+
+
+# -- RDP APIs direct calls
+
+def run_direct(args):
+    from rdp_http_client import RDPHttpClient
+    from rdp_token_manager import RDPTokenManager
+    import rdp_metrics
+
+    if args.command == 'pricing':
+        import rdp_historical_pricing
+        if args.output == 'table' and not args.sink:
+            import pandas
+    if args.sink:
+        import rdp_columnar_sink
+    if args.dry_run:
+        return 0
+
+    client = RDPHttpClient(base_url = args.base_url)
+    token_manager = RDPTokenManager(args.app_key, args.login, args.password, base_url = args.base_url, http = client.session)
+    client.token_manager = token_manager
+    try:
+        token_manager.open()
+        if args.command == 'auth':
+            print('RDP APIs: Authentication success, the Access Token expires in %s seconds' % token_manager.auth_obj['expires_in'])
+            return 0
+
+        if args.sink:
+            return _write_sink(args, client)
+
+        if args.command == 'pricing' and args.output == 'table':
+            print(rdp_historical_pricing.get_historical_price_events(args.universe, eventTypes = args.event_types,
+                                                                     start = _start(args), end = args.end,
+                                                                     adjustments = args.adjustments, count = args.count,
+                                                                     client = client))
+            return 0
+
+        if args.command == 'pricing':
+            payload = rdp_historical_pricing.events_payload(args.event_types, _start(args), args.end, args.count, args.adjustments)
+            response = client.get_historical_pricing_events(args.universe, params = payload)
+        elif args.command == 'esg':
+            response = client.get_esg_scores_full(args.universe)
+        elif args.command == 'summary':
+            response = client.get_business_summary(args.universe)
+        else:
+            response = client.post_financial_contracts(_ipa_request_message(args))
+        response.raise_for_status()
+        _print_json(rdp_metrics.decode_json(response), args.indent)
+        return 0
+    finally:
+        if token_manager.auth_obj is not None:
+            token_manager.close()
+        client.close()
+
+
+# -- RDP Libraries
+
+def run_library(args):
+    import refinitiv.dataplatform as rdp
+    import rdp_endpoints
+
+    if args.dry_run:
+        return 0
+
+    session = rdp.open_platform_session(
+        args.app_key,
+        rdp.GrantPassword(
+            username = args.login,
+            password = args.password
+        )
+    )
+    try:
+        if args.command == 'auth':
+            print('RDP Library Platform Session Status = %s' % session.get_open_state())
+            return 0
+
+        if args.command == 'pricing':
+            print(rdp.get_historical_price_events(
+                universe = args.universe,
+                eventTypes = [getattr(rdp.EventTypes, _enum_name(name)) for name in args.event_types.split(',')],
+                start = _start(args),
+                end = args.end,
+                count = args.count,
+                adjustments = [getattr(rdp.Adjustments, _enum_name(name)) for name in args.adjustments.split(',')]
+            ))
+            return 0
+
+        if args.command == 'esg':
+            endpoint = rdp.Endpoint(session, rdp_endpoints.esg_scores_full_url(args.base_url))
+            response = endpoint.send_request(query_parameters = {'universe': args.universe})
+        elif args.command == 'summary':
+            endpoint = rdp.Endpoint(session, rdp_endpoints.business_summary_url(args.universe, args.base_url))
+            response = endpoint.send_request()
+        else:
+            endpoint = rdp.Endpoint(session, rdp_endpoints.financial_contracts_url(args.base_url))
+            response = endpoint.send_request(method = rdp.Endpoint.RequestMethod.POST,
+                                             body_parameters = _ipa_request_message(args))
+        if not response.is_success:
+            print('RDP Libraries: %s request failure: %s' % (args.command, response.status))
+            return 1
+        _print_json(response.data.raw, args.indent)
+        return 0
+    finally:
+        rdp.close_session()
+
+
+def _write_sink(args, client):
+    import rdp_columnar_sink
+    import rdp_historical_pricing
+    import rdp_metrics
+
+    with rdp_columnar_sink.ColumnarSink(args.sink) as sink:
+        if args.command == 'ipa':
+            response = client.post_financial_contracts(_ipa_request_message(args))
+            response.raise_for_status()
+            sink.write_message(rdp_metrics.decode_json(response))
+        else:
+            # the rows are decoded and written while the response is downloaded
+            if args.command == 'pricing':
+                payload = rdp_historical_pricing.events_payload(args.event_types, _start(args), args.end, args.count,
+                                                                args.adjustments)
+                response = client.get_historical_pricing_events(args.universe, params = payload, stream = True)
+            else:
+                response = client.get_esg_scores_full(args.universe, stream = True)
+            sink.write_stream(response)
+    print('RDP APIs: %d rows written to %s' % (sink.rows_written, args.sink))
+    return 0
+
+
+def _start(args):
+    if args.start is not None:
+        return args.start
+    from datetime import timedelta
+    return timedelta(days = -args.days)
+
+
+def _enum_name(name):
+    # exchangeCorrection -> EXCHANGE_CORRECTION
+    return ''.join('_' + char if char.isupper() else char.upper() for char in name.strip())
+
+
+def _ipa_request_message(args):
+    if not args.file:
+        return default_ipa_request_message
+    import json
+    with open(args.file) as message_file:
+        return json.load(message_file)
+
+
+def _print_json(message, indent):
+    import json
+    print(json.dumps(message, indent = indent) if indent else json.dumps(message))
+
+
+# -- Start up time check
+
+def measure_startup(argv, repeat):
+    '''
+    Return (best wall time in ms of `python rdp_cli.py argv` over repeat runs, set of the imported top level modules).
+    '''
+    import subprocess
+    import time
+
+    command = [sys.executable, os.path.abspath(__file__)] + argv
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, check = True, stdout = subprocess.DEVNULL)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+
+    # -X importtime writes 'import time: self | cumulative | module' lines to stderr
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], check = True, stdout = subprocess.DEVNULL,
+                            stderr = subprocess.PIPE, universal_newlines = True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return best, modules
+
+
+def startup_check(args):
+    import json
+    import subprocess
+
+    interpreter_ms = _measure_interpreter(args.repeat)
+    scenarios = [['--help']]
+    for path in args.paths:
+        for command in commands:
+            scenarios.append([command, '--path', path, '--dry-run'])
+            if command == 'pricing' and path == 'direct':
+                scenarios[-1] += ['--output', 'json']
+                scenarios.append([command, '--path', path, '--dry-run', '--output', 'table'])
+
+    baseline = {}
+    failures = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    elif not args.update_baseline:
+        failures.append('no baseline file %s, create it with --update-baseline' % args.baseline)
+
+    results = {}
+    print('python start up: %.1f ms' % interpreter_ms)
+    print('%-48s %9s %11s  %s' % ('command', 'ms', 'baseline ms', 'heavy imports'))
+    for argv in scenarios:
+        name = ' '.join(argv)
+        try:
+            # the interpreter start up is measured next to every command, the machine load changes during the check
+            interpreter_ms = _measure_interpreter(args.repeat)
+            elapsed, modules = measure_startup(argv, args.repeat)
+        except subprocess.CalledProcessError:
+            # i.e. refinitiv.dataplatform is not installed for the library path
+            print('%-48s %9s %11s  %s' % (name, '-', '-', 'skipped, the command failed'))
+            continue
+        # the baseline is relative to the interpreter start up of the same run, it does not depend on the machine speed
+        results[name] = round(elapsed / interpreter_ms, 3)
+        heavy = sorted(module for module in heavy_modules if module in modules)
+        expected = set(['pandas', 'numpy', 'dateutil']) if '--output table' in name else set()
+        if '--path library' in name:
+            expected.update(heavy_modules)
+
+        previous = baseline.get(name) * interpreter_ms if baseline.get(name) else None
+        print('%-48s %9.1f %11s  %s' % (name, elapsed, '%.1f' % previous if previous else '-', ', '.join(heavy) or '-'))
+        if previous and elapsed > previous * (1 + args.tolerance) + args.slack_ms:
+            failures.append('%s: %.1f ms, baseline %.1f ms' % (name, elapsed, previous))
+        if set(heavy) - expected:
+            failures.append('%s imports %s' % (name, ', '.join(sorted(set(heavy) - expected))))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent = 2, sort_keys = True)
+        print('The baseline is saved to %s' % args.baseline)
+        return 0
+
+    for failure in failures:
+        print('Start up regression: %s' % failure)
+    return 1 if failures else 0
+
+
+def _measure_interpreter(repeat):
+    import subprocess
+    import time
+
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check = True)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# -- Command line
+
+def build_parser():
+    parser = argparse.ArgumentParser(description = 'RDP APIs direct call and RDP Libraries command line')
+    subparsers = parser.add_subparsers(dest = 'command')
+
+    common = argparse.ArgumentParser(add_help = False)
+    common.add_argument('--path', choices = ['direct', 'library'], default = 'direct',
+                        help = 'RDP APIs direct call or RDP Libraries (default: direct)')
+    common.add_argument('--app-key', default = os.environ.get('RDP_APP_KEY', ''))
+    common.add_argument('--login', default = os.environ.get('RDP_LOGIN', ''))
+    common.add_argument('--password', default = os.environ.get('RDP_PASSWORD', ''))
+    common.add_argument('--base-url', default = 'https://api.refinitiv.com', help = 'i.e. the rdp_mock_server URL')
+    common.add_argument('--indent', type = int, default = None, help = 'indent of the JSON output')
+    common.add_argument('--sink', help = 'pricing, esg and ipa on the direct path: write the data rows to this .parquet or .arrow file')
+    common.add_argument('--dry-run', action = 'store_true', help = 'import the modules of the path, send no request')
+
+    subparsers.add_parser('auth', parents = [common], help = 'authenticate and revoke the Access Token')
+
+    pricing = subparsers.add_parser('pricing', parents = [common], help = 'Historical Pricing events')
+    pricing.add_argument('universe', nargs = '?', default = default_universe)
+    pricing.add_argument('--event-types', default = 'trade')
+    pricing.add_argument('--adjustments', default = 'exchangeCorrection,manualCorrection')
+    pricing.add_argument('--start', help = 'RDP timestamp, i.e. 2020-07-13T08:54:53.619177000Z')
+    pricing.add_argument('--end', help = 'RDP timestamp')
+    pricing.add_argument('--days', type = float, default = 1, help = 'start this many days ago if --start is not set')
+    pricing.add_argument('--count', type = int, default = 15)
+    pricing.add_argument('--output', choices = ['table', 'json'], default = 'table',
+                         help = 'pandas DataFrame table or JSON message (no pandas import)')
+
+    for command, help_text in (('esg', 'ESG scores-full'), ('summary', 'Business summary')):
+        subparser = subparsers.add_parser(command, parents = [common], help = help_text)
+        subparser.add_argument('universe', nargs = '?', default = default_universe)
+
+    ipa = subparsers.add_parser('ipa', parents = [common], help = 'IPA financial-contracts')
+    ipa.add_argument('--file', help = 'JSON file of the ipa_request_message, an FX Forward EURGBP contract if not set')
+
+    check = subparsers.add_parser('startup-check', help = 'measure the start up time of the commands')
+    check.add_argument('--repeat', type = int, default = 5)
+    check.add_argument('--paths', nargs = '+', choices = ['direct', 'library'], default = ['direct', 'library'])
+    check.add_argument('--baseline', default = default_baseline_file)
+    check.add_argument('--tolerance', type = float, default = 0.2, help = 'allowed slow down ratio (default: 0.2)')
+    check.add_argument('--slack-ms', type = float, default = 10.0, help = 'allowed slow down in ms on top of the ratio')
+    check.add_argument('--update-baseline', action = 'store_true')
+    return parser
+
+
+def main(argv = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    if args.command == 'startup-check':
+        return startup_check(args)
+    if getattr(args, 'sink', None) and (args.path == 'library' or args.command not in ('pricing', 'esg', 'ipa')):
+        parser.error('--sink is available for the pricing, esg and ipa commands on the direct path')
+
+    try:
+        return run_library(args) if args.path == 'library' else run_direct(args)
+    except Exception as exp:
+        print('%s %s failure: %s' % ('RDP Libraries:' if args.path == 'library' else 'RDP APIs:', args.command, exp))
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
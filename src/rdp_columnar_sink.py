@@ -0,0 +1,293 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Columnar Parquet and Arrow IPC file sinks of the RDP APIs responses.
+
+The demo applications print the payloads. A ColumnarSink writes the headers/data rows of the Historical Pricing, ESG
+and IPA responses to one file instead, typed by the RDP headers: 'number' columns as float64, DATE_TIME and
+SOURCE_DATETIME as timestamp[ns, UTC] with the full nanoseconds precision, the other columns as strings. The rows are
+converted to Arrow columns when they are written and buffered until batch_rows rows, then appended as one Parquet row
+group or Arrow IPC record batch, so the analytics read typed columns and never parse JSON again.
+
+The sink takes the output of every fetcher of this project:
+- write_page(): rdp_historical_pricing.iter_events() pages and the rdp_event_tailer EventTailer callback
+- write_stream(): a streamed direct call response (stream = True), decoded row by row with rdp_json_stream
+- write_message(): a decoded response message, i.e. response.json() or the RDP Libraries response.data.raw
+- write_results(): the {RIC: FetchResult} of rdp_request_planner.RequestPlanner and rdp_async_client.fetch_all()
+- write_pricing_result(): the PricingResult of rdp_ipa.FinancialContractsPricer
+
+The format comes from the file extension: .parquet, or .arrow/.feather/.ipc for the Arrow IPC file format. Arrow IPC
+files are not compressed, read_table() memory maps them and returns a Table over the mapped pages without a copy.
+Parquet files are smaller (zstd compression) and are decoded when they are read.
+
+The sinks require the pyarrow package:
+
+    $>pip install pyarrow
+
+Example:
+
+    with ColumnarSink('ibm_trades.arrow') as sink:
+        for page in iter_events(client, 'IBM.N', start = timedelta(-7)):
+            sink.write_page(page)
+    table = read_table('ibm_trades.arrow')
+'''
+
+import os
+import threading
+
+import rdp_json_stream
+
+# the Historical Pricing columns with RDP ISO8601 timestamps
+default_timestamp_columns = ('DATE_TIME', 'SOURCE_DATETIME')
+
+default_batch_rows = 64 * 1024
+
+_arrow_extensions = ('.arrow', '.feather', '.ipc')
+
+
+def file_format(path):
+    '''
+    Return 'parquet' or 'arrow' from the extension of path.
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in _arrow_extensions:
+        return 'arrow'
+    raise ValueError('Unknown columnar file extension %s, use .parquet or .arrow' % extension)
+
+
+class ColumnarSink(object):
+    '''
+    Append RDP headers/data rows to a Parquet or Arrow IPC file at path, output_format is 'parquet' or 'arrow' (from the
+    path extension if None).
+
+    The schema is the one of the first rows written, with the universe column first if universe_column is not None. A
+    column that later rows do not have is written as null, a column that is not in the schema raises ValueError. The
+    write functions are thread safe.
+    '''
+
+    def __init__(self, path, output_format = None, batch_rows = default_batch_rows, universe_column = 'universe',
+                 timestamp_columns = default_timestamp_columns, compression = 'zstd'):
+        import pyarrow
+
+        self.path = path
+        self.output_format = output_format or file_format(path)
+        self.batch_rows = batch_rows
+        self.universe_column = universe_column
+        self.timestamp_columns = set(timestamp_columns)
+        self.compression = compression
+        self.schema = None
+        self.rows_written = 0
+        self._pa = pyarrow
+        self._writer = None
+        self._batches = []
+        self._buffered_rows = 0
+        self._lock = threading.Lock()
+
+    # -- Write functions
+
+    def write_rows(self, headers, rows, universe = None):
+        '''
+        Append rows (lists of values in the headers order). headers is the list of RDP header dicts (name and type) or a
+        list of column names, the column types are then inferred from the values.
+        '''
+        if not rows:
+            return
+        batch = self._record_batch(headers, rows, universe)
+        with self._lock:
+            if self._writer is None and self.schema is None:
+                self.schema = batch.schema
+            batch = self._conform(batch)
+            self._batches.append(batch)
+            self._buffered_rows += batch.num_rows
+            if self._buffered_rows >= self.batch_rows:
+                self._flush()
+
+    def write_page(self, page):
+        '''
+        Append the rows of an rdp_historical_pricing.EventsPage.
+        '''
+        self.write_rows(page.headers, page.data, page.universe)
+
+    def write_message(self, message, universe = None):
+        '''
+        Append the rows of a decoded response message: a Historical Pricing list of universe elements, or a message with
+        headers and data (ESG, IPA Headers/Data outputs).
+        '''
+        if isinstance(message, list):
+            for element in message:
+                self.write_message(element, universe)
+            return
+        if not message:
+            return
+        if universe is None and isinstance(message.get('universe'), dict):
+            universe = message['universe'].get('ric')
+        headers = message.get('headers', message.get('Headers', []))
+        self.write_rows(headers, message.get('data', message.get('Data', [])), universe)
+
+    def write_stream(self, response, universe = None, data_key = 'data'):
+        '''
+        Decode a streamed response (sent with stream = True) row by row and append its rows. Return the number of rows.
+
+        The rows of a message with the headers before the data (Historical Pricing) are written every batch_rows rows.
+        ESG sends its headers after the data, these rows are kept until the headers arrive.
+        '''
+        elements = {}
+        count = 0
+        for event in rdp_json_stream.iter_response(response, data_key):
+            element = elements.setdefault(event.element, {'headers': None, 'universe': universe, 'rows': []})
+            if event.kind == 'row':
+                element['rows'].append(event.value)
+                count += 1
+                if element['headers'] is not None and len(element['rows']) >= self.batch_rows:
+                    self.write_rows(element['headers'], element['rows'], element['universe'])
+                    element['rows'] = []
+            elif event.name == 'headers':
+                element['headers'] = event.value
+            elif event.name == 'universe' and universe is None and isinstance(event.value, dict):
+                element['universe'] = event.value.get('ric')
+        for element in elements.values():
+            if element['rows']:
+                self.write_rows(element['headers'] or [], element['rows'], element['universe'])
+        return count
+
+    def write_results(self, results):
+        '''
+        Append the data of {RIC: rdp_async_client.FetchResult}, the failed results are skipped. Return the list of the
+        failed RICs.
+        '''
+        failed = []
+        for universe, result in results.items():
+            if result.error is not None or result.data is None:
+                failed.append(universe)
+                continue
+            self.write_message(result.data, universe)
+        return failed
+
+    def write_pricing_result(self, result):
+        '''
+        Append the contracts of an rdp_ipa.PricingResult, one row per instrumentTag.
+        '''
+        rows = [[values.get(name) for name in result.headers] for values in result.data.values()]
+        self.write_rows(result.headers, rows, None)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        '''
+        Write the buffered rows and the file footer. A sink without rows writes no file.
+        '''
+        with self._lock:
+            self._flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # -- Internal functions
+
+    def _record_batch(self, headers, rows, universe):
+        pa = self._pa
+        names = [header['name'] if isinstance(header, dict) else header for header in headers]
+        columns = list(zip(*rows))
+        if len(columns) != len(names):
+            raise ValueError('%d headers for rows of %d values' % (len(names), len(columns)))
+
+        arrays = []
+        fields = []
+        if self.universe_column is not None:
+            arrays.append(pa.array([universe] * len(rows), type = pa.string()))
+            fields.append(pa.field(self.universe_column, pa.string()))
+        for header, name, values in zip(headers, names, columns):
+            array = self._array(name, header.get('type') if isinstance(header, dict) else None, values)
+            arrays.append(array)
+            fields.append(pa.field(name, array.type))
+        return pa.RecordBatch.from_arrays(arrays, schema = pa.schema(fields))
+
+    def _array(self, name, header_type, values):
+        pa = self._pa
+        if name in self.timestamp_columns:
+            return pa.array(values, type = pa.string()).cast(pa.timestamp('ns', tz = 'UTC'))
+        header_type = (header_type or '').lower()
+        if header_type in ('number', 'float', 'double'):
+            return pa.array(values, type = pa.float64())
+        if header_type in ('integer', 'int', 'long'):
+            return pa.array(values, type = pa.int64())
+        if header_type in ('bool', 'boolean'):
+            return pa.array(values, type = pa.bool_())
+        if header_type:
+            return pa.array([None if value is None else str(value) for value in values], type = pa.string())
+        return pa.array(values)
+
+    def _conform(self, batch):
+        if batch.schema.equals(self.schema):
+            return batch
+        pa = self._pa
+        extra = [name for name in batch.schema.names if self.schema.get_field_index(name) < 0]
+        if extra:
+            raise ValueError('Columns %s are not in the sink schema of %s' % (', '.join(extra), self.path))
+        arrays = []
+        for field in self.schema:
+            if field.name in batch.schema.names:
+                arrays.append(batch.column(field.name).cast(field.type))
+            else:
+                arrays.append(pa.nulls(batch.num_rows, type = field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema = self.schema)
+
+    def _flush(self):
+        if not self._batches:
+            return
+        table = self._pa.Table.from_batches(self._batches, schema = self.schema).combine_chunks()
+        if self._writer is None:
+            self._writer = self._open_writer()
+        if self.output_format == 'parquet':
+            self._writer.write_table(table, row_group_size = max(self.batch_rows, table.num_rows))
+        else:
+            self._writer.write_table(table, max_chunksize = max(self.batch_rows, table.num_rows))
+        self.rows_written += table.num_rows
+        self._batches = []
+        self._buffered_rows = 0
+
+    def _open_writer(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if self.output_format == 'parquet':
+            import pyarrow.parquet
+            return pyarrow.parquet.ParquetWriter(self.path, self.schema, compression = self.compression)
+        import pyarrow.ipc
+        return pyarrow.ipc.new_file(self.path, self.schema)
+
+
+def read_table(path, columns = None, memory_map = True):
+    '''
+    Read a sink file to a pyarrow.Table. An Arrow IPC file is memory mapped, the Table columns use the mapped pages
+    without a copy and the file is paged in only for the columns that are used.
+    '''
+    import pyarrow
+
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(path, columns = columns, memory_map = memory_map)
+
+    import pyarrow.ipc
+    source = pyarrow.memory_map(path) if memory_map else pyarrow.OSFile(path)
+    table = pyarrow.ipc.open_file(source).read_all()
+    return table.select(columns) if columns is not None else table
@@ -85,41 +85,30 @@ if response is not None:
 
 # --------------------------- RDP APIs Direct Call -------------------------------------
 
-import requests
+from rdp_http_client import get_shared_client
+from rdp_json_codec import decode_response
+from rdp_scheduler import RequestScheduler
+from rdp_token_manager import RDPTokenManager
 
-scope = 'trapi'
-client_secret = ''
+RDP_version = '/v1'
+base_URL = 'https://api.refinitiv.com'
 
-RDP_version = "/v1"
-base_URL = "https://api.refinitiv.com"
-category_URL = "/auth/oauth2"
-service_endpoint_URL = "/token"
+# All RDP APIs requests share one pooled keep-alive HTTP client, the scheduler retries the throttled (HTTP 429) requests
+client = get_shared_client(scheduler = RequestScheduler())
 
-auth_endpoint = base_URL + category_URL + RDP_version + service_endpoint_URL 
+# The token manager sends the password grant once and refreshes the Access Token with the refresh_token grant in background
+token_manager = RDPTokenManager(APP_KEY, RDP_LOGIN, RDP_PASSWORD, http = client.session)
+client.token_manager = token_manager
 
-auth_obj = None
 response = None
 
 # -- Init and Authenticate Session
-auth_request_msg = {
-    'username': RDP_LOGIN,
-	'password': RDP_PASSWORD,
-	'grant_type': "password",
-	'scope': scope,
-	'takeExclusiveSignOnControl': "true"
-}
 
 try:
-    response = requests.post(auth_endpoint, headers = {'Accept':'application/json'}, data = auth_request_msg, auth = (APP_KEY,client_secret))
+    token_manager.open()
+    print('RDP APIs: Authentication success')
 except Exception as exp:
-	print('Caught exception: %s' % str(exp))
-
-if response.status_code == 200:  # HTTP Status 'OK'
-    print('Authentication success')
-    auth_obj = response.json()
-else:
-    print('RDP authentication result failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
+    print('RDP APIs: Authentication result failure: %s' % str(exp))
 
 
 # ------------ Historical Pricing
@@ -134,19 +123,29 @@ historical_pricing_url = base_URL + category_URL + RDP_version + service_endpoin
 payload = {'eventTypes':'trade','adjustments': 'exchangeCorrection,manualCorrection', 'start': start_iso , 'count':15}
 
 try:
-    response = requests.get(historical_pricing_url, headers={'Authorization': 'Bearer {}'.format(auth_obj['access_token'])}, params = payload)
+    response = client.get(historical_pricing_url, params = payload)
 except Exception as exp:
 	print('Caught exception: %s' % str(exp))
 
 if response.status_code == 200:  # HTTP Status 'OK'
     print('This is a Historical Pricing data result from RDP API Call')
-    print(response.json())
+    print(decode_response(response))
     #print(json.dumps(response.json(),sort_keys=True, indent=2, separators=(',', ':')))
 else:
     print('RDP APIs: Pricing data request failure: %s %s' % (response.status_code, response.reason))
     print('Text: %s' % (response.text))
 
 
+# -- Close Session, sending revoke access token request
+
+try:
+    token_manager.close()
+    print('RDP APIs: Revoke access token success')
+except Exception as exp:
+    print('RDP APIs: Revoke access token failure: %s' % str(exp))
+finally:
+    client.close()
+
 
 '''
 The RDP Libraries Content Layer gives a richer and fuller content (such as metadata, etc) than the Function Layer. The Content Layer also provides content in various data type such as JSON and Dataframe to let developers choose from their business requirement.
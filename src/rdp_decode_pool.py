@@ -0,0 +1,384 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Process pool decoding of the RDP APIs responses to columns.
+
+When thousands of RICs are requested concurrently, one Python thread decoding the JSON responses and building the
+columns is slower than the network. The DecodePool sends the raw response bodies to worker processes: the body is
+copied once into a multiprocessing.shared_memory block, the worker decodes it with rdp_json_codec, converts the
+headers/data rows to numpy columns and returns them in another shared memory block. The main process copies the column
+buffers out of the block (one memcpy per column, no pickling of the rows) and frees it. The decoding then uses all the
+cores while the main process only sends the requests.
+
+The columns are typed by the RDP headers: DATE_TIME, SOURCE_DATETIME and the DateTime/Date columns as int64
+nanoseconds since epoch, the 'number' columns as float64, the other columns as fixed width numpy unicode strings.
+
+Example:
+
+    with DecodePool() as pool:
+        result = pool.get_esg_scores_full(client, rics)
+        for batch in result.batches:
+            frame = batch_to_dataframe(batch)
+
+Compare the decoding throughput of the main process and of the pool with:
+
+    $>python rdp_decode_pool.py --processes 4 --responses 200
+'''
+
+import argparse
+import collections
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import requests
+
+import rdp_endpoints
+import rdp_json_codec
+import rdp_request_planner
+
+# the Historical Pricing columns with RDP ISO8601 timestamps
+default_timestamp_columns = ('DATE_TIME', 'SOURCE_DATETIME')
+
+# universe: the RIC of a Historical Pricing element (None for ESG and IPA), columns: {name: numpy array}
+ColumnBatch = collections.namedtuple('ColumnBatch', ['universe', 'columns'])
+
+# batches: list of ColumnBatch, errors: {RIC: error message} of the failed requests
+PipelineResult = collections.namedtuple('PipelineResult', ['batches', 'errors'])
+
+_alignment = 64
+
+
+# -- Decoding, in the main process or in a worker process
+
+def decode_columns(body, timestamp_columns = default_timestamp_columns):
+    '''
+    Decode a response body (bytes or memoryview) and return a list of ColumnBatch, one for each headers/data message: the
+    elements of a Historical Pricing response, an ESG or an IPA response.
+    '''
+    message = rdp_json_codec.loads(body)
+    elements = message if isinstance(message, list) else [message]
+    batches = []
+    for element in elements:
+        if not element:
+            continue
+        headers = element.get('headers', element.get('Headers', []))
+        rows = element.get('data', element.get('Data', []))
+        universe = element.get('universe')
+        universe = universe.get('ric') if isinstance(universe, dict) else None
+        batches.append(ColumnBatch(universe, _columns(headers, rows, set(timestamp_columns))))
+    return batches
+
+
+def _columns(headers, rows, timestamp_columns):
+    import numpy as np
+
+    columns = collections.OrderedDict()
+    values_of = list(zip(*rows)) if rows else [()] * len(headers)
+    for header, values in zip(headers, values_of):
+        name = header['name'] if isinstance(header, dict) else header
+        header_type = (header.get('type') or '').lower() if isinstance(header, dict) else ''
+        if name in timestamp_columns or header_type in ('datetime', 'date'):
+            # numpy parses ISO8601 with up to 9 fraction digits, without the trailing Z
+            values = ['NaT' if value is None else value[:-1] if value.endswith('Z') else value for value in values]
+            columns[name] = np.array(values, dtype = 'datetime64[ns]').view(np.int64)
+        elif header_type in ('number', 'float', 'double', 'integer'):
+            columns[name] = np.array(values, dtype = np.float64)
+        else:
+            columns[name] = np.array(['' if value is None else value for value in values], dtype = str)
+    return columns
+
+
+def _decode_in_worker(input_name, size, timestamp_columns):
+    '''
+    Worker process: decode the body in the input_name shared memory block, return (output block name, layout).
+    '''
+    source = shared_memory.SharedMemory(name = input_name)
+    try:
+        body = source.buf[:size]
+        try:
+            batches = decode_columns(body, timestamp_columns)
+        finally:
+            body.release()
+    finally:
+        source.close()
+
+    layout = []
+    offset = 0
+    for batch in batches:
+        columns = []
+        for name, column in batch.columns.items():
+            columns.append((name, column.dtype.str, len(column), offset))
+            offset += -(-column.nbytes // _alignment) * _alignment
+        layout.append((batch.universe, columns))
+
+    import numpy as np
+
+    output = shared_memory.SharedMemory(create = True, size = max(offset, 1))
+    try:
+        for batch, (universe, columns) in zip(batches, layout):
+            for (name, dtype, length, position), column in zip(columns, batch.columns.values()):
+                target = np.ndarray(column.shape, dtype = column.dtype, buffer = output.buf, offset = position)
+                target[...] = column
+                # the block cannot be closed while an array uses its buffer
+                del target
+    except BaseException:
+        output.close()
+        output.unlink()
+        raise
+    output.close()
+    return output.name, layout
+
+
+def _read_output(output_name, layout):
+    import numpy as np
+
+    output = shared_memory.SharedMemory(name = output_name)
+    try:
+        batches = []
+        for universe, columns in layout:
+            batch_columns = collections.OrderedDict()
+            for name, dtype, length, offset in columns:
+                batch_columns[name] = np.frombuffer(output.buf, dtype = dtype, count = length, offset = offset).copy()
+            batches.append(ColumnBatch(universe, batch_columns))
+        return batches
+    finally:
+        output.close()
+        output.unlink()
+
+
+def _unlink_output(output_name):
+    try:
+        output = shared_memory.SharedMemory(name = output_name)
+    except FileNotFoundError:
+        return
+    output.close()
+    output.unlink()
+
+
+class DecodePool(object):
+    '''
+    Pool of processes (os.cpu_count() if None) that decode response bodies to ColumnBatch lists.
+    '''
+
+    def __init__(self, processes = None, timestamp_columns = default_timestamp_columns):
+        self.processes = processes or os.cpu_count() or 1
+        self.timestamp_columns = tuple(timestamp_columns)
+        # the workers must register their shared memory blocks with the resource tracker of this process, so that the
+        # blocks that this process unlinks are not reported as leaked
+        resource_tracker.ensure_running()
+        self._executor = ProcessPoolExecutor(max_workers = self.processes)
+        # the _ResultFuture objects whose result was not read, their blocks are freed by close()
+        self._outstanding = set()
+        self._lock = threading.Lock()
+
+    def submit(self, body):
+        '''
+        Send a response body (bytes) to a worker process, return a concurrent.futures.Future of the ColumnBatch list.
+        The shared memory blocks of a result that is never read are freed by close().
+        '''
+        source = shared_memory.SharedMemory(create = True, size = max(len(body), 1))
+        source.buf[:len(body)] = body
+        try:
+            future = self._executor.submit(_decode_in_worker, source.name, len(body), self.timestamp_columns)
+        except BaseException:
+            source.close()
+            source.unlink()
+            raise
+        result_future = _ResultFuture(self, future, source)
+        with self._lock:
+            self._outstanding.add(result_future)
+        return result_future
+
+    def decode(self, body):
+        return self.submit(body).result()
+
+    def map(self, bodies):
+        '''
+        Generator, decode the bodies in the pool and yield their ColumnBatch lists in the bodies order.
+        '''
+        futures = collections.deque()
+        try:
+            for body in bodies:
+                futures.append(self.submit(body))
+                # keep about two bodies per worker in flight, the other bodies stay with the caller
+                while len(futures) > 2 * self.processes:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            # the caller stopped early or a body failed, free the blocks of the bodies in flight
+            for future in futures:
+                future.discard()
+
+    # -- Direct call pipelines
+
+    def get_historical_pricing_events(self, client, universe, params = None, concurrency = 8,
+                                      max_rics = rdp_request_planner.default_max_rics['historical-pricing-events']):
+        '''
+        Request /views/events for all RICs of universe (packed in multi-RIC requests) with concurrency threads, decode the
+        responses in the pool while the next responses are downloaded. Return a PipelineResult, a batch per RIC.
+        '''
+        url = rdp_endpoints.historical_pricing_events_universes_url(client.base_url)
+        batches = rdp_request_planner.pack_universe(universe, url, params, max_rics)
+        return self._pipeline(lambda rics: client.get_historical_pricing_events_universes(rics, params = params),
+                              batches, concurrency)
+
+    def get_esg_scores_full(self, client, universe, concurrency = 8,
+                            max_rics = rdp_request_planner.default_max_rics['esg-scores-full']):
+        '''
+        Request /views/scores-full for all RICs of universe (packed in multi-RIC requests), see
+        get_historical_pricing_events(). Return a PipelineResult, a batch per request with the instrument column.
+        '''
+        url = rdp_endpoints.esg_scores_full_url(client.base_url)
+        batches = rdp_request_planner.pack_universe(universe, url, None, max_rics)
+        return self._pipeline(lambda rics: client.get_esg_scores_full(','.join(rics)), batches, concurrency)
+
+    def close(self):
+        '''
+        Free the shared memory blocks of the results that were not read and stop the worker processes.
+        '''
+        with self._lock:
+            outstanding = list(self._outstanding)
+        for future in outstanding:
+            future.discard()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # -- Internal functions
+
+    def _pipeline(self, send, rics_batches, concurrency):
+        def fetch(rics):
+            response = send(rics)
+            if response.status_code != 200:  # HTTP Status 'OK'
+                raise requests.HTTPError('%s %s' % (response.status_code, response.reason), response = response)
+            return self.submit(response.content)
+
+        result = PipelineResult([], {})
+        with ThreadPoolExecutor(max_workers = concurrency) as executor:
+            pending = [(rics, executor.submit(fetch, rics)) for rics in rics_batches]
+            for rics, request in pending:
+                try:
+                    result.batches.extend(request.result().result())
+                except Exception as exp:
+                    for ric in rics:
+                        result.errors[ric] = str(exp)
+        return result
+
+
+class _ResultFuture(object):
+    '''
+    Future of a DecodePool result, the shared memory blocks are freed when the result is read or discarded.
+    '''
+
+    def __init__(self, pool, future, source):
+        self._pool = pool
+        self._future = future
+        self._source = source
+        self._lock = threading.Lock()
+        # the worker does not read the input block once the future is done
+        future.add_done_callback(lambda future: self._free_source())
+
+    def done(self):
+        return self._future.done()
+
+    def result(self, timeout = None):
+        try:
+            output_name, layout = self._future.result(timeout)
+        except BaseException:
+            if self._future.done():
+                self._free_source()
+                self._forget()
+            raise
+        self._free_source()
+        self._forget()
+        return _read_output(output_name, layout)
+
+    def discard(self):
+        '''
+        Cancel the decoding, or wait for it and free its output block without reading it.
+        '''
+        if not self._future.cancel():
+            try:
+                output_name, layout = self._future.result()
+            except Exception:
+                output_name = None
+            if output_name is not None:
+                _unlink_output(output_name)
+        self._free_source()
+        self._forget()
+
+    def _free_source(self):
+        # under the lock, the block is unlinked when discard() returns even if the done callback is freeing it
+        with self._lock:
+            if self._source is not None:
+                self._source.close()
+                self._source.unlink()
+                self._source = None
+
+    def _forget(self):
+        with self._pool._lock:
+            self._pool._outstanding.discard(self)
+
+
+def batch_to_dataframe(batch):
+    '''
+    Build a pandas DataFrame of a ColumnBatch, the int64 timestamp columns become datetime64[ns] without a copy.
+    '''
+    import pandas as pd
+
+    columns = collections.OrderedDict()
+    for name, column in batch.columns.items():
+        columns[name] = column.view('datetime64[ns]') if column.dtype.kind == 'i' else column
+    return pd.DataFrame(columns, copy = False)
+
+
+# -- Benchmark
+
+def run_benchmark(processes, responses, events):
+    import rdp_mock_server
+
+    body = rdp_json_codec.dumps(rdp_mock_server.events_message('IBM.N', {'count': events}))
+
+    started = time.perf_counter()
+    for _ in range(responses):
+        decode_columns(body)
+    in_process = time.perf_counter() - started
+
+    with DecodePool(processes) as pool:
+        # start the worker processes before the measure
+        pool.decode(body)
+        started = time.perf_counter()
+        for _ in pool.map(body for _ in range(responses)):
+            pass
+        in_pool = time.perf_counter() - started
+
+    size = len(body) * responses / 1e6
+    print('%d responses of %d events (%.1f MB)' % (responses, events, size))
+    print('main process: %.2f s, %.1f MB/s' % (in_process, size / in_process))
+    print('%d processes: %.2f s, %.1f MB/s, %.1fx' % (processes, in_pool, size / in_pool, in_process / in_pool))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Process pool decoding of Historical Pricing responses benchmark')
+    parser.add_argument('--processes', type = int, default = os.cpu_count() or 1)
+    parser.add_argument('--responses', type = int, default = 100)
+    parser.add_argument('--events', type = int, default = 5000, help = 'events in one response')
+    args = parser.parse_args()
+    run_benchmark(args.processes, args.responses, args.events)
@@ -14,8 +14,6 @@
 Both RDP APIs and RDP Libraries require the same RDP access credentials which are the username, password and App Key (client id).
 '''
 
-import json
-
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -52,6 +50,11 @@ ipa_request_message ={
 
 import refinitiv.dataplatform as rdp
 
+from rdp_response_cache import CachedEndpoint, ResponseCache
+
+# ESG and Business summary data change rarely, the responses are kept on disk between runs for their TTL
+library_response_cache = ResponseCache('.rdp_cache/library-responses')
+
 # -- Init and Authenticate Session
 
 try:
@@ -76,7 +79,7 @@ service_endpoint_URL = '/views/scores-full'
 
 endpoint_url = base_URL + category_URL + RDP_version + service_endpoint_URL #https://api.refinitiv.com/data/environmental-social-governance/v1/views/scores-full
 try:
-    endpoint = rdp.Endpoint(session, endpoint_url)
+    endpoint = CachedEndpoint(rdp.Endpoint(session, endpoint_url), endpoint_url, library_response_cache, RDP_LOGIN)
     response = endpoint.send_request( query_parameters = {'universe': universe} )
     print('This is a ESG data result from RDP library')
     print(response.data.raw)
@@ -92,7 +95,7 @@ service_endpoint_URL = '/corp/business-summary'
 
 endpoint_url = base_URL + category_URL + RDP_version + service_endpoint_URL + '/' + universe #https://api.refinitiv.com/user-framework/mobile/overview-service/v1/corp/business-summary/IBM.N
 try:
-    endpoint = rdp.Endpoint(session, endpoint_url)
+    endpoint = CachedEndpoint(rdp.Endpoint(session, endpoint_url), endpoint_url, library_response_cache, RDP_LOGIN)
     response = endpoint.send_request()
     print('This is a Business summary data result from RDP library')
     print(response.data.raw)
@@ -109,11 +112,21 @@ service_endpoint_URL = '/financial-contracts'
 
 endpoint_url = base_URL + category_URL + RDP_version + service_endpoint_URL  #https://api.refinitiv.com/data/quantitative-analytics/v1/financial-contracts
 
+from rdp_valuation_cache import ValuationCache, price_request_message
+
+# the contracts with a fixed valuationDate are priced once, the next runs answer them from the valuation cache
+library_valuation_cache = ValuationCache('.rdp_cache/library-valuations')
+
+def send_library_ipa_request(message):
+    response = endpoint.send_request( method = rdp.Endpoint.RequestMethod.POST, body_parameters  = message)
+    if not response.is_success:
+        raise Exception('IPA request failure: %s' % response.status)
+    return response.data.raw
+
 try:
     endpoint = rdp.Endpoint(session, endpoint_url)
-    response = endpoint.send_request( method = rdp.Endpoint.RequestMethod.POST, body_parameters  = ipa_request_message)
     print('This is a IPA data result from RDP library')
-    print(response.data.raw)
+    print(price_request_message(ipa_request_message, send_library_ipa_request, library_valuation_cache))
     print('\n')
 except Exception as exp:
 	print('RDP Libraries: Delivery Layer exception: %s' % str(exp))
@@ -121,45 +134,35 @@ except Exception as exp:
 # --------------------------- RDP APIs Direct Call -------------------------------------
 
 
-import requests
-
-# -- Init and Authenticate Session
-
-scope = 'trapi'
-client_secret = ''
+from rdp_http_client import get_shared_client
+from rdp_json_codec import decode_response
+from rdp_response_cache import ResponseCache, install_cache
+from rdp_valuation_cache import ValuationCache, price_request_message
+from rdp_scheduler import RequestScheduler
+from rdp_token_manager import RDPTokenManager
 
 RDP_version = '/v1'
 base_URL = 'https://api.refinitiv.com'
-category_URL = '/auth/oauth2'
-service_endpoint_URL = '/token'
 
-auth_endpoint = base_URL + category_URL + RDP_version + service_endpoint_URL #https://api.refinitiv.com/auth/oauth2/v1/token
+# All RDP APIs requests share one pooled keep-alive HTTP client, the scheduler retries the throttled (HTTP 429) requests
+client = get_shared_client(scheduler = RequestScheduler())
+
+# ESG and Business summary responses are answered from the cache for their TTL, then revalidated with ETag/Last-Modified
+install_cache(client, ResponseCache(), user = RDP_LOGIN)
+
+# The token manager sends the password grant once and refreshes the Access Token with the refresh_token grant in background
+token_manager = RDPTokenManager(APP_KEY, RDP_LOGIN, RDP_PASSWORD, http = client.session)
+client.token_manager = token_manager
 
-auth_obj = None
 response = None
 
-auth_request_msg = {
-    'username': RDP_LOGIN,
-	'password': RDP_PASSWORD,
-	'grant_type': 'password',
-	'scope': scope,
-	'takeExclusiveSignOnControl': 'true'
-}
+# -- Init and Authenticate Session
 
 try:
-    response = requests.post(auth_endpoint, headers = {'Accept':'application/json'}, data = auth_request_msg, auth = (APP_KEY,client_secret))
-except Exception as exp:
-	print('Caught exception: %s' % str(exp))
-
-if response.status_code == 200:  # HTTP Status 'OK'
+    token_manager.open()
     print('RDP APIs: Authentication success')
-    auth_obj = response.json()
-    print('RDP access_token = %s' % auth_obj['access_token'])
-    print('RDP refresh_token = %s' % auth_obj['refresh_token'])
-    print('RDP expires_in = %d' % int(auth_obj['expires_in']))
-else:
-    print('RDP APIs: Authentication result failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
+except Exception as exp:
+    print('RDP APIs: Authentication result failure: %s' % str(exp))
 
 # -- Requesting ESG Data
 
@@ -173,13 +176,13 @@ esg_url = base_URL + category_URL + RDP_version + service_endpoint_URL  #https:/
 payload = {'universe': universe}
 
 try:
-    response = requests.get(esg_url, headers={'Authorization': 'Bearer {}'.format(auth_obj['access_token'])}, params = payload)
+    response = client.get(esg_url, params = payload)
 except Exception as exp:
 	print('Caught exception: %s' % str(exp))
 
 if response.status_code == 200:  # HTTP Status 'OK'
     print('This is a ESG data result from RDP API Call')
-    print(response.json())
+    print(decode_response(response))
 else:
     print('RDP APIs: ESG data request failure: %s %s' % (response.status_code, response.reason))
     print('Text: %s' % (response.text))
@@ -194,13 +197,13 @@ service_endpoint_URL = '/corp/business-summary'
 business_summary_url = base_URL + category_URL + RDP_version + service_endpoint_URL + '/' + universe #https://api.refinitiv.com/user-framework/mobile/overview-service/v1/corp/business-summary/IBM.N
 
 try:
-    response = requests.get(business_summary_url, headers={'Authorization': 'Bearer {}'.format(auth_obj['access_token'])})
+    response = client.get(business_summary_url)
 except Exception as exp:
 	print('Caught exception: %s' % str(exp))
 
 if response.status_code == 200:  # HTTP Status 'OK'
     print('This is a Business summary data result from RDP API Call')
-    print(response.json())
+    print(decode_response(response))
 else:
     print('RDP APIs: Business summary data request failure: %s %s' % (response.status_code, response.reason))
     print('Text: %s' % (response.text))
@@ -214,17 +217,30 @@ category_URL = '/data/quantitative-analytics'
 service_endpoint_URL = '/financial-contracts'
 ipa_url = base_URL + category_URL + RDP_version + service_endpoint_URL  #https://api.refinitiv.com/data/quantitative-analytics/v1/financial-contracts
 
+valuation_cache = ValuationCache()
+
+def send_ipa_request(message):
+    response = client.post(ipa_url, body = message)
+    if response.status_code != 200:  # HTTP Status 'OK'
+        raise Exception('%s %s %s' % (response.status_code, response.reason, response.text))
+    return decode_response(response)
+
 try:
-    response = requests.post(ipa_url, headers = {'Content-Type':'application/json','Authorization': 'Bearer {}'.format(auth_obj['access_token'])}, data = json.dumps(ipa_request_message))
+    message = price_request_message(ipa_request_message, send_ipa_request, valuation_cache)
+    print('This is a IPA data result from RDP API Call')
+    print(message)
 except Exception as exp:
-	print('Caught exception: %s' % str(exp))
+    print('RDP APIs: IPA data request failure: %s' % str(exp))
 
-if response.status_code == 200:  # HTTP Status 'OK'
-    print('This is a IPA data result from RDP API Call')
-    print(response.json())
-else:
-    print('RDP APIs: IPA data request failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
+# -- Close Session, sending revoke access token request
+
+try:
+    token_manager.close()
+    print('RDP APIs: Revoke access token success')
+except Exception as exp:
+    print('RDP APIs: Revoke access token failure: %s' % str(exp))
+finally:
+    client.close()
 
 
 '''
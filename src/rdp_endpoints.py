@@ -0,0 +1,86 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+RDP APIs Service Endpoint URLs used by the direct call demo applications.
+
+The URLs are built the same way as in the demo applications: base_URL + category_URL + RDP_version + service_endpoint_URL.
+'''
+
+from urllib.parse import urlparse
+
+RDP_version = '/v1'
+base_URL = 'https://api.refinitiv.com'
+
+scope = 'trapi'
+client_secret = ''
+
+# -- Auth Service
+
+auth_category_URL = '/auth/oauth2'
+
+
+def auth_token_url(base_url = base_URL):
+    return base_url + auth_category_URL + RDP_version + '/token' #https://api.refinitiv.com/auth/oauth2/v1/token
+
+
+def auth_revoke_url(base_url = base_URL):
+    return base_url + auth_category_URL + RDP_version + '/revoke' #https://api.refinitiv.com/auth/oauth2/v1/revoke
+
+
+# -- Data Services
+
+historical_pricing_category_URL = '/data/historical-pricing'
+esg_category_URL = '/data/environmental-social-governance'
+overview_category_URL = '/user-framework/mobile/overview-service'
+ipa_category_URL = '/data/quantitative-analytics'
+
+
+def historical_pricing_events_url(universe, base_url = base_URL):
+    return base_url + historical_pricing_category_URL + RDP_version + '/views/events/' + universe #https://api.refinitiv.com/data/historical-pricing/v1/views/events/IBM.N
+
+
+def historical_pricing_events_universes_url(base_url = base_URL):
+    # many universes in the comma separated universe query parameter
+    return base_url + historical_pricing_category_URL + RDP_version + '/views/events' #https://api.refinitiv.com/data/historical-pricing/v1/views/events?universe=IBM.N,MSFT.O
+
+
+def esg_scores_full_url(base_url = base_URL):
+    return base_url + esg_category_URL + RDP_version + '/views/scores-full' #https://api.refinitiv.com/data/environmental-social-governance/v1/views/scores-full
+
+
+def business_summary_url(universe, base_url = base_URL):
+    return base_url + overview_category_URL + RDP_version + '/corp/business-summary/' + universe #https://api.refinitiv.com/user-framework/mobile/overview-service/v1/corp/business-summary/IBM.N
+
+
+def financial_contracts_url(base_url = base_URL):
+    return base_url + ipa_category_URL + RDP_version + '/financial-contracts' #https://api.refinitiv.com/data/quantitative-analytics/v1/financial-contracts
+
+
+def endpoint_name(url):
+    '''
+    Return a short name of the Service Endpoint of url without the universe, i.e. historical-pricing-events.
+    '''
+    path = urlparse(url).path
+    for name, prefix in endpoint_prefixes:
+        if path.startswith(prefix):
+            return name
+    return path
+
+
+endpoint_prefixes = [
+    ('auth-token', auth_category_URL + RDP_version + '/token'),
+    ('auth-revoke', auth_category_URL + RDP_version + '/revoke'),
+    ('historical-pricing-events', historical_pricing_category_URL + RDP_version + '/views/events'),
+    ('esg-scores-full', esg_category_URL + RDP_version + '/views/scores-full'),
+    ('business-summary', overview_category_URL + RDP_version + '/corp/business-summary'),
+    ('financial-contracts', ipa_category_URL + RDP_version + '/financial-contracts')
+]
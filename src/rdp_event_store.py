@@ -0,0 +1,266 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+In-memory store of the Historical Pricing trade events in numpy arrays.
+
+A /views/events row is a list of Python strings and floats (about 1 KB per trade event as response.json() objects),
+and the Function Layer DataFrame keeps the string columns as Python objects. The EventStore keeps, for each universe,
+DATE_TIME as an int64 nanoseconds array and the selected fields as typed arrays (16 bytes per event for the trade price
+and volume). The arrays are sorted by time:
+- slice() finds a time range with a binary search (numpy.searchsorted, O(log n)) and returns array views, no copy
+- to_dataframe() wraps the views in a pandas DataFrame without copying them
+- append() adds new events at the end of the arrays (amortized O(1) per event, the capacity doubles). Events older than
+  the newest stored event are merged in time order with a copy of the arrays: a page older than all stored events,
+  i.e. the pages of rdp_historical_pricing.iter_events() that walk back in time, is copied in front of them, an
+  overlapping page is sorted in.
+
+The slices are snapshots: the events appended later are not in a slice that was taken before.
+
+Example:
+
+    store = EventStore()
+    tailer = EventTailer(client, ['IBM.N'], callback = store.append_page)
+    ...
+    frame = store.to_dataframe('IBM.N', start = timedelta(hours = -1))
+'''
+
+import collections
+import threading
+
+import rdp_historical_pricing
+
+# field name: numpy dtype, float64 keeps the missing values as NaN
+default_fields = collections.OrderedDict([('TRDPRC_1', 'float64'), ('TRDVOL_1', 'float64')])
+
+default_capacity = 1024
+
+# universe, times: int64 nanoseconds since epoch, columns: {field name: array}
+EventSlice = collections.namedtuple('EventSlice', ['universe', 'times', 'columns'])
+
+
+class _EventSeries(object):
+    '''
+    Growable time sorted arrays of one universe, the first `length` items of the arrays are used.
+    '''
+
+    def __init__(self, dtypes, capacity):
+        import numpy as np
+
+        self.length = 0
+        self.times = np.empty(capacity, dtype = np.int64)
+        self.columns = collections.OrderedDict((name, np.empty(capacity, dtype = dtype)) for name, dtype in dtypes.items())
+
+    @property
+    def nbytes(self):
+        return self.times.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    def append(self, times, columns):
+        count = len(times)
+        if self.length and times[0] < self.times[self.length - 1]:
+            self._merge(times, columns)
+            return
+        end = self.length + count
+        if end > len(self.times):
+            # new arrays, the views of the previous arrays stay valid
+            capacity = max(end, 2 * len(self.times))
+            self.times = _grow(self.times, self.length, capacity)
+            self.columns = collections.OrderedDict((name, _grow(column, self.length, capacity))
+                                                   for name, column in self.columns.items())
+        self.times[self.length:end] = times
+        for name, column in self.columns.items():
+            column[self.length:end] = columns[name]
+        self.length = end
+
+    def _merge(self, times, columns):
+        import numpy as np
+
+        length = self.length + len(times)
+        capacity = max(length, len(self.times))
+        if times[-1] <= self.times[0]:
+            # a page older than all stored events (the back-fill of iter_events), no sort
+            self.times = _prepend(times, self.times, self.length, capacity)
+            self.columns = collections.OrderedDict((name, _prepend(columns[name], column, self.length, capacity))
+                                                   for name, column in self.columns.items())
+            self.length = length
+            return
+
+        merged_times = np.concatenate([self.times[:self.length], times])
+        # stable, the stored events stay before the new events of the same timestamp
+        order = np.argsort(merged_times, kind = 'stable')
+        self.times = _grow(merged_times[order], length, capacity)
+        self.columns = collections.OrderedDict(
+            (name, _grow(np.concatenate([column[:self.length], columns[name]])[order], length, capacity))
+            for name, column in self.columns.items())
+        self.length = length
+
+    def bounds(self, start_ns, end_ns):
+        import numpy as np
+
+        times = self.times[:self.length]
+        first = 0 if start_ns is None else int(np.searchsorted(times, start_ns, side = 'left'))
+        last = self.length if end_ns is None else int(np.searchsorted(times, end_ns, side = 'left'))
+        return first, max(first, last)
+
+
+def _grow(array, length, capacity):
+    import numpy as np
+
+    grown = np.empty(capacity, dtype = array.dtype)
+    grown[:length] = array[:length]
+    return grown
+
+
+def _prepend(values, array, length, capacity):
+    import numpy as np
+
+    grown = np.empty(capacity, dtype = array.dtype)
+    grown[:len(values)] = values
+    grown[len(values):len(values) + length] = array[:length]
+    return grown
+
+
+class EventStore(object):
+    '''
+    Append-only time indexed store of the events of many universes.
+
+    fields is a {field name: numpy dtype} dict or a list of field names (float64) of the /views/events columns to keep.
+    A field that the response does not have is stored as NaN. The append functions are thread safe. The store keeps every
+    event it gets, feed it from a source without duplicates (iter_events(), EventTailer).
+    '''
+
+    def __init__(self, fields = default_fields, capacity = default_capacity):
+        if not isinstance(fields, dict):
+            fields = collections.OrderedDict((name, 'float64') for name in fields)
+        self.fields = collections.OrderedDict(fields)
+        self.capacity = capacity
+        self._series = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def universes(self):
+        return list(self._series)
+
+    @property
+    def nbytes(self):
+        '''
+        Return the allocated bytes of all arrays, including the unused capacity.
+        '''
+        return sum(series.nbytes for series in list(self._series.values()))
+
+    def __len__(self):
+        return sum(series.length for series in list(self._series.values()))
+
+    def count(self, universe):
+        series = self._series.get(universe)
+        return series.length if series is not None else 0
+
+    # -- Ingestion
+
+    def append(self, universe, headers, rows):
+        '''
+        Add /views/events rows (in any time order) of universe, return the number of events added.
+        '''
+        import numpy as np
+
+        if not rows:
+            return 0
+        names = [header['name'] if isinstance(header, dict) else header for header in headers]
+        time_index = rdp_historical_pricing.date_time_index(headers)
+        times = rdp_historical_pricing.to_datetime64([row[time_index] for row in rows]).view(np.int64)
+        columns = {}
+        for name, dtype in self.fields.items():
+            if name in names:
+                index = names.index(name)
+                columns[name] = np.array([row[index] for row in rows], dtype = dtype)
+            else:
+                columns[name] = np.full(len(rows), np.nan, dtype = dtype)
+
+        # the service sends the newest events first
+        differences = np.diff(times)
+        if (differences <= 0).all():
+            order = slice(None, None, -1)
+        elif (differences >= 0).all():
+            order = slice(None)
+        else:
+            order = np.argsort(times, kind = 'stable')
+        times = times[order]
+        columns = {name: column[order] for name, column in columns.items()}
+
+        with self._lock:
+            series = self._series.get(universe)
+            if series is None:
+                series = self._series[universe] = _EventSeries(self.fields, max(self.capacity, len(times)))
+            series.append(times, columns)
+        return len(times)
+
+    def append_page(self, page):
+        '''
+        Add the events of an rdp_historical_pricing.EventsPage, i.e. the EventTailer callback.
+        '''
+        return self.append(page.universe, page.headers, page.data)
+
+    def append_message(self, message, universe = None):
+        '''
+        Add the events of a decoded /views/events response message (the list of universe elements or one element).
+        '''
+        if isinstance(message, list):
+            return sum(self.append_message(element, universe) for element in message)
+        if not message:
+            return 0
+        if universe is None:
+            universe = message.get('universe', {}).get('ric')
+        return self.append(universe, message.get('headers', []), message.get('data', []))
+
+    # -- Queries
+
+    def slice(self, universe, start = None, end = None):
+        '''
+        Return an EventSlice of the events of universe with start <= DATE_TIME < end, the arrays are views of the store.
+
+        start and end are integer nanoseconds since epoch, numpy datetime64, or any rdp_historical_pricing.to_rdp_timestamp()
+        value (datetime, timedelta from now, RDP timestamp string). None is the first or the last event.
+        '''
+        import numpy as np
+
+        with self._lock:
+            series = self._series.get(universe)
+            if series is None:
+                return EventSlice(universe, np.empty(0, dtype = np.int64),
+                                  collections.OrderedDict((name, np.empty(0, dtype = dtype)) for name, dtype in self.fields.items()))
+            times, columns = series.times, series.columns
+            first, last = series.bounds(to_nanoseconds(start), to_nanoseconds(end))
+        return EventSlice(universe, times[first:last],
+                          collections.OrderedDict((name, column[first:last]) for name, column in columns.items()))
+
+    def to_dataframe(self, universe, start = None, end = None):
+        '''
+        Return a pandas DataFrame of slice(universe, start, end) indexed by Timestamp (datetime64[ns] UTC, naive like
+        rdp_historical_pricing.events_to_dataframe()). The columns and the index share the memory of the store.
+        '''
+        import pandas as pd
+
+        event_slice = self.slice(universe, start, end)
+        index = pd.DatetimeIndex(event_slice.times.view('datetime64[ns]'), copy = False, name = 'Timestamp')
+        return pd.DataFrame(event_slice.columns, index = index, copy = False)
+
+
+def to_nanoseconds(value):
+    '''
+    Convert a time boundary to integer nanoseconds since epoch, None stays None.
+    '''
+    import numpy as np
+
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, np.datetime64):
+        return int(value.astype('datetime64[ns]').view(np.int64))
+    return rdp_historical_pricing.parse_rdp_timestamp(rdp_historical_pricing.to_rdp_timestamp(value))
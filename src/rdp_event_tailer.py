@@ -0,0 +1,226 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Incremental tailer of the RDP Historical Pricing trade events.
+
+The demo applications request the last 15 events of one day on every run. The EventTailer keeps the DATE_TIME of the
+newest event received for each universe and polls /views/events with that timestamp as the `start` boundary, so every
+poll returns the new events only. The events at the boundary timestamp that were already delivered are skipped by
+count (the service may return several events with the same timestamp, and `start` is inclusive). Two trades with the
+same values are two events, so the rows are not compared.
+
+The new events are delivered oldest first as EventsPage objects (see rdp_historical_pricing) to a callback and/or put in
+a queue.Queue.
+
+Run the tape of IBM.N in a console with:
+
+    $>python rdp_event_tailer.py IBM.N --interval 5
+
+or in an application:
+
+    tailer = EventTailer(client, ['IBM.N', 'MSFT.O'], callback = lambda page: print(page.universe, len(page.data)))
+    tailer.start()
+    ...
+    tailer.stop()
+
+positions returns the current boundary of each universe, pass it as the positions argument of a new EventTailer to
+resume the tape after a restart without a gap or duplicate events.
+'''
+
+import argparse
+import os
+import threading
+import time
+
+import rdp_endpoints
+import rdp_historical_pricing
+import rdp_metrics
+from rdp_historical_pricing import EventsPage
+
+
+class EventTailer(object):
+    '''
+    Poll the new trade events of universes every interval seconds.
+
+    client is an rdp_http_client.RDPHttpClient object. The first poll of a universe without a position delivers its
+    newest initial_count events if start is None, or all events since start (the same values as
+    rdp_historical_pricing.to_rdp_timestamp(), i.e. timedelta(-1)).
+    '''
+
+    def __init__(self, client, universes, callback = None, queue = None, interval = 1.0, start = None, initial_count = 15,
+                 event_types = rdp_historical_pricing.default_event_types, adjustments = rdp_historical_pricing.default_adjustments,
+                 page_size = rdp_historical_pricing.max_page_size, positions = None):
+        self.client = client
+        self.universes = list(universes)
+        self.callback = callback
+        self.queue = queue
+        self.interval = interval
+        self.start_time = start
+        self.initial_count = initial_count
+        self.event_types = event_types
+        self.adjustments = adjustments
+        self.page_size = page_size
+        # universe -> (newest DATE_TIME in nanoseconds, number of the delivered events at this DATE_TIME)
+        self._positions = {}
+        for universe, position in (positions or {}).items():
+            self._positions[universe] = (position['last_ns'], position['count'])
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = {}
+
+    @property
+    def positions(self):
+        '''
+        Return {universe: {'last_ns': ..., 'count': ...}}, JSON serializable.
+        '''
+        return {universe: {'last_ns': last_ns, 'count': count} for universe, (last_ns, count) in self._positions.items()}
+
+    def poll(self):
+        '''
+        Poll every universe once, deliver and return the list of EventsPage objects with new events.
+
+        The error of a universe is kept in errors[universe] and the other universes are polled, the next poll retries it
+        from the same position.
+        '''
+        pages = []
+        for universe in self.universes:
+            try:
+                page = self.poll_universe(universe)
+            except Exception as exp:
+                self.errors[universe] = exp
+                rdp_metrics.registry.increment('rdp_tailer_errors_total', {'universe': universe})
+                continue
+            self.errors.pop(universe, None)
+            if page is not None:
+                pages.append(page)
+                self._deliver(page)
+        return pages
+
+    def poll_universe(self, universe):
+        '''
+        Return an EventsPage with the new events of universe (oldest first), or None. The position moves forward.
+        '''
+        position = self._positions.get(universe)
+        if position is None and self.start_time is None:
+            payload = rdp_historical_pricing.events_payload(self.event_types, None, None, self.initial_count, self.adjustments)
+            result = rdp_historical_pricing.get_events_page(self.client, universe, payload)
+            if not result or not result.get('data'):
+                return None
+            headers, rows = result.get('headers', []), result['data']
+        else:
+            start = rdp_historical_pricing.format_rdp_timestamp(position[0]) if position else self.start_time
+            headers, rows = [], []
+            for page in rdp_historical_pricing.iter_events(self.client, universe, start, None, self.event_types,
+                                                           self.adjustments, self.page_size):
+                headers = page.headers
+                rows.extend(page.data)
+            if not rows:
+                return None
+
+        date_time_index = rdp_historical_pricing.date_time_index(headers)
+        last_ns, last_count = position if position else (None, 0)
+
+        # the service returns the newest events first, the tape is delivered oldest first. The first last_count events
+        # at last_ns were delivered by the previous polls
+        data = []
+        skipped = 0
+        for row in reversed(rows):
+            timestamp_ns = rdp_historical_pricing.parse_rdp_timestamp(row[date_time_index])
+            if last_ns is not None:
+                if timestamp_ns < last_ns:
+                    continue
+                if timestamp_ns == last_ns and skipped < last_count:
+                    skipped += 1
+                    continue
+            data.append((timestamp_ns, row))
+        if not data:
+            return None
+
+        # the same timestamp can have several events, count all delivered events of the newest timestamp
+        newest_ns = data[-1][0]
+        newest_count = sum(1 for timestamp_ns, row in data if timestamp_ns == newest_ns)
+        if newest_ns == last_ns:
+            newest_count += skipped
+        self._positions[universe] = (newest_ns, newest_count)
+
+        rdp_metrics.registry.increment('rdp_tailer_events_total', {'universe': universe}, len(data))
+        return EventsPage(universe, headers, [row for timestamp_ns, row in data])
+
+    def start(self):
+        '''
+        Poll in a background thread until stop().
+        '''
+        self._stop.clear()
+        self._thread = threading.Thread(target = self.run, daemon = True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        '''
+        Poll until stop(), every interval seconds from the start of the previous poll.
+        '''
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll()
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def stop(self, timeout = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # -- Internal functions
+
+    def _deliver(self, page):
+        if self.queue is not None:
+            self.queue.put(page)
+        if self.callback is not None:
+            self.callback(page)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Tail the RDP Historical Pricing trade events')
+    parser.add_argument('universes', nargs = '*', default = ['IBM.N'])
+    parser.add_argument('--interval', type = float, default = 5.0, help = 'seconds between two polls')
+    parser.add_argument('--app-key', default = os.environ.get('RDP_APP_KEY', ''))
+    parser.add_argument('--login', default = os.environ.get('RDP_LOGIN', ''))
+    parser.add_argument('--password', default = os.environ.get('RDP_PASSWORD', ''))
+    parser.add_argument('--base-url', default = rdp_endpoints.base_URL)
+    args = parser.parse_args()
+
+    from rdp_http_client import RDPHttpClient
+    from rdp_token_manager import RDPTokenManager
+
+    client = RDPHttpClient(base_url = args.base_url)
+    client.token_manager = RDPTokenManager(args.app_key, args.login, args.password, base_url = args.base_url,
+                                           http = client.session)
+    client.token_manager.open()
+
+    def print_events(page):
+        for row in page.data:
+            print(page.universe, ' '.join(str(value) for value in row))
+
+    tailer = EventTailer(client, args.universes, callback = print_events, interval = args.interval)
+    try:
+        tailer.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.token_manager.close()
+        client.close()
@@ -82,41 +82,30 @@ if response is not None:
 
 # --------------------------- RDP APIs Direct Call -------------------------------------
 
-import requests
+from rdp_http_client import get_shared_client
+from rdp_json_codec import decode_response
+from rdp_scheduler import RequestScheduler
+from rdp_token_manager import RDPTokenManager
 
-scope = 'trapi'
-client_secret = ''
+RDP_version = '/v1'
+base_URL = 'https://api.refinitiv.com'
 
-RDP_version = "/v1"
-base_URL = "https://api.refinitiv.com"
-category_URL = "/auth/oauth2"
-service_endpoint_URL = "/token"
+# All RDP APIs requests share one pooled keep-alive HTTP client, the scheduler retries the throttled (HTTP 429) requests
+client = get_shared_client(scheduler = RequestScheduler())
 
-auth_endpoint = base_URL + category_URL + RDP_version + service_endpoint_URL 
+# The token manager sends the password grant once and refreshes the Access Token with the refresh_token grant in background
+token_manager = RDPTokenManager(APP_KEY, RDP_LOGIN, RDP_PASSWORD, http = client.session)
+client.token_manager = token_manager
 
-auth_obj = None
 response = None
 
 # -- Init and Authenticate Session
-auth_request_msg = {
-    'username': RDP_LOGIN,
-	'password': RDP_PASSWORD,
-	'grant_type': "password",
-	'scope': scope,
-	'takeExclusiveSignOnControl': "true"
-}
 
 try:
-    response = requests.post(auth_endpoint, headers = {'Accept':'application/json'}, data = auth_request_msg, auth = (APP_KEY,client_secret))
+    token_manager.open()
+    print('RDP APIs: Authentication success')
 except Exception as exp:
-	print('Caught exception: %s' % str(exp))
-
-if response.status_code == 200:  # HTTP Status 'OK'
-    print('Authentication success')
-    auth_obj = response.json()
-else:
-    print('RDP authentication result failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
+    print('RDP APIs: Authentication result failure: %s' % str(exp))
 
 
 # ------------ Historical Pricing
@@ -130,19 +119,48 @@ historical_pricing_url = base_URL + category_URL + RDP_version + service_endpoin
 payload = {'eventTypes':'trade','adjustments': 'exchangeCorrection,manualCorrection', 'start': start_iso , 'count':15}
 
 try:
-    response = requests.get(historical_pricing_url, headers={'Authorization': 'Bearer {}'.format(auth_obj['access_token'])}, params = payload)
+    response = client.get(historical_pricing_url, params = payload)
 except Exception as exp:
 	print('Caught exception: %s' % str(exp))
 
 if response.status_code == 200:  # HTTP Status 'OK'
     print('This is a Historical Pricing data result from RDP API Call')
-    print(response.json())
+    print(decode_response(response))
     #print(json.dumps(response.json(),sort_keys=True, indent=2, separators=(',', ':')))
 else:
     print('RDP APIs: Pricing data request failure: %s %s' % (response.status_code, response.reason))
     print('Text: %s' % (response.text))
 
 
+# ------------ Historical Pricing in Pandas DataFrame format with direct call
+
+from rdp_historical_pricing import get_historical_price_events
+
+try:
+    df = get_historical_price_events(
+        universe = universe,
+        eventTypes = 'trade',
+        start = start_iso,
+        count = 15,
+        adjustments = ['exchangeCorrection', 'manualCorrection'],
+        client = client
+    )
+    print('This is a Historical Pricing data result from RDP API Call in Pandas DataFrame format')
+    print(df)
+except Exception as exp:
+    print('RDP APIs: Pricing data request failure: %s' % str(exp))
+
+
+# -- Close Session, sending revoke access token request
+
+try:
+    token_manager.close()
+    print('RDP APIs: Revoke access token success')
+except Exception as exp:
+    print('RDP APIs: Revoke access token failure: %s' % str(exp))
+finally:
+    client.close()
+
 
 '''
 The result shows that RDP Libraries Function Layer aims for data scientist/trade coder who want data in a "ready to use" format which is the Pandas Dataframe data type. Dataframe object lets them analyze data and plotting graph for data visualize easy in Jupyter Notebook Application. 
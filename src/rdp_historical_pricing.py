@@ -0,0 +1,272 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+RDP Historical Pricing /views/events direct call helpers.
+
+The iter_events() generator walks a start/end time range page by page. The RDP Historical Pricing service returns the
+newest events first, so every next request uses the oldest DATE_TIME of the previous page as its `end` boundary. The
+events at the boundary timestamp that were already received are skipped by count, so the application gets every event
+once and keeps only one page in memory. A timestamp with more events than page_size cannot be walked past: the events
+above page_size are skipped with a RuntimeWarning.
+
+Example:
+
+    for page in iter_events(client, 'IBM.N', start = timedelta(-7)):
+        process(page.headers, page.data)
+'''
+
+import calendar
+import collections
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import rdp_endpoints
+import rdp_metrics
+
+default_event_types = 'trade'
+default_adjustments = ('exchangeCorrection', 'manualCorrection')
+
+# the maximum number of rows the service returns in one page
+max_page_size = 10000
+
+EventsPage = collections.namedtuple('EventsPage', ['universe', 'headers', 'data'])
+
+
+# -- RDP timestamp format, i.e. 2020-07-13T08:54:53.619177000Z
+
+def to_rdp_timestamp(value):
+    '''
+    Convert a datetime (naive datetime is UTC), a timedelta from now (i.e. timedelta(-1) the same as the RDP Libraries),
+    integer nanoseconds since epoch or a string to the RDP ISO8601 timestamp with nanoseconds.
+    '''
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, int):
+        return format_rdp_timestamp(value)
+    if isinstance(value, timedelta):
+        value = datetime.now(timezone.utc) + value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo = None)
+    return value.isoformat(timespec = 'microseconds') + '000Z' #example value 2020-07-13T08:54:53.619177000Z
+
+
+def parse_rdp_timestamp(timestamp):
+    '''
+    Parse an RDP ISO8601 timestamp (with 0 to 9 fraction digits) to integer nanoseconds since epoch.
+    '''
+    timestamp = timestamp.rstrip('Z')
+    seconds_part, _, fraction = timestamp.partition('.')
+    date_time = datetime.strptime(seconds_part, '%Y-%m-%dT%H:%M:%S')
+    nanoseconds = int((fraction + '000000000')[:9])
+    return calendar.timegm(date_time.utctimetuple()) * 1000000000 + nanoseconds
+
+
+def format_rdp_timestamp(nanoseconds):
+    '''
+    Format integer nanoseconds since epoch as an RDP ISO8601 timestamp with 9 fraction digits.
+    '''
+    seconds, fraction = divmod(nanoseconds, 1000000000)
+    date_time = datetime(1970, 1, 1) + timedelta(seconds = seconds)
+    return '%s.%09dZ' % (date_time.strftime('%Y-%m-%dT%H:%M:%S'), fraction)
+
+
+# -- Request message
+
+def events_payload(event_types = default_event_types, start = None, end = None, count = None, adjustments = default_adjustments):
+    '''
+    Build the /views/events query parameters, event_types and adjustments are a string or a list of strings.
+    '''
+    payload = {}
+    if event_types:
+        payload['eventTypes'] = event_types if isinstance(event_types, str) else ','.join(event_types)
+    if adjustments:
+        payload['adjustments'] = adjustments if isinstance(adjustments, str) else ','.join(adjustments)
+    if start is not None:
+        payload['start'] = to_rdp_timestamp(start)
+    if end is not None:
+        payload['end'] = to_rdp_timestamp(end)
+    if count is not None:
+        payload['count'] = count
+    return payload
+
+
+def get_events_page(client, universe, payload):
+    '''
+    Send one /views/events request and return the first universe result (a dict with headers and data), or None.
+    '''
+    response = client.get(rdp_endpoints.historical_pricing_events_url(universe, client.base_url), params = payload)
+    response.raise_for_status()
+    result = rdp_metrics.decode_json(response)
+    if isinstance(result, list):
+        result = result[0] if result else None
+    return result
+
+
+# -- Paginated reader
+
+def iter_events(client, universe, start, end = None, event_types = default_event_types, adjustments = default_adjustments,
+                page_size = max_page_size):
+    '''
+    Generator, yield EventsPage objects (newest events first) for all events of universe between start and end.
+
+    client is an rdp_http_client.RDPHttpClient object. start and end accept the same values as to_rdp_timestamp(), end
+    is now if None.
+    '''
+    start = to_rdp_timestamp(start)
+    start_ns = parse_rdp_timestamp(start) if start is not None else None
+    page_end = to_rdp_timestamp(end)
+    boundary_ns = None
+    # the number of events at boundary_ns that the previous pages returned
+    boundary_count = 0
+
+    while True:
+        payload = events_payload(event_types, start, page_end, page_size, adjustments)
+        result = get_events_page(client, universe, payload)
+        if not result or not result.get('data'):
+            return
+
+        headers = result.get('headers', [])
+        rows = result['data']
+        time_index = date_time_index(headers)
+
+        # `end` is inclusive, the page starts with the events at the boundary timestamp that the previous pages
+        # returned. They are skipped by count, two trades with the same values are two events
+        skipped = 0
+        if boundary_ns is not None:
+            while (skipped < min(boundary_count, len(rows))
+                   and parse_rdp_timestamp(rows[skipped][time_index]) == boundary_ns):
+                skipped += 1
+        data = rows[skipped:]
+
+        if data:
+            yield EventsPage(universe, headers, data)
+
+        if len(rows) < page_size:
+            return
+
+        oldest_ns = parse_rdp_timestamp(rows[-1][time_index])
+        oldest_count = 0
+        for row in reversed(rows):
+            if parse_rdp_timestamp(row[time_index]) != oldest_ns:
+                break
+            oldest_count += 1
+        if oldest_ns == boundary_ns and not data:
+            # the service cannot return the events above page_size of one timestamp, step the boundary back
+            warnings.warn('%s has %d or more events at %s, the events above %d at this timestamp are skipped, use a '
+                          'bigger page_size' % (universe, len(rows), format_rdp_timestamp(oldest_ns), len(rows)),
+                          RuntimeWarning)
+            oldest_ns -= 1
+            oldest_count = 0
+        boundary_ns = oldest_ns
+        boundary_count = oldest_count
+        page_end = format_rdp_timestamp(boundary_ns)
+
+        if start_ns is not None and boundary_ns <= start_ns:
+            return
+
+
+def date_time_index(headers):
+    '''
+    Return the index of the DATE_TIME column in the /views/events headers.
+    '''
+    for index, header in enumerate(headers):
+        if header.get('name') == 'DATE_TIME':
+            return index
+    return 0
+
+
+# -- Function Layer compatible DataFrame interface
+
+def events_to_dataframe(headers, data):
+    '''
+    Build a pandas DataFrame from the /views/events headers and data arrays, indexed by DATE_TIME.
+
+    The rows are transposed to columns once, then every column is converted as a whole: 'number' columns to float64 and
+    DATE_TIME to datetime64[ns] with the full nanoseconds precision of the RDP timestamps.
+    '''
+    with rdp_metrics.registry.timer('rdp_dataframe_build_seconds', 'historical-pricing-events'):
+        return _events_to_dataframe(headers, data)
+
+
+def _events_to_dataframe(headers, data):
+    import numpy as np
+    import pandas as pd
+
+    names = [header['name'] for header in headers]
+    columns = list(zip(*data)) if data else [()] * len(names)
+
+    frame_columns = {}
+    for header, name, values in zip(headers, names, columns):
+        if name == 'DATE_TIME':
+            frame_columns[name] = to_datetime64(values)
+        elif header.get('type') == 'number':
+            frame_columns[name] = np.array(values, dtype = np.float64)
+        else:
+            frame_columns[name] = np.array(values, dtype = object)
+
+    frame = pd.DataFrame(frame_columns, columns = names)
+    if 'DATE_TIME' in frame_columns:
+        frame = frame.set_index('DATE_TIME')
+        frame.index.name = 'Timestamp'
+    return frame
+
+
+def get_historical_price_events(universe, eventTypes = None, start = None, end = None, adjustments = None, count = 1,
+                                client = None):
+    '''
+    Direct call replacement of the RDP Libraries rdp.get_historical_price_events() function, returns a pandas DataFrame.
+
+    eventTypes and adjustments accept strings, lists of strings or the RDP Libraries enum values. client is an
+    rdp_http_client.RDPHttpClient object with a token manager, the shared client is used if None.
+    '''
+    if client is None:
+        from rdp_http_client import get_shared_client
+        client = get_shared_client()
+
+    event_types = _enum_values(eventTypes)
+    adjustments = _enum_values(adjustments)
+
+    if count is not None and count <= max_page_size:
+        result = get_events_page(client, universe, events_payload(event_types, start, end, count, adjustments))
+        if not result:
+            return events_to_dataframe([], [])
+        return events_to_dataframe(result.get('headers', []), result.get('data', []))
+
+    # more rows than one page, walk the time range
+    headers = []
+    data = []
+    for page in iter_events(client, universe, start, end, event_types, adjustments):
+        headers = page.headers
+        data.extend(page.data)
+        if count is not None and len(data) >= count:
+            del data[count:]
+            break
+    return events_to_dataframe(headers, data)
+
+
+def to_datetime64(values):
+    '''
+    Convert RDP timestamp strings to a numpy datetime64[ns] array.
+    '''
+    import numpy as np
+
+    # numpy parses ISO8601 with up to 9 fraction digits, only the trailing Z needs to go
+    timestamps = np.char.rstrip(np.asarray(values, dtype = str), 'Z')
+    return timestamps.astype('datetime64[ns]')
+
+
+def _enum_values(values):
+    if values is None or isinstance(values, str):
+        return values
+    if hasattr(values, 'value'):
+        return values.value
+    return [value.value if hasattr(value, 'value') else value for value in values]
@@ -0,0 +1,199 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Optional HTTP/2 and compressed transfer mode of the RDP APIs direct calls.
+
+requests speaks HTTP/1.1 only, so every concurrent request needs its own TCP+TLS connection. HTTP2Adapter is a requests
+transport adapter that sends the requests with one httpx.Client: the concurrent requests to api.refinitiv.com share one
+HTTP/2 connection (multiplexed streams), and the responses are negotiated with Accept-Encoding gzip, deflate, plus br if
+the brotli package is installed. The application code, the rdp_scheduler retries and the rdp_response_cache still get
+requests.Response objects.
+
+HTTP/2 is negotiated with TLS ALPN. A plain http:// base_URL (i.e. rdp_mock_server) uses HTTP/1.1 through httpx, the
+negotiated version is in response.http_version.
+
+The mode requires the httpx package with its HTTP/2 extra:
+
+    $>pip install httpx[http2] brotli
+
+Example:
+
+    client = RDPHttpClient(token_manager)
+    install_http2(client)
+
+Compare the transports with rdp_http2_benchmark.py.
+'''
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+def accept_encoding():
+    '''
+    Return the Accept-Encoding header value of the content codings that httpx can decode here.
+    '''
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli
+        encodings.append('br')
+    except ImportError:
+        try:
+            import brotlicffi
+            encodings.append('br')
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+
+class _StreamReader(object):
+    '''
+    File-like object over the decoded body of an httpx streaming response for requests.Response.raw.
+    '''
+
+    def __init__(self, response):
+        self._response = response
+        self._iterator = None
+        self._buffer = b''
+
+    def _chunks(self, chunk_size = None):
+        # httpx streams a response body once, stream() and read() share the same iterator
+        if self._iterator is None:
+            self._iterator = self._response.iter_bytes(chunk_size)
+        return self._iterator
+
+    def stream(self, chunk_size = 65536, decode_content = True):
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b''
+        for chunk in self._chunks(chunk_size):
+            yield chunk
+        self.close()
+
+    def read(self, size = -1, **kwargs):
+        chunks = self._chunks()
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    '''
+    requests transport adapter backed by an httpx.Client with HTTP/2. max_connections limits the open connections, an
+    HTTP/2 connection carries up to the server limit of concurrent streams (about 100). If compression is False, the
+    responses are requested with Accept-Encoding: identity. http1 = False sends HTTP/2 without TLS negotiation (prior
+    knowledge), for a local h2c server.
+
+    The verify, cert and proxies options of requests are set once for the httpx.Client with the same name arguments.
+    '''
+
+    def __init__(self, http2 = True, compression = True, max_connections = 10, verify = True, cert = None, proxies = None,
+                 http1 = True):
+        import httpx
+
+        BaseAdapter.__init__(self)
+        self.compression = compression
+        self.accept_encoding = accept_encoding() if compression else 'identity'
+        kwargs = {}
+        if proxies:
+            kwargs['proxy'] = proxies.get('https') or proxies.get('http')
+        self.client = httpx.Client(http1 = http1, http2 = http2, verify = verify, cert = cert,
+                                   limits = httpx.Limits(max_connections = max_connections,
+                                                         max_keepalive_connections = max_connections), **kwargs)
+        self._httpx = httpx
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None, proxies = None):
+        httpx = self._httpx
+        headers = dict(request.headers)
+        headers['Accept-Encoding'] = self.accept_encoding
+        # the HTTP/2 connection management is done by httpx, a hop-by-hop header is not allowed
+        headers.pop('Connection', None)
+
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            httpx_timeout = httpx.Timeout(read_timeout, connect = connect_timeout)
+        else:
+            httpx_timeout = httpx.Timeout(timeout)
+
+        httpx_request = self.client.build_request(request.method, request.url, headers = headers, content = request.body,
+                                                  timeout = httpx_timeout)
+        try:
+            httpx_response = self.client.send(httpx_request, stream = True)
+        except httpx.TimeoutException as exp:
+            raise requests.Timeout(exp, request = request)
+        except httpx.TransportError as exp:
+            raise requests.ConnectionError(exp, request = request)
+
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        # the body is decoded by httpx
+        response.headers = CaseInsensitiveDict((name, value) for name, value in httpx_response.headers.items()
+                                               if name.lower() not in ('content-encoding', 'content-length'))
+        response.headers['X-Content-Encoding'] = httpx_response.headers.get('content-encoding', 'identity')
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = _StreamReader(httpx_response)
+        response.http_version = httpx_response.http_version
+        response.connection = self
+        response._httpx_response = httpx_response
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+def install_http2(client, http2 = True, compression = True, max_connections = 10, http1 = True):
+    '''
+    Mount an HTTP2Adapter for all http:// and https:// URLs of an RDPHttpClient (or requests.Session) and return it.
+
+    A mounted rdp_response_cache.CachingAdapter keeps answering first and the HTTP2Adapter becomes its transport. Another
+    mounted adapter (i.e. an rdp_metrics.InstrumentedAdapter, which times the requests connection pool) raises ValueError,
+    see rdp_transport.install_transport().
+    '''
+    from rdp_transport import install_transport
+
+    adapter = HTTP2Adapter(http2 = http2, compression = compression, max_connections = max_connections, http1 = http1)
+    try:
+        return install_transport(client, adapter)
+    except ValueError:
+        adapter.close()
+        raise
+
+
+def downloaded_bytes(response):
+    '''
+    Return the bytes received on the wire for the body of a response (compressed size).
+    '''
+    httpx_response = getattr(response, '_httpx_response', None)
+    if httpx_response is not None:
+        return httpx_response.num_bytes_downloaded
+    if getattr(response.raw, 'tell', None) is not None:
+        try:
+            # urllib3 counts the raw (compressed) bytes read from the socket
+            return response.raw.tell()
+        except Exception:
+            pass
+    return len(response.content)
@@ -0,0 +1,142 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Benchmark of the RDPHttpClient transports: HTTP/1.1 with requests versus HTTP/2 with rdp_http2.HTTP2Adapter.
+
+Transports:
+- http1: requests connection pool, Accept-Encoding gzip, deflate (the requests default)
+- http1-identity: requests connection pool without compression
+- http2: HTTP2Adapter, HTTP/2 if the server negotiates it, gzip, deflate and br compression
+
+Every transport sends --requests requests of a workload with --concurrency threads and the benchmark prints the
+negotiated HTTP version, the throughput, the latency percentiles and the body KB per response on the wire and decoded.
+
+By default the benchmark starts rdp_mock_server with gzip responses and HTTP/2 (h2c with prior knowledge, the h2
+package is required), the http2 transport multiplexes its requests over plain http://. Use --base-url https://api.refinitiv.com with the RDP_APP_KEY, RDP_LOGIN and RDP_PASSWORD
+environment variables to measure HTTP/2 multiplexing against RDP.
+
+Run it in a console with:
+
+    $>python rdp_http2_benchmark.py --requests 200 --concurrency 16
+'''
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rdp_benchmark import percentile, universes
+
+transports = ['http1', 'http1-identity', 'http2']
+workloads = ['pricing', 'esg']
+
+events_count = 500
+# ESG responses of 50 RICs per request, the size of a packed rdp_request_planner request
+esg_universe = ','.join(universes * 5)
+
+
+def _client(transport, base_url, concurrency, prior_knowledge = False):
+    from rdp_http_client import RDPHttpClient
+    from rdp_token_manager import RDPTokenManager
+    import rdp_http2
+
+    client = RDPHttpClient(base_url = base_url, pool_maxsize = concurrency)
+    if transport == 'http1-identity':
+        client.session.headers['Accept-Encoding'] = 'identity'
+    elif transport == 'http2':
+        # an HTTP/2 connection is shared by all threads, HTTP/1.1 needs one connection per thread
+        # over http:// there is no ALPN, HTTP/2 needs prior knowledge of the server
+        rdp_http2.install_http2(client, max_connections = concurrency, http1 = not prior_knowledge)
+    client.token_manager = RDPTokenManager(os.environ.get('RDP_APP_KEY', ''), os.environ.get('RDP_LOGIN', ''),
+                                           os.environ.get('RDP_PASSWORD', ''), base_url = base_url, http = client.session)
+    client.token_manager.open()
+    return client
+
+
+def run_transport(transport, workload, base_url, request_count, concurrency, prior_knowledge = False):
+    '''
+    Return a result dict of one transport and workload. prior_knowledge makes the http2 transport start HTTP/2 without
+    negotiation, for an http:// server that speaks HTTP/2 (i.e. rdp_mock_server with http2 = True).
+    '''
+    import rdp_http2
+    import rdp_json_codec
+
+    client = _client(transport, base_url, concurrency, prior_knowledge)
+
+    def send(index):
+        started = time.perf_counter()
+        if workload == 'pricing':
+            response = client.get_historical_pricing_events(universes[index % len(universes)],
+                                                            params = {'eventTypes': 'trade', 'count': events_count})
+        else:
+            response = client.get_esg_scores_full(esg_universe)
+        content = response.content
+        rdp_json_codec.decode_response(response)
+        return (time.perf_counter() - started, response.status_code, getattr(response, 'http_version', 'HTTP/1.1'),
+                rdp_http2.downloaded_bytes(response), len(content))
+
+    try:
+        # warm up the connections and the token
+        send(0)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers = concurrency) as executor:
+            samples = list(executor.map(send, range(request_count)))
+        elapsed = time.perf_counter() - started
+    finally:
+        client.token_manager.close()
+        client.close()
+
+    latencies = [sample[0] for sample in samples]
+    return {
+        'transport': transport,
+        'workload': workload,
+        'version': ','.join(sorted(set(sample[2] for sample in samples))),
+        'errors': sum(1 for sample in samples if sample[1] != 200),
+        'throughput': round(request_count / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'wire_kb': round(sum(sample[3] for sample in samples) / 1024.0 / request_count, 1),
+        'decoded_kb': round(sum(sample[4] for sample in samples) / 1024.0 / request_count, 1)
+    }
+
+
+def print_results(results):
+    columns = ['transport', 'workload', 'version', 'errors', 'throughput', 'p50_ms', 'p99_ms', 'wire_kb', 'decoded_kb']
+    print(''.join('%-16s' % column for column in columns))
+    for result in results:
+        print(''.join('%-16s' % result[column] for column in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'RDPHttpClient HTTP/1.1 versus HTTP/2 and compression benchmark')
+    parser.add_argument('--transports', nargs = '+', choices = transports, default = transports)
+    parser.add_argument('--workloads', nargs = '+', choices = workloads, default = workloads)
+    parser.add_argument('--requests', type = int, default = 100)
+    parser.add_argument('--concurrency', type = int, default = 16)
+    parser.add_argument('--latency', type = float, default = 0.02, help = 'mock server response delay in seconds')
+    parser.add_argument('--base-url', help = 'use a running server instead of starting the mock server')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        from rdp_mock_server import start_mock_server
+        server = start_mock_server(latency = args.latency, compress = True, http2 = True)
+        base_url = server.base_url
+
+    try:
+        print_results([run_transport(transport, workload, base_url, args.requests, args.concurrency,
+                                     prior_knowledge = server is not None)
+                       for workload in args.workloads for transport in args.transports])
+    finally:
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,139 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Pooled keep-alive HTTP client for the RDP APIs direct calls.
+
+The module level requests.get()/requests.post() functions open a new TCP+TLS connection to api.refinitiv.com for every
+call. The RDPHttpClient class keeps one requests.Session object with a sized connection pool, so the ESG, Business
+summary, IPA and Historical Pricing requests reuse the same connections.
+'''
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rdp_endpoints
+import rdp_json_codec
+
+
+class RDPHttpClient(object):
+    '''
+    One requests.Session with a connection pool shared by all RDP APIs Service Endpoints.
+
+    pool_connections is the number of per-host pools kept open and pool_maxsize is the number of keep-alive connections
+    kept for each host. If pool_block is True, the requests wait for a free connection instead of opening a new one
+    above pool_maxsize. The Authorization header comes from token_manager (see rdp_token_manager.RDPTokenManager). If
+    scheduler (see rdp_scheduler.RequestScheduler) is set, every request is sent through it.
+    '''
+
+    def __init__(self, token_manager = None, base_url = rdp_endpoints.base_URL, pool_connections = 4, pool_maxsize = 10,
+                 pool_block = False, keep_alive = True, timeout = 30, headers = None, scheduler = None):
+        self.token_manager = token_manager
+        self.scheduler = scheduler
+        self.base_url = base_url
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = pool_connections, pool_maxsize = pool_maxsize, pool_block = pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Content-Type is set per request, the RDP Auth Service requests are form encoded
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Connection': 'keep-alive' if keep_alive else 'close'
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+    # -- Generic HTTP operations
+
+    def request(self, method, url, params = None, body = None, headers = None, **kwargs):
+        '''
+        Send a HTTP request with the bearer token. The body (a dict or list) is sent as a JSON message encoded by
+        rdp_json_codec.
+        '''
+        request_headers = {}
+        if self.token_manager is not None:
+            request_headers.update(self.token_manager.get_bearer_header())
+        if body is not None:
+            request_headers['Content-Type'] = 'application/json'
+            kwargs['data'] = rdp_json_codec.dumps(body)
+        if headers:
+            request_headers.update(headers)
+        kwargs.setdefault('timeout', self.timeout)
+
+        if self.scheduler is None:
+            return self.session.request(method, url, params = params, headers = request_headers, **kwargs)
+
+        def send_request():
+            if self.token_manager is not None:
+                # a retried request gets the Access Token refreshed during the backoff
+                request_headers.update(self.token_manager.get_bearer_header())
+            return self.session.request(method, url, params = params, headers = request_headers, **kwargs)
+        return self.scheduler.send(url, send_request)
+
+    def get(self, url, params = None, **kwargs):
+        return self.request('GET', url, params = params, **kwargs)
+
+    def post(self, url, body = None, **kwargs):
+        return self.request('POST', url, body = body, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # -- RDP APIs Service Endpoints
+
+    def get_historical_pricing_events(self, universe, params = None, **kwargs):
+        return self.get(rdp_endpoints.historical_pricing_events_url(universe, self.base_url), params = params, **kwargs)
+
+    def get_historical_pricing_events_universes(self, universes, params = None, **kwargs):
+        params = dict(params or {})
+        params['universe'] = universes if isinstance(universes, str) else ','.join(universes)
+        return self.get(rdp_endpoints.historical_pricing_events_universes_url(self.base_url), params = params, **kwargs)
+
+    def get_esg_scores_full(self, universe, **kwargs):
+        return self.get(rdp_endpoints.esg_scores_full_url(self.base_url), params = {'universe': universe}, **kwargs)
+
+    def get_business_summary(self, universe, **kwargs):
+        return self.get(rdp_endpoints.business_summary_url(universe, self.base_url), **kwargs)
+
+    def post_financial_contracts(self, ipa_request_message, **kwargs):
+        return self.post(rdp_endpoints.financial_contracts_url(self.base_url), body = ipa_request_message, **kwargs)
+
+
+_shared_client = None
+_shared_kwargs = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client(**kwargs):
+    '''
+    Return the process wide RDPHttpClient object, create it with kwargs on the first call. The next calls pass no kwargs
+    or the same kwargs, other kwargs raise ValueError because the existing client cannot use them.
+    '''
+    global _shared_client, _shared_kwargs
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = RDPHttpClient(**kwargs)
+            _shared_kwargs = kwargs
+        elif kwargs and kwargs != _shared_kwargs:
+            raise ValueError('The shared RDPHttpClient is already created with other settings: %s'
+                             % ', '.join(sorted(set(kwargs) | set(_shared_kwargs))))
+    return _shared_client
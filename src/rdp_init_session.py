@@ -46,64 +46,36 @@ except Exception as exp:
 
 # --------------------------- RDP API Direct Call -------------------------------------
 
-import requests
+from rdp_http_client import get_shared_client
+from rdp_token_manager import RDPTokenManager
 
-scope = 'trapi'
-client_secret = ''
+# All RDP APIs requests share one pooled keep-alive HTTP client
+client = get_shared_client()
 
-RDP_version = "/v1"
-base_URL = "https://api.refinitiv.com"
-category_URL = "/auth/oauth2"
-service_endpoint_URL = "/token"
-
-auth_endpoint = base_URL + category_URL + RDP_version + service_endpoint_URL #https://api.refinitiv.com/auth/oauth2/v1/token
+# The token manager sends the password grant once and keeps the Access Token valid with the refresh_token grant
+token_manager = RDPTokenManager(APP_KEY, RDP_LOGIN, RDP_PASSWORD, http = client.session)
 
 auth_obj = None
-response = None
 
 # -- Init and Authenticate Session
 
-auth_request_msg = {
-    'username': RDP_LOGIN,
-	'password': RDP_PASSWORD,
-	'grant_type': "password",
-	'scope': scope,
-	'takeExclusiveSignOnControl': "true"
-}
-
 try:
-    response = requests.post(auth_endpoint, headers = {'Accept':'application/json'}, data = auth_request_msg, auth = (APP_KEY,client_secret))
-except Exception as exp:
-	print('Caught exception: %s' % str(exp))
-
-if response.status_code == 200:  # HTTP Status 'OK'
+    auth_obj = token_manager.open()
     print('RDP APIs: Authentication success')
-    auth_obj = response.json()
     print('RDP access_token = %s' % auth_obj['access_token'])
     print('RDP refresh_token = %s' % auth_obj['refresh_token'])
     print('RDP expires_in = %d' % int(auth_obj['expires_in']))
-else:
-    print('RDP APIs: Authentication result failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
+except Exception as exp:
+    print('RDP APIs: Authentication result failure: %s' % str(exp))
 
 # -- Close Session, sending revoke access token request 
-close_request_msg = {
-    'token': auth_obj['access_token']
-}
-
-service_endpoint_URL = "/revoke"
-
-revoke_endpoint = base_URL + category_URL + RDP_version + service_endpoint_URL #https://api.refinitiv.com/auth/oauth2/v1/revoke
 
 try:
-    response = requests.post(revoke_endpoint, headers = {'Accept':'application/json'}, data = close_request_msg, auth = (APP_KEY,client_secret))
+    response = token_manager.close()
+    if response is not None:
+        print('RDP APIs: Revoke access token success')
+        print(response)
 except Exception as exp:
-	print('Caught exception: %s' % str(exp))
-
-if response.status_code == 200:  # HTTP Status 'OK'
-    print('RDP APIs: Revoke access token success')
-    print(response)
-else:
-    print('RDP APIs: Revoke access token failure: %s %s' % (response.status_code, response.reason))
-    print('Text: %s' % (response.text))
-
+    print('RDP APIs: Revoke access token failure: %s' % str(exp))
+finally:
+    client.close()
@@ -0,0 +1,169 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Batched RDP Instrument Pricing Analytics (IPA) /financial-contracts direct calls.
+
+The FinancialContractsPricer class takes any number of instrument definitions (the items of the ipa_request_message
+universe list), packs them into request messages of at most chunk_size contracts, sends the chunks concurrently with
+rdp_async_client and joins the Data/Headers outputs into one result keyed by instrumentTag. With a
+rdp_valuation_cache.ValuationCache, the contracts with a cached valuation are not sent and the identical contracts of
+the universe are priced once.
+
+Example:
+
+    pricer = FinancialContractsPricer(client)
+    result = pricer.price(fx_forward_contracts)
+    print(result.data['FX_deal_001'])
+'''
+
+import collections
+import copy
+
+import rdp_async_client
+import rdp_valuation_cache
+
+default_fields = ['InstrumentTag', 'StartDate', 'EndDate', 'FxSpot', 'FxSwapsCcy1Ccy2', 'FxOutrightCcy1Ccy2']
+default_outputs = ['Data', 'Headers']
+
+# the number of contracts sent in one /financial-contracts request
+max_chunk_size = 100
+
+# headers: list of field names, data: {instrumentTag: {field name: value}}, errors: {instrumentTag: error message}
+PricingResult = collections.namedtuple('PricingResult', ['headers', 'data', 'errors'])
+
+
+class FinancialContractsPricer(object):
+    '''
+    Price many financial contracts with /financial-contracts. client is an rdp_http_client.RDPHttpClient object with a
+    token manager.
+    '''
+
+    def __init__(self, client, fields = default_fields, outputs = default_outputs, chunk_size = max_chunk_size, concurrency = 4,
+                 cache = None):
+        self.client = client
+        self.cache = cache
+        self.fields = list(fields)
+        if 'InstrumentTag' not in self.fields:
+            self.fields.insert(0, 'InstrumentTag')
+        self.outputs = list(outputs)
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+
+    def request_messages(self, universe):
+        '''
+        Split the contracts to a list of ipa_request_message dicts of at most chunk_size contracts.
+
+        A contract without instrumentDefinition.instrumentTag gets the tag 'contract_<position>' so that the results can
+        be matched with it. Two contracts with the same instrumentTag raise ValueError, the result has one row per tag.
+        '''
+        contracts = self._tag_contracts(universe)
+        return [{
+            'fields': self.fields,
+            'outputs': self.outputs,
+            'universe': contracts[index:index + self.chunk_size]
+        } for index in range(0, len(contracts), self.chunk_size)]
+
+    def price(self, universe):
+        '''
+        Price all contracts, return a PricingResult. The contracts are tagged as in request_messages().
+        '''
+        headers = list(self.fields)
+        data = {}
+        errors = {}
+
+        # the cached contracts are answered without a request, an identical contract is sent once
+        duplicates = {}
+        first_of_key = {}
+        pending = []
+        for contract in self._tag_contracts(universe):
+            tag = contract['instrumentDefinition']['instrumentTag']
+            if self.cache is None or not rdp_valuation_cache.cacheable(contract):
+                pending.append(contract)
+                continue
+            key = rdp_valuation_cache.contract_key(contract, self.fields)
+            if key in first_of_key:
+                duplicates[tag] = first_of_key[key]
+                continue
+            values = self.cache.get(key)
+            if values is not None:
+                data[tag] = dict(values, InstrumentTag = tag)
+                continue
+            first_of_key[key] = tag
+            pending.append(contract)
+
+        results = []
+        if pending:
+            results = rdp_async_client.fetch_all('ipa', self.request_messages(pending), client = self.client,
+                                                 concurrency = self.concurrency)
+        for result in results:
+            tags = [contract['instrumentDefinition']['instrumentTag'] for contract in result.universe['universe']]
+            if result.error is not None:
+                for tag in tags:
+                    errors[tag] = str(result.error)
+                continue
+
+            chunk_headers, chunk_data = parse_response(result.data)
+            if chunk_headers:
+                headers = chunk_headers
+            tag_index = headers.index('InstrumentTag') if 'InstrumentTag' in headers else 0
+            for row in chunk_data:
+                data[row[tag_index]] = dict(zip(headers, row))
+            for tag in tags:
+                if tag not in data:
+                    errors[tag] = 'No data returned for %s' % tag
+
+        if self.cache is not None:
+            valuations = {}
+            for key, tag in first_of_key.items():
+                values = rdp_valuation_cache.valuation_values(data[tag]) if tag in data else None
+                if values is not None:
+                    valuations[key] = values
+            self.cache.put_many(valuations)
+        for tag, first in duplicates.items():
+            if first in data:
+                data[tag] = dict(data[first], InstrumentTag = tag)
+            else:
+                errors[tag] = errors.get(first, 'No data returned for %s' % tag)
+
+        return PricingResult(headers, data, errors)
+
+    def _tag_contracts(self, universe):
+        # a contract without instrumentDefinition.instrumentTag gets the tag 'contract_<position>'
+        universe = list(universe)
+        tags = collections.Counter(contract.get('instrumentDefinition', {}).get('instrumentTag') for contract in universe)
+        tags.pop(None, None)
+        tags.pop('', None)
+        duplicates = sorted(tag for tag, count in tags.items() if count > 1)
+        if duplicates:
+            raise ValueError('Duplicate instrumentTag %s, the contracts of a request need distinct tags' % ', '.join(duplicates))
+
+        contracts = []
+        for position, contract in enumerate(universe):
+            if not contract.get('instrumentDefinition', {}).get('instrumentTag'):
+                tag = 'contract_%d' % position
+                while tag in tags:
+                    # a tag of the universe already has this name
+                    tag += '_'
+                tags[tag] = 1
+                contract = copy.deepcopy(contract)
+                contract.setdefault('instrumentDefinition', {})['instrumentTag'] = tag
+            contracts.append(contract)
+        return contracts
+
+
+def parse_response(response_json):
+    '''
+    Return (field names, rows) from a /financial-contracts JSON response message.
+    '''
+    headers = response_json.get('headers', response_json.get('Headers', []))
+    data = response_json.get('data', response_json.get('Data', []))
+    return [header['name'] if isinstance(header, dict) else header for header in headers], data
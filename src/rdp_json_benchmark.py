@@ -0,0 +1,114 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Benchmark of the installed rdp_json_codec JSON codecs on RDP-like messages.
+
+The payloads are the messages of rdp_mock_server: a Historical Pricing /views/events response, an ESG /views/scores-full
+response for many RICs, an IPA /financial-contracts request message and its response. For every codec the benchmark
+measures dumps() (the request bodies) and loads() of bytes and of a memoryview (the responses), and prints the best
+time of --repeat runs with the speed up against the Python json module.
+
+Run it in a console with:
+
+    $>python rdp_json_benchmark.py --repeat 5
+'''
+
+import argparse
+import time
+
+import rdp_json_codec
+import rdp_mock_server
+
+
+def ipa_contracts(count):
+    return {
+        'fields': ['InstrumentTag', 'StartDate', 'EndDate', 'FxSpot', 'FxSwapsCcy1Ccy2', 'FxOutrightCcy1Ccy2'],
+        'outputs': ['Data', 'Headers'],
+        'universe': [{
+            'instrumentType': 'FxCross',
+            'instrumentDefinition': {
+                'instrumentTag': 'FX_deal_%03d' % index,
+                'fxCrossType': 'FxForward',
+                'fxCrossCode': 'EURGBP',
+                'legs': [{'tenor': '%dM' % (1 + index % 12)}]
+            },
+            'pricingParameters': {
+                'valuationDate': '2019-02-02T00:00:00Z',
+                'priceSide': 'Mid'
+            }
+        } for index in range(count)]
+    }
+
+
+def payloads(events, rics, contracts):
+    '''
+    Return [(name, message)] of the benchmark messages.
+    '''
+    ipa_request_message = ipa_contracts(contracts)
+    return [
+        ('pricing events x%d' % events, rdp_mock_server.events_message('IBM.N', {'count': events})),
+        ('esg scores-full x%d' % rics, rdp_mock_server.esg_message(['RIC%04d.N' % index for index in range(rics)])),
+        ('ipa request x%d' % contracts, ipa_request_message),
+        ('ipa response x%d' % contracts, rdp_mock_server.financial_contracts_message(ipa_request_message))
+    ]
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmark(events = 10000, rics = 500, contracts = 100, repeat = 5):
+    '''
+    Return a list of result dicts: payload, size, codec, operation, seconds.
+    '''
+    results = []
+    for name, message in payloads(events, rics, contracts):
+        body = rdp_json_codec.load_codec('json').dumps(message)
+        for codec in rdp_json_codec.available_codecs():
+            operations = [
+                ('dumps', lambda: codec.dumps(message)),
+                ('loads bytes', lambda: codec.loads(body)),
+                ('loads memoryview', lambda: codec.loads(memoryview(body)))
+            ]
+            for operation, function in operations:
+                results.append({'payload': name, 'size': len(body), 'codec': codec.name, 'operation': operation,
+                                'seconds': best_time(function, repeat)})
+    return results
+
+
+def print_results(results):
+    baseline = {(result['payload'], result['operation']): result['seconds'] for result in results if result['codec'] == 'json'}
+    print('%-22s %9s %-7s %-17s %10s %9s %8s' % ('payload', 'size KB', 'codec', 'operation', 'ms', 'MB/s', 'speed up'))
+    for result in results:
+        seconds = result['seconds']
+        print('%-22s %9.1f %-7s %-17s %10.3f %9.1f %7.1fx' % (
+            result['payload'], result['size'] / 1024.0, result['codec'], result['operation'], seconds * 1000,
+            result['size'] / seconds / 1e6, baseline[(result['payload'], result['operation'])] / seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'JSON codec benchmark on RDP-like messages')
+    parser.add_argument('--events', type = int, default = 10000, help = 'Historical Pricing events')
+    parser.add_argument('--rics', type = int, default = 500, help = 'ESG universe size')
+    parser.add_argument('--contracts', type = int, default = 100, help = 'IPA contracts')
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args()
+
+    print('JSON codecs: %s, rdp_json_codec uses %s' % (', '.join(codec.name for codec in rdp_json_codec.available_codecs()),
+                                                     rdp_json_codec.codec.name))
+    print_results(run_benchmark(args.events, args.rics, args.contracts, args.repeat))
@@ -0,0 +1,119 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Pluggable JSON codec of the RDP APIs direct calls.
+
+The request bodies (i.e. the IPA ipa_request_message) and the responses go through dumps() and loads() of this module.
+They use the fastest installed codec: orjson, then ujson, then the Python json module. Set the RDP_JSON_CODEC
+environment variable, or call set_codec(), to choose one. An unknown or not installed RDP_JSON_CODEC is reported with a
+RuntimeWarning and the Python json module is used.
+
+dumps() returns UTF-8 bytes, ready for the HTTP request body. loads() takes bytes, bytearray, memoryview or str. orjson
+decodes bytes and memoryview objects directly, without an intermediate str copy of the body.
+
+The codecs encode the same messages, except the dict keys that are not str: the json module and ujson convert int,
+float, bool and None keys to strings, orjson raises TypeError for them (its OPT_NON_STR_KEYS option is not used). The
+RDP request messages only have str keys.
+
+The RDP Libraries decode their responses with their own JSON code, response.data.raw does not use this codec.
+
+Compare the codecs with rdp_json_benchmark.py.
+'''
+
+import json
+import os
+import warnings
+
+codec_names = ('orjson', 'ujson', 'json')
+
+
+class JSONCodec(object):
+    '''
+    name, dumps(obj) -> bytes and loads(bytes, bytearray, memoryview or str) -> obj of one JSON library.
+    '''
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+def load_codec(name):
+    '''
+    Return the JSONCodec of name ('orjson', 'ujson' or 'json'), raise ImportError if its library is not installed.
+    '''
+    if name == 'orjson':
+        import orjson
+        return JSONCodec(name, orjson.dumps, orjson.loads)
+
+    if name == 'ujson':
+        import ujson
+
+        def ujson_loads(data):
+            return ujson.loads(data.tobytes() if isinstance(data, memoryview) else data)
+        return JSONCodec(name, lambda obj: ujson.dumps(obj, ensure_ascii = False).encode('utf-8'), ujson_loads)
+
+    if name == 'json':
+        def json_loads(data):
+            return json.loads(data.tobytes() if isinstance(data, memoryview) else data)
+        return JSONCodec(name, lambda obj: json.dumps(obj, ensure_ascii = False).encode('utf-8'), json_loads)
+
+    raise ValueError('Unknown JSON codec %s, use one of %s' % (name, ', '.join(codec_names)))
+
+
+def available_codecs():
+    codecs = []
+    for name in codec_names:
+        try:
+            codecs.append(load_codec(name))
+        except ImportError:
+            pass
+    return codecs
+
+
+def set_codec(name = None):
+    '''
+    Use the codec name for dumps() and loads(), or the fastest installed codec if name is None.
+    '''
+    global codec
+    codec = load_codec(name) if name else available_codecs()[0]
+    return codec
+
+
+def dumps(obj):
+    return codec.dumps(obj)
+
+
+def loads(data):
+    return codec.loads(data)
+
+
+def decode_response(response):
+    '''
+    Decode the JSON body of a requests.Response. The replayed responses (see rdp_transport) are decoded from their
+    memory-mapped body, without a copy with orjson only: the ujson and json codecs copy it to bytes first.
+    '''
+    body_view = getattr(response, 'body_view', None)
+    return codec.loads(body_view if body_view is not None else response.content)
+
+
+def _environment_codec():
+    name = os.environ.get('RDP_JSON_CODEC')
+    try:
+        return set_codec(name)
+    except (ImportError, ValueError) as exp:
+        # a wrong setting must not break the import of every module of the applications
+        warnings.warn('RDP_JSON_CODEC=%s cannot be used (%s), the json module is used' % (name, exp), RuntimeWarning)
+        return set_codec('json')
+
+
+codec = _environment_codec()
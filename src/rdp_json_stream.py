@@ -0,0 +1,185 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Streaming JSON decoding of the large RDP APIs responses.
+
+response.json() keeps the whole body as bytes and as nested Python objects at the same time. iter_response() parses
+the body while it is downloaded and yields the members of the message as JSONEvent tuples:
+- ('meta', element, name, value) for every member except the data array, i.e. headers, universe, links,
+- ('row', element, 'data', row) for every row of the data array.
+
+element is the position of the universe element in a Historical Pricing response list (0 for an ESG message). The
+events come in the message order: Historical Pricing sends the headers before the data rows, ESG /views/scores-full
+sends them after the rows. Only one row is decoded at a time, so the memory use depends on the row width and not on the
+response size (about 0.3 MB instead of 235 MB for 200,000 events).
+
+The RDP Libraries Endpoint object reads the whole response before it returns response.data.raw, the streaming mode is
+available for the direct calls only.
+
+Example:
+
+    response = client.get_esg_scores_full(universe, stream = True)
+    for event in iter_response(response):
+        if event.kind == 'row':
+            print(event.value[0])
+'''
+
+import codecs
+import collections
+import json
+import re
+
+import requests
+
+JSONEvent = collections.namedtuple('JSONEvent', ['kind', 'element', 'name', 'value'])
+
+default_chunk_size = 64 * 1024
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class _JSONReader(object):
+    '''
+    Read JSON tokens and values from an iterable of bytes chunks, the consumed text is dropped from the buffer.
+    '''
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._text_decoder.decode(chunk) if not isinstance(chunk, str) else chunk
+            if text:
+                if self._position >= default_chunk_size:
+                    self._buffer = self._buffer[self._position:]
+                    self._position = 0
+                self._buffer += text
+                return True
+        self._buffer += self._text_decoder.decode(b'', final = True)
+        self._eof = True
+        return False
+
+    def peek(self):
+        while True:
+            self._position = _whitespace.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill() and self._position >= len(self._buffer):
+                raise ValueError('Unexpected end of the JSON message')
+
+    def next_char(self):
+        char = self.peek()
+        self._position += 1
+        return char
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char not in chars:
+            raise ValueError('Expected %s at %d, got %r' % (' or '.join(chars), self._position, char))
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # read until the pending text doubles, so that a large value is not parsed again for every chunk
+            pending = len(self._buffer) - self._position
+            while self._fill() and len(self._buffer) - self._position < 2 * pending:
+                pass
+
+
+def iter_message(chunks, data_key = 'data'):
+    '''
+    Generator of the JSONEvent tuples of a JSON object, or of a list of JSON objects, read from the bytes chunks.
+    '''
+    reader = _JSONReader(chunks)
+    if reader.peek() != '[':
+        for event in _iter_object(reader, data_key, 0):
+            yield event
+        return
+
+    reader.next_char()
+    if reader.peek() == ']':
+        return
+    element = 0
+    while True:
+        for event in _iter_object(reader, data_key, element):
+            yield event
+        if reader.expect(',]') == ']':
+            return
+        element += 1
+
+
+def _iter_object(reader, data_key, element):
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.next_char()
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == data_key and reader.peek() == '[':
+            reader.next_char()
+            if reader.peek() == ']':
+                reader.next_char()
+            else:
+                while True:
+                    yield JSONEvent('row', element, name, reader.value())
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            yield JSONEvent('meta', element, name, reader.value())
+        if reader.expect(',}') == '}':
+            return
+
+
+def iter_response(response, data_key = 'data', chunk_size = default_chunk_size):
+    '''
+    Generator of the JSONEvent tuples of a requests.Response. Send the request with stream = True, otherwise the body is
+    already in memory. Raise requests.HTTPError if the HTTP status is not 200 (OK).
+    '''
+    if response.status_code != 200:  # HTTP Status 'OK'
+        response.close()
+        raise requests.HTTPError('%s %s' % (response.status_code, response.reason), response = response)
+    try:
+        for event in iter_message(response.iter_content(chunk_size), data_key):
+            yield event
+    finally:
+        response.close()
+
+
+def iter_rows(response, data_key = 'data', chunk_size = default_chunk_size):
+    '''
+    Generator of (element, headers, row) tuples, headers is the headers member of the element if it comes before the
+    rows, else None.
+    '''
+    headers = {}
+    for event in iter_response(response, data_key, chunk_size):
+        if event.kind == 'row':
+            yield event.element, headers.get(event.element), event.value
+        elif event.name == 'headers':
+            headers[event.element] = event.value
@@ -0,0 +1,296 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Per-request timing instrumentation of the RDP APIs direct calls and the RDP Libraries calls.
+
+The metrics are histograms (in seconds) labelled by Service Endpoint (see rdp_endpoints.endpoint_name()):
+- rdp_dns_seconds, rdp_connect_seconds, rdp_tls_seconds: new connection set up, rdp_connections_total counts the new
+  and the reused connections,
+- rdp_ttfb_seconds: from the request sent on an open connection to the response headers,
+- rdp_download_seconds: response body download,
+- rdp_json_decode_seconds: the response JSON decoding (rdp_json_codec) through decode_json(),
+- rdp_dataframe_build_seconds: DataFrame build of rdp_historical_pricing,
+- rdp_library_call_seconds: the RDP Libraries calls wrapped by instrument_library().
+
+Enable the direct call instrumentation with instrument(client) and export the metrics with
+registry.to_prometheus() or registry.write('rdp_metrics.prom') in the Prometheus text format.
+'''
+
+import contextlib
+import functools
+import socket
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+import rdp_endpoints
+import rdp_json_codec
+
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(object):
+    '''
+    Cumulative histogram of observed values with the Prometheus bucket semantic (le = less or equal).
+    '''
+
+    def __init__(self, buckets = default_buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry(object):
+    '''
+    Histograms and counters labelled by endpoint. enabled = False makes observe() and timer() free.
+    '''
+
+    def __init__(self, buckets = default_buckets):
+        self.buckets = buckets
+        self.enabled = True
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, endpoint, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get((metric, endpoint))
+            if histogram is None:
+                histogram = self._histograms[(metric, endpoint)] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, metric, labels, value = 1):
+        if not self.enabled:
+            return
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, metric, endpoint):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, endpoint, time.perf_counter() - started)
+
+    def histogram(self, metric, endpoint):
+        return self._histograms.get((metric, endpoint))
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_prometheus(self):
+        '''
+        Return all metrics in the Prometheus text exposition format.
+        '''
+        lines = []
+        with self._lock:
+            for metric in sorted(set(metric for metric, _ in self._histograms)):
+                lines.append('# TYPE %s histogram' % metric)
+                for (name, endpoint), histogram in sorted(self._histograms.items()):
+                    if name != metric:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append('%s_bucket{endpoint="%s",le="%s"} %d' % (metric, endpoint, bound, count))
+                    lines.append('%s_bucket{endpoint="%s",le="+Inf"} %d' % (metric, endpoint, histogram.count))
+                    lines.append('%s_sum{endpoint="%s"} %.9f' % (metric, endpoint, histogram.sum))
+                    lines.append('%s_count{endpoint="%s"} %d' % (metric, endpoint, histogram.count))
+            for metric in sorted(set(metric for metric, _ in self._counters)):
+                lines.append('# TYPE %s counter' % metric)
+                for (name, labels), value in sorted(self._counters.items()):
+                    if name == metric:
+                        label_text = ','.join('%s="%s"' % label for label in labels)
+                        lines.append('%s{%s} %d' % (metric, label_text, value))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        with open(path, 'w') as metrics_file:
+            metrics_file.write(self.to_prometheus())
+
+
+# the process wide registry used by the instrumented code
+registry = MetricsRegistry()
+
+
+def decode_json(response, metrics = None):
+    '''
+    Decode the JSON body of response with rdp_json_codec, timed as rdp_json_decode_seconds.
+    '''
+    metrics = metrics or registry
+    with metrics.timer('rdp_json_decode_seconds', rdp_endpoints.endpoint_name(response.url or '')):
+        return rdp_json_codec.decode_response(response)
+
+
+# -- requests/urllib3 connection timing
+
+_current = threading.local()
+
+
+class _TimedConnectionMixin(object):
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(),
+                                                                    socket.SOCK_STREAM)]
+        except socket.gaierror:
+            # urllib3 resolves the host again and raises its NameResolutionError
+            addresses = [None]
+        resolved = time.perf_counter()
+
+        # connect to the resolved addresses in order (i.e. the IPv4 address after an unreachable IPv6 one) as
+        # urllib3.util.connection.create_connection does, so that the connect time does not include a second
+        # resolution. The last failure is raised to urllib3, that applies the retries of the adapter
+        dns_host = self._dns_host
+        try:
+            for position, address in enumerate(addresses):
+                if address is not None:
+                    self._dns_host = address
+                try:
+                    sock = super(_TimedConnectionMixin, self)._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if position == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        connected = time.perf_counter()
+
+        _current.dns = resolved - started
+        _current.connect = connected - resolved
+        return sock
+
+    def connect(self):
+        started = time.perf_counter()
+        _current.dns = _current.connect = 0.0
+        super(_TimedConnectionMixin, self).connect()
+        total = time.perf_counter() - started
+        _current.new_connection = True
+        _current.setup = total
+        _current.tls = max(0.0, total - _current.dns - _current.connect) if isinstance(self, HTTPSConnection) else 0.0
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    '''
+    requests transport adapter that records the connection, TTFB and download times of every request.
+    '''
+
+    def __init__(self, metrics = None, **kwargs):
+        self.metrics = metrics or registry
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    def send(self, request, stream = False, **kwargs):
+        endpoint = rdp_endpoints.endpoint_name(request.url)
+        _current.new_connection = False
+        _current.setup = 0.0
+
+        started = time.perf_counter()
+        response = HTTPAdapter.send(self, request, stream = stream, **kwargs)
+        headers_received = time.perf_counter()
+
+        metrics = self.metrics
+        if _current.new_connection:
+            metrics.observe('rdp_dns_seconds', endpoint, _current.dns)
+            metrics.observe('rdp_connect_seconds', endpoint, _current.connect)
+            metrics.observe('rdp_tls_seconds', endpoint, _current.tls)
+        metrics.increment('rdp_connections_total', {'endpoint': endpoint, 'reused': str(not _current.new_connection).lower()})
+        metrics.observe('rdp_ttfb_seconds', endpoint, headers_received - started - _current.setup)
+
+        if not stream:
+            # read the body here (requests.Session would do it next) to time the download
+            response.content
+            metrics.observe('rdp_download_seconds', endpoint, time.perf_counter() - headers_received)
+        return response
+
+
+def instrument(client, metrics = None):
+    '''
+    Replace the requests HTTPAdapter of an RDPHttpClient (or requests.Session) with an InstrumentedAdapter of the same
+    connection pool configuration, or mount it as the transport of an rdp_response_cache.CachingAdapter. Another
+    mounted adapter raises ValueError, see rdp_transport.install_transport().
+    '''
+    from rdp_transport import install_transport
+
+    session = getattr(client, 'session', client)
+    current = session.get_adapter('https://')
+    adapter = InstrumentedAdapter(metrics, pool_connections = getattr(current, '_pool_connections', 10),
+                                  pool_maxsize = getattr(current, '_pool_maxsize', 10),
+                                  pool_block = getattr(current, '_pool_block', False))
+    return install_transport(session, adapter)
+
+
+# -- RDP Libraries timing
+
+def instrument_library(rdp, metrics = None):
+    '''
+    Wrap the RDP Libraries rdp.get_historical_price_events(), rdp.HistoricalPricing.get_events() and
+    rdp.Endpoint.send_request() calls to record rdp_library_call_seconds.
+    '''
+    metrics = metrics or registry
+
+    def timed(function, endpoint_of):
+        if getattr(function, '_rdp_metrics', False):
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with metrics.timer('rdp_library_call_seconds', endpoint_of(args)):
+                return function(*args, **kwargs)
+        wrapper._rdp_metrics = True
+        return wrapper
+
+    def endpoint_url(args):
+        endpoint = args[0] if args else None
+        url = getattr(endpoint, 'url', None) or getattr(endpoint, '_url', None) or ''
+        return rdp_endpoints.endpoint_name(url) if url else 'endpoint'
+
+    rdp.get_historical_price_events = timed(rdp.get_historical_price_events, lambda args: 'function-historical-pricing-events')
+    rdp.HistoricalPricing.get_events = timed(rdp.HistoricalPricing.get_events, lambda args: 'content-historical-pricing-events')
+    rdp.Endpoint.send_request = timed(rdp.Endpoint.send_request, endpoint_url)
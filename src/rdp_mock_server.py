@@ -0,0 +1,399 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Local stand-in RDP APIs HTTP server for offline benchmarks and load tests.
+
+The server answers the Service Endpoints used by the demo applications with generated messages in the RDP format:
+- POST /auth/oauth2/v1/token and /auth/oauth2/v1/revoke
+- GET /data/historical-pricing/v1/views/events/{universe} and /views/events?universe=...
+- GET /data/environmental-social-governance/v1/views/scores-full?universe=...
+- GET /user-framework/mobile/overview-service/v1/corp/business-summary/{universe}
+- POST /data/quantitative-analytics/v1/financial-contracts
+
+The ESG and Business summary responses have an ETag header and answer 304 (Not Modified) to a matching If-None-Match
+request header. Every response waits `latency` seconds (plus up to `jitter` seconds) to simulate the network and the service time.
+
+With http2 = True (--http2), the server also speaks HTTP/2 without TLS (h2c with prior knowledge, i.e.
+rdp_http2.HTTP2Adapter(http1 = False)) on the same port, the concurrent requests of a connection are multiplexed. The
+HTTP/1.1 clients are still answered. It requires the h2 package (a dependency of httpx[http2]).
+
+Run it in a console with:
+
+    $>python rdp_mock_server.py --port 8080 --latency 0.02
+
+then set base_URL = 'http://localhost:8080' in the direct call code.
+'''
+
+import argparse
+import gzip
+import hashlib
+import http.client
+import io
+import random
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import rdp_endpoints
+import rdp_json_codec
+from rdp_historical_pricing import format_rdp_timestamp, parse_rdp_timestamp
+
+# -- Generated messages
+
+events_headers = [
+    {'name': 'DATE_TIME', 'type': 'string'},
+    {'name': 'EVENT_TYPE', 'type': 'string'},
+    {'name': 'RTL', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'SOURCE_DATETIME', 'type': 'string'},
+    {'name': 'SEQNUM', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'TRDXID_1', 'type': 'string'},
+    {'name': 'TRDPRC_1', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'TRDVOL_1', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'VWAP', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'BID', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'ASK', 'type': 'number', 'decimalChar': '.'},
+    {'name': 'QUALIFIERS', 'type': 'string'}
+]
+
+# the scores-full view has about 100 columns
+esg_headers = [
+    {'name': 'instrument', 'title': 'Instrument', 'type': 'string'},
+    {'name': 'periodenddate', 'title': 'Period End Date', 'type': 'string'}
+] + [{'name': 'score%d' % index, 'title': 'ESG Score %d' % index, 'type': 'number'} for index in range(98)]
+
+# the time between two generated trade events
+event_interval_ns = 250 * 1000 * 1000
+
+
+def events_message(universe, params):
+    '''
+    Generate the /views/events message, newest events first, one trade every event_interval_ns up to `end`.
+    '''
+    count = int(params.get('count', 20))
+    end_ns = parse_rdp_timestamp(params['end']) if 'end' in params else time.time_ns()
+    start_ns = parse_rdp_timestamp(params['start']) if 'start' in params else 0
+    seed = sum(ord(char) for char in universe)
+
+    # events are on a fixed time grid, so overlapping requests return the same events
+    timestamp = end_ns - end_ns % event_interval_ns
+    data = []
+    while len(data) < count and timestamp >= start_ns:
+        sequence = timestamp // event_interval_ns
+        price = 100 + seed % 50 + (sequence % 1000) / 100.0
+        data.append([format_rdp_timestamp(timestamp), 'trade', 1000 + sequence % 9000, format_rdp_timestamp(timestamp - 1000),
+                     sequence % 1000000, str(sequence), price, 100 * (1 + sequence % 7), price - 0.01, price - 0.02, price + 0.02,
+                     '132[IRGCOND];"@  I"[GV3_TEXT];   [PRC_QL_CD];I[SALE_CND]'])
+        timestamp -= event_interval_ns
+
+    return [{
+        'universe': {'ric': universe},
+        'interval': 'PT1M',
+        'summaryTimestampLabel': 'endPeriod',
+        'adjustments': params.get('adjustments', '').split(','),
+        'defaultPricingField': 'TRDPRC_1',
+        'qos': {'timeliness': 'delayed'},
+        'headers': events_headers,
+        'data': data,
+        'meta': {'blendingEntry': {'headers': [], 'data': []}}
+    }]
+
+
+def esg_message(universes):
+    data = []
+    for universe in universes:
+        seed = sum(ord(char) for char in universe)
+        data.append([universe, '2019-12-31'] + [round((seed * (index + 1)) % 10000 / 100.0, 2) for index in range(98)])
+    return {
+        'links': {'count': len(data)},
+        'variability': '',
+        'universe': [{'Instrument': universe, 'Company Common Name': '%s Company' % universe, 'Organization PermID': '4295904307',
+                      'Reporting Currency': 'USD'} for universe in universes],
+        'data': data,
+        'messages': {'codes': [[-1] * len(esg_headers)] * len(data), 'descriptions': [{'code': -1, 'description': 'ok'}]},
+        'headers': esg_headers
+    }
+
+
+def business_summary_message(universe):
+    return {
+        'ric': universe,
+        'businessSummary': ('%s is a company. ' % universe) * 60,
+        'lastUpdated': '2020-07-13T00:00:00Z'
+    }
+
+
+def _ipa_field_type(field):
+    if field == 'InstrumentTag':
+        return 'String'
+    return 'DateTime' if field.endswith('Date') else 'Float'
+
+
+def financial_contracts_message(request_message):
+    fields = request_message.get('fields') or ['InstrumentTag', 'FxSpot']
+    data = []
+    for position, contract in enumerate(request_message.get('universe', [])):
+        tag = contract.get('instrumentDefinition', {}).get('instrumentTag', '')
+        row = []
+        for field in fields:
+            if field == 'InstrumentTag':
+                row.append(tag)
+            elif field.endswith('Date'):
+                row.append('2019-05-14T00:00:00Z')
+            else:
+                row.append(0.85 + position % 100 / 10000.0)
+        data.append(row)
+    return {
+        'headers': [{'type': _ipa_field_type(field), 'name': field} for field in fields],
+        'data': data
+    }
+
+
+# -- HTTP server
+
+class MockRDPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately, do not let keep-alive connections wait for the delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        path = url.path
+
+        if path.startswith(rdp_endpoints.historical_pricing_category_URL + rdp_endpoints.RDP_version + '/views/events/'):
+            universe = path.rsplit('/', 1)[-1]
+            return self._send_json(200, events_message(universe, params))
+        if path == rdp_endpoints.historical_pricing_category_URL + rdp_endpoints.RDP_version + '/views/events':
+            return self._send_json(200, [element for universe in params.get('universe', '').split(',')
+                                         for element in events_message(universe, params)])
+        if path == rdp_endpoints.esg_category_URL + rdp_endpoints.RDP_version + '/views/scores-full':
+            return self._send_json(200, esg_message(params.get('universe', '').split(',')), validators = True)
+        if path.startswith(rdp_endpoints.overview_category_URL + rdp_endpoints.RDP_version + '/corp/business-summary/'):
+            return self._send_json(200, business_summary_message(path.rsplit('/', 1)[-1]), validators = True)
+        return self._send_json(404, {'error': {'message': 'Not Found %s' % path}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        path = urlparse(self.path).path
+
+        if path == rdp_endpoints.auth_category_URL + rdp_endpoints.RDP_version + '/token':
+            # the requests are handled by several threads
+            with self.server.token_lock:
+                self.server.token_count += 1
+                token_count = self.server.token_count
+            return self._send_json(200, {
+                'access_token': 'mock_access_token_%d' % token_count,
+                'refresh_token': 'mock_refresh_token_%d' % token_count,
+                'expires_in': '300',
+                'scope': rdp_endpoints.scope,
+                'token_type': 'Bearer'
+            })
+        if path == rdp_endpoints.auth_category_URL + rdp_endpoints.RDP_version + '/revoke':
+            return self._send_json(200, None)
+        if path == rdp_endpoints.ipa_category_URL + rdp_endpoints.RDP_version + '/financial-contracts':
+            return self._send_json(200, financial_contracts_message(rdp_json_codec.loads(body)))
+        return self._send_json(404, {'error': {'message': 'Not Found %s' % path}})
+
+    def _send_json(self, status_code, message, validators = False):
+        latency = self.server.latency + random.random() * self.server.jitter
+        if latency > 0:
+            time.sleep(latency)
+
+        body = rdp_json_codec.dumps(message) if message is not None else b''
+        if validators:
+            # the generated messages never change, the ETag is the hash of the body
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        if validators:
+            self.send_header('ETag', etag)
+        if self.server.compress and len(body) > 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel = 6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# -- HTTP/2 (h2c) server
+
+_h2_preface = b'PRI * HTTP/2.0'
+
+
+class _H2Request(MockRDPRequestHandler):
+    '''
+    One HTTP/2 request stream answered by the MockRDPRequestHandler functions, the response is collected instead of
+    being written to a socket.
+    '''
+
+    def __init__(self, server, headers, body):
+        self.server = server
+        self.command = headers[':method']
+        self.path = headers[':path']
+        self.headers = http.client.HTTPMessage()
+        for name, value in headers.items():
+            if not name.startswith(':'):
+                self.headers[name] = value
+        if 'Content-Length' not in self.headers:
+            self.headers['Content-Length'] = str(len(body))
+        self.rfile = io.BytesIO(body)
+        self.wfile = io.BytesIO()
+        self.status_code = None
+        self.response_headers = []
+
+    def send_response(self, code, message = None):
+        self.status_code = code
+
+    def send_header(self, keyword, value):
+        # HTTP/2 header names are lower case
+        self.response_headers.append((keyword.lower(), value))
+
+    def end_headers(self):
+        pass
+
+
+class _H2ConnectionHandler(socketserver.BaseRequestHandler):
+    '''
+    Serve a connection: HTTP/2 if it starts with the HTTP/2 connection preface, else HTTP/1.1.
+    '''
+
+    def handle(self):
+        if self.request.recv(len(_h2_preface), socket.MSG_PEEK | socket.MSG_WAITALL) != _h2_preface:
+            MockRDPRequestHandler(self.request, self.client_address, self.server)
+            return
+
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        self.connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side = False, header_encoding = 'utf-8'))
+        # the connection state is shared by the reader and the stream threads
+        self.condition = threading.Condition()
+        streams = {}
+        with self.condition:
+            self.connection.initiate_connection()
+            self._flush()
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            with self.condition:
+                for event in self.connection.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        streams[event.stream_id] = (dict(event.headers), bytearray())
+                    elif isinstance(event, h2.events.DataReceived):
+                        streams[event.stream_id][1].extend(event.data)
+                        self.connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        headers, body = streams.pop(event.stream_id)
+                        # a thread for each stream, the latency of the concurrent requests overlaps
+                        threading.Thread(target = self._respond, args = (event.stream_id, headers, bytes(body)),
+                                         daemon = True).start()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        self._flush()
+                        return
+                self._flush()
+                # a WINDOW_UPDATE or SETTINGS frame can let the streams send more data
+                self.condition.notify_all()
+
+    def _respond(self, stream_id, headers, body):
+        import h2.exceptions
+
+        request = _H2Request(self.server, headers, body)
+        if request.command == 'POST':
+            request.do_POST()
+        else:
+            request.do_GET()
+        data = request.wfile.getvalue()
+        try:
+            with self.condition:
+                self.connection.send_headers(stream_id, [(':status', str(request.status_code))] + request.response_headers,
+                                             end_stream = not data)
+                self._flush()
+            offset = 0
+            while offset < len(data):
+                with self.condition:
+                    # the client flow control window, the reader notifies when it grows
+                    window = self.connection.local_flow_control_window(stream_id)
+                    if window <= 0:
+                        self.condition.wait(1.0)
+                        continue
+                    size = min(window, self.connection.max_outbound_frame_size, len(data) - offset)
+                    self.connection.send_data(stream_id, data[offset:offset + size], end_stream = offset + size == len(data))
+                    self._flush()
+                offset += size
+        except (h2.exceptions.StreamClosedError, OSError):
+            # the client reset the stream or closed the connection
+            pass
+
+    def _flush(self):
+        outbound = self.connection.data_to_send()
+        if outbound:
+            self.request.sendall(outbound)
+
+
+class MockRDPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency = 0.0, jitter = 0.0, compress = False, http2 = False):
+        ThreadingHTTPServer.__init__(self, address, _H2ConnectionHandler if http2 else MockRDPRequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.compress = compress
+        self.token_count = 0
+        self.token_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return 'http://%s:%d' % self.server_address[:2]
+
+
+def start_mock_server(port = 0, latency = 0.0, jitter = 0.0, host = '127.0.0.1', compress = False, http2 = False):
+    '''
+    Start a MockRDPServer in a daemon thread and return it, server.base_url is the base_URL to use. If compress is True,
+    the responses above 1 KB are gzip compressed for the clients that accept it. If http2 is True, the server also
+    answers HTTP/2 with prior knowledge.
+    '''
+    server = MockRDPServer((host, port), latency, jitter, compress, http2)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Local stand-in RDP APIs HTTP server')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8080)
+    parser.add_argument('--latency', type = float, default = 0.02, help = 'response delay in seconds')
+    parser.add_argument('--jitter', type = float, default = 0.0, help = 'random extra delay in seconds')
+    parser.add_argument('--compress', action = 'store_true', help = 'gzip the responses for the clients that accept it')
+    parser.add_argument('--http2', action = 'store_true', help = 'also answer HTTP/2 with prior knowledge (h2c)')
+    args = parser.parse_args()
+
+    server = MockRDPServer((args.host, args.port), args.latency, args.jitter, args.compress, args.http2)
+    print('Mock RDP APIs server on %s' % server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,217 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Time aligned multi-RIC panels of the Historical Pricing trade events.
+
+rdp.get_historical_price_events() and rdp_historical_pricing.get_historical_price_events() return one DataFrame for one
+universe, and a panel of many RICs is usually built by a Python loop of reindex/concat calls. The PanelBuilder fetches
+the events of all RICs concurrently (rdp_historical_pricing.iter_events) into an rdp_event_store.EventStore, then aligns
+them on one timestamp grid with numpy only:
+- bar mode (bar = '1min', a timedelta or nanoseconds): the grid is the end of every bar between start and end, the
+  same label as the RDP summaries (endPeriod). The bar of label L is [L - bar, L), an event at L is in the next bar
+- event time mode (bar = None): the grid is the sorted union of the event timestamps of all RICs (a k-way merge)
+
+Every field of every RIC is joined "as of" the grid times with one numpy.searchsorted call: the value of the last event
+before the bar end (bar mode) or at the event time (event time mode), NaN before the first event or if it is older than
+tolerance. The 'sum' aggregation adds the values of the events of each grid interval instead (i.e. the bar volume), from
+a cumulative sum of the same positions.
+
+The panel is one DataFrame indexed by Timestamp, wide (one column per field and RIC) or long (Timestamp, universe and
+one column per field).
+
+Example:
+
+    builder = PanelBuilder(client)
+    builder.fetch(rics, start = timedelta(hours = -4))
+    prices = builder.build(rics, bar = '1min', aggregations = {'TRDVOL_1': 'sum'})
+'''
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import rdp_historical_pricing
+from rdp_event_store import EventStore, default_fields, to_nanoseconds
+
+layouts = ('wide', 'long')
+aggregation_methods = ('last', 'sum')
+
+
+def duration_nanoseconds(duration):
+    '''
+    Convert a bar size or a tolerance (nanoseconds, a timedelta, or a pandas offset alias string i.e. '1min', '5s') to
+    nanoseconds.
+    '''
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(duration, (int, np.integer)):
+        return int(duration)
+    return int(pd.Timedelta(duration).value)
+
+
+class PanelBuilder(object):
+    '''
+    Build panels of the events in store (a new EventStore of fields if None). client is an rdp_http_client.RDPHttpClient
+    object to fetch() the events, it is not needed for the events that are already in the store.
+    '''
+
+    def __init__(self, client = None, store = None, fields = default_fields, concurrency = 8,
+                 event_types = rdp_historical_pricing.default_event_types,
+                 adjustments = rdp_historical_pricing.default_adjustments):
+        self.client = client
+        self.store = store if store is not None else EventStore(fields)
+        self.concurrency = concurrency
+        self.event_types = event_types
+        self.adjustments = adjustments
+        # RIC: the exception of its last fetch()
+        self.errors = {}
+
+    def fetch(self, universe, start, end = None):
+        '''
+        Fetch all events of the RICs of universe between start and end with concurrency threads, return the number of
+        events added to the store. The RICs that fail are kept in errors.
+        '''
+        def fetch_universe(ric):
+            count = 0
+            for page in rdp_historical_pricing.iter_events(self.client, ric, start, end, self.event_types, self.adjustments):
+                count += self.store.append_page(page)
+            return count
+
+        count = 0
+        with ThreadPoolExecutor(max_workers = self.concurrency) as executor:
+            futures = [(ric, executor.submit(fetch_universe, ric)) for ric in dict.fromkeys(universe)]
+            for ric, future in futures:
+                try:
+                    count += future.result()
+                    self.errors.pop(ric, None)
+                except Exception as exp:
+                    self.errors[ric] = exp
+        return count
+
+    def grid(self, universe, start = None, end = None, bar = None):
+        '''
+        Return the int64 nanoseconds timestamp grid of the events of universe between start (included) and end
+        (excluded). start and end are the first and the last event if None.
+
+        The bars are [label - bar, label). A bar grid has no label after end: the last bar ends at end or before it.
+        Without end, the last bar is the one of the last event.
+        '''
+        import numpy as np
+
+        start_ns, end_ns = to_nanoseconds(start), to_nanoseconds(end)
+        slices = [self.store.slice(ric, start_ns, end_ns) for ric in universe]
+        if bar is None:
+            return np.unique(np.concatenate([event_slice.times for event_slice in slices] + [np.empty(0, dtype = np.int64)]))
+
+        bar_ns = duration_nanoseconds(bar)
+        # the bars end on multiples of bar_ns
+        last_end = (end_ns // bar_ns) * bar_ns if end_ns is not None else None
+        if start_ns is None or end_ns is None:
+            times = [event_slice.times for event_slice in slices if len(event_slice.times)]
+            if not times:
+                return np.empty(0, dtype = np.int64)
+            if start_ns is None:
+                start_ns = min(int(event_times[0]) for event_times in times)
+            if last_end is None:
+                # the bar of the last event
+                last_end = -(-(max(int(event_times[-1]) for event_times in times) + 1) // bar_ns) * bar_ns
+        first_end = (start_ns // bar_ns + 1) * bar_ns
+        return np.arange(first_end, last_end + 1, bar_ns, dtype = np.int64)
+
+    def build(self, universe, start = None, end = None, bar = None, fields = None, layout = 'wide', tolerance = None,
+              aggregations = None):
+        '''
+        Return the panel DataFrame of the RICs of universe between start and end, see grid().
+
+        fields are the store fields in the panel (all if None). aggregations is a {field: 'last' or 'sum'} dict, 'last'
+        by default. tolerance (nanoseconds or a timedelta) is the maximum age of a 'last' value. The wide layout has
+        the RIC columns if there is one field, else (field, RIC) columns.
+        '''
+        import numpy as np
+
+        if layout not in layouts:
+            raise ValueError('Unknown panel layout %s, use one of %s' % (layout, ', '.join(layouts)))
+        universe = list(dict.fromkeys(universe))
+        fields = list(fields or self.store.fields)
+        aggregations = dict(aggregations or {})
+        for field, how in aggregations.items():
+            if how not in aggregation_methods:
+                raise ValueError('Unknown aggregation %s of %s' % (how, field))
+        tolerance_ns = duration_nanoseconds(tolerance) if tolerance is not None else None
+
+        # a timedelta boundary is converted once, the grid and the joins use the same times
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        grid = self.grid(universe, start, end, bar)
+        panel = collections.OrderedDict((field, np.full((len(grid), len(universe)), np.nan)) for field in fields)
+        if len(grid):
+            # the events after the grid end and from end are not joined, the 'sum' of the first bar starts at start or
+            # the bar start
+            grid_start = start
+            if grid_start is None:
+                grid_start = grid[0] - duration_nanoseconds(bar) if bar is not None else grid[0]
+            # a bar excludes its end label, an event time includes itself
+            side = 'left' if bar is not None else 'right'
+            grid_end = int(grid[-1]) + (1 if bar is None else 0)
+            if end is not None:
+                grid_end = min(grid_end, end)
+            for column, ric in enumerate(universe):
+                event_slice = self.store.slice(ric, grid_start, grid_end)
+                if not len(event_slice.times):
+                    continue
+                # the position of the last event in or before every bar (at or before every event time), -1 before the
+                # first event
+                positions = np.searchsorted(event_slice.times, grid, side = side) - 1
+                before = positions < 0
+                for field in fields:
+                    values = event_slice.columns[field]
+                    if aggregations.get(field, 'last') == 'sum':
+                        totals = np.concatenate([[0.0], np.cumsum(np.nan_to_num(values.astype(np.float64)))])
+                        cumulative = totals[positions + 1]
+                        panel[field][:, column] = np.diff(cumulative, prepend = 0.0)
+                    else:
+                        joined = values[np.maximum(positions, 0)].astype(np.float64)
+                        joined[before] = np.nan
+                        if tolerance_ns is not None:
+                            joined[grid - event_slice.times[np.maximum(positions, 0)] > tolerance_ns] = np.nan
+                        panel[field][:, column] = joined
+
+        return _panel_frame(grid, universe, panel, layout)
+
+
+def _panel_frame(grid, universe, panel, layout):
+    import numpy as np
+    import pandas as pd
+
+    if layout == 'long':
+        index = pd.DatetimeIndex(np.repeat(grid, len(universe)).view('datetime64[ns]'), name = 'Timestamp')
+        columns = collections.OrderedDict([('universe', np.tile(np.array(universe, dtype = object), len(grid)))])
+        for field, values in panel.items():
+            # row major: the RICs of a timestamp are consecutive rows
+            columns[field] = values.reshape(-1)
+        return pd.DataFrame(columns, index = index)
+
+    index = pd.DatetimeIndex(grid.view('datetime64[ns]'), name = 'Timestamp')
+    if len(panel) == 1:
+        field, values = next(iter(panel.items()))
+        return pd.DataFrame(values, index = index, columns = pd.Index(universe, name = 'universe'), copy = False)
+    columns = pd.MultiIndex.from_product([list(panel), universe], names = ['field', 'universe'])
+    return pd.DataFrame(np.hstack(list(panel.values())), index = index, columns = columns)
+
+
+def build_panel(client, universe, start, end = None, bar = '1min', fields = None, layout = 'wide', tolerance = None,
+                aggregations = None, concurrency = 8):
+    '''
+    Fetch the events of the RICs of universe between start and end and return their panel, see PanelBuilder.build().
+    '''
+    builder = PanelBuilder(client, fields = fields or default_fields, concurrency = concurrency)
+    builder.fetch(universe, start, end)
+    return builder.build(universe, start, end, bar, layout = layout, tolerance = tolerance, aggregations = aggregations)
@@ -0,0 +1,194 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Local on-disk cache of the RDP Historical Pricing /views/events results.
+
+The cache keeps the events in Parquet files, one directory for each universe, eventTypes and adjustments set. The
+file name of a segment is the time range it covers: <start ns>_<end ns>.parquet. A request reads the segments that
+overlap its time range from disk and sends /views/events requests only for the missing gaps, then every fetched gap is
+written as a new segment file, the existing segments are not rewritten. A gap without any event is recorded by an
+empty <start ns>_<end ns>.empty file. The files are written to a temporary file and renamed, a crash never leaves a
+truncated segment. The least recently used segments are removed when the cache directory is bigger than max_bytes.
+
+The service can publish the events of the last minutes late, so the part of a range after now - settle_time is
+returned but not recorded as covered: the next request fetches it again.
+
+The Parquet files require the pyarrow (or fastparquet) package.
+
+Example:
+
+    cache = HistoricalPricingCache(client)
+    df = cache.get_events('IBM.N', start = timedelta(-7))
+'''
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import rdp_historical_pricing as historical_pricing
+
+default_cache_dir = os.path.join('.rdp_cache', 'historical-pricing')
+
+# the events younger than settle_time can still be published, they are not cached
+default_settle_time = timedelta(minutes = 5)
+
+
+class HistoricalPricingCache(object):
+    '''
+    Cache of /views/events results, client is an rdp_http_client.RDPHttpClient object with a token manager.
+    '''
+
+    def __init__(self, client, cache_dir = default_cache_dir, max_bytes = 1024 * 1024 * 1024,
+                 settle_time = default_settle_time):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.settle_time = settle_time
+
+    def get_events(self, universe, start, end = None, event_types = historical_pricing.default_event_types,
+                   adjustments = historical_pricing.default_adjustments):
+        '''
+        Return a pandas DataFrame of the events between start and end (inclusive, end is now if None) sorted by time.
+        '''
+        import pandas as pd
+
+        start_ns = historical_pricing.parse_rdp_timestamp(historical_pricing.to_rdp_timestamp(start))
+        end_ns = historical_pricing.parse_rdp_timestamp(historical_pricing.to_rdp_timestamp(end if end is not None else timedelta(0)))
+
+        key_dir = self._key_dir(universe, event_types, adjustments)
+        segments = self._segments(key_dir)
+
+        # -- read the cached segments that overlap the request
+        overlapping = [segment for segment in segments if segment[0] <= end_ns and segment[1] >= start_ns]
+        frames = [pd.read_parquet(self._segment_path(key_dir, segment)) for segment in overlapping if segment[2] == 'parquet']
+        for segment in overlapping:
+            _touch(self._segment_path(key_dir, segment))
+
+        # -- fetch the missing gaps of [start_ns, end_ns] from RDP, store the settled part of each gap
+        settled_ns = historical_pricing.parse_rdp_timestamp(historical_pricing.to_rdp_timestamp(-self.settle_time))
+        written = False
+        for gap_start, gap_end in _gaps(start_ns, end_ns, segments):
+            headers = []
+            data = []
+            for page in historical_pricing.iter_events(self.client, universe, gap_start, gap_end, event_types, adjustments):
+                headers = page.headers
+                data.extend(page.data)
+            gap_frame = historical_pricing.events_to_dataframe(headers, data)
+            frames.append(gap_frame)
+
+            stored_end = min(gap_end, settled_ns)
+            if stored_end < gap_start:
+                continue
+            stored = gap_frame
+            if len(gap_frame):
+                stored = gap_frame[gap_frame.index.values.view('int64') <= stored_end]
+            self._write_segment(key_dir, (gap_start, stored_end), stored if len(stored) else None)
+            written = True
+        if written:
+            self._evict()
+
+        frames = [frame for frame in frames if len(frame.columns)]
+        frame = pd.concat(frames).sort_index(kind = 'stable') if frames else historical_pricing.events_to_dataframe([], [])
+
+        if not len(frame):
+            return frame
+        index_ns = frame.index.values.view('int64')
+        return frame[(index_ns >= start_ns) & (index_ns <= end_ns)]
+
+    def clear(self):
+        for path, _, _ in self._files():
+            os.remove(path)
+
+    # -- Internal functions
+
+    def _key_dir(self, universe, event_types, adjustments):
+        key = {
+            'universe': universe,
+            'eventTypes': event_types if isinstance(event_types, str) else ','.join(event_types),
+            'adjustments': ','.join(sorted(adjustments.split(',') if isinstance(adjustments, str) else adjustments or []))
+        }
+        key_dir = os.path.join(self.cache_dir, hashlib.sha1(json.dumps(key, sort_keys = True).encode('utf-8')).hexdigest())
+        if not os.path.isdir(key_dir):
+            os.makedirs(key_dir)
+            with open(os.path.join(key_dir, 'key.json'), 'w') as key_file:
+                json.dump(key, key_file)
+        return key_dir
+
+    def _segments(self, key_dir):
+        # (start ns, end ns, 'parquet' or 'empty') of the segment files
+        segments = []
+        for file_name in os.listdir(key_dir):
+            name, _, extension = file_name.partition('.')
+            if extension in ('parquet', 'empty'):
+                start_ns, end_ns = name.split('_')
+                segments.append((int(start_ns), int(end_ns), extension))
+        return sorted(segments)
+
+    def _segment_path(self, key_dir, segment):
+        return os.path.join(key_dir, '%d_%d.%s' % segment)
+
+    def _write_segment(self, key_dir, time_range, frame):
+        # a range without events is an empty file
+        path = self._segment_path(key_dir, time_range + ('parquet' if frame is not None else 'empty',))
+        temporary = path + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        if frame is not None:
+            frame.to_parquet(temporary)
+        else:
+            open(temporary, 'w').close()
+        os.replace(temporary, path)
+
+    def _files(self):
+        files = []
+        for key_dir, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith('.parquet') or file_name.endswith('.empty'):
+                    path = os.path.join(key_dir, file_name)
+                    stat = os.stat(path)
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self):
+        files = self._files()
+        total_bytes = sum(size for _, size, _ in files)
+        # least recently used first
+        for path, size, _ in sorted(files, key = lambda file_info: file_info[2]):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+
+
+def _gaps(start_ns, end_ns, segments):
+    '''
+    Return the (start, end) ranges of [start_ns, end_ns] not covered by the sorted segments.
+    '''
+    gaps = []
+    position = start_ns
+    for segment_start, segment_end in (segment[:2] for segment in segments):
+        if segment_end < position:
+            continue
+        if segment_start > end_ns:
+            break
+        if segment_start > position:
+            gaps.append((position, segment_start - 1))
+        position = max(position, segment_end + 1)
+    if position <= end_ns:
+        gaps.append((position, end_ns))
+    return gaps
+
+
+def _touch(path):
+    now = time.time()
+    os.utime(path, (now, now))
@@ -0,0 +1,160 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Multi-RIC request packing for the ESG and Historical Pricing direct calls.
+
+The demo applications send one request per RIC in the universe query parameter. The ESG /views/scores-full and the
+Historical Pricing /views/events Service Endpoints also accept a comma separated list of RICs. The RequestPlanner class
+packs a long universe list into as few requests as the RIC count limit of the endpoint and the URL length allow, sends
+them concurrently with rdp_async_client and splits every combined response back to one result per RIC:
+- ESG: the data rows by the instrument column,
+- Historical Pricing: the response list elements by their universe.ric.
+
+Example:
+
+    planner = RequestPlanner(client)
+    results = planner.get_esg_scores_full(['IBM.N', 'MSFT.O', 'AAPL.O'])
+    print(results['IBM.N'].data)
+'''
+
+from urllib.parse import quote_plus, urlencode
+
+import rdp_async_client
+import rdp_endpoints
+from rdp_async_client import FetchResult
+
+# RICs in one request, set them to the limits of the RDP service documentation for the account
+default_max_rics = {
+    'esg-scores-full': 100,
+    'historical-pricing-events': 50
+}
+
+# a safe URL length for the proxies and load balancers between the application and RDP
+default_max_url_length = 2048
+
+
+def pack_universe(universe, url, params = None, max_rics = 100, max_url_length = default_max_url_length):
+    '''
+    Split the RICs of universe to lists of at most max_rics RICs, each list makes a URL of at most max_url_length
+    characters once joined in the universe query parameter of url. Duplicate RICs are sent once.
+    '''
+    other_params = urlencode(params) if params else ''
+    # url?other&universe=RIC1%2CRIC2 as encoded by requests
+    base_length = len(url) + 1 + (len(other_params) + 1 if other_params else 0) + len('universe=')
+
+    batches = []
+    batch = []
+    length = base_length
+    for ric in dict.fromkeys(universe):
+        ric_length = len(quote_plus(ric))
+        if base_length + ric_length > max_url_length:
+            raise ValueError('The RIC %s does not fit in a %d characters URL' % (ric, max_url_length))
+        added_length = ric_length + (len(quote_plus(',')) if batch else 0)
+        if batch and (len(batch) >= max_rics or length + added_length > max_url_length):
+            batches.append(batch)
+            batch = []
+            length = base_length
+            added_length = ric_length
+        batch.append(ric)
+        length += added_length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def split_esg_message(message):
+    '''
+    Split a multi-RIC /views/scores-full message to {RIC: message of the RIC rows}.
+    '''
+    headers = message.get('headers', [])
+    names = [header.get('name', '').lower() for header in headers]
+    instrument_index = names.index('instrument') if 'instrument' in names else 0
+    codes = (message.get('messages') or {}).get('codes')
+    universe_items = {item.get('Instrument'): item for item in message.get('universe', [])}
+
+    rows = {}
+    for position, row in enumerate(message.get('data', [])):
+        rows.setdefault(row[instrument_index], []).append(position)
+
+    results = {}
+    for ric, positions in rows.items():
+        ric_message = dict(message)
+        ric_message['data'] = [message['data'][position] for position in positions]
+        ric_message['links'] = {'count': len(positions)}
+        if ric in universe_items:
+            ric_message['universe'] = [universe_items[ric]]
+        if codes is not None:
+            ric_message['messages'] = dict(message['messages'], codes = [codes[position] for position in positions])
+        results[ric] = ric_message
+    return results
+
+
+def split_events_message(message):
+    '''
+    Split a multi-RIC /views/events response list to {RIC: [element of the RIC]}, the format of a single-RIC response.
+    '''
+    results = {}
+    for element in message:
+        ric = (element.get('universe') or {}).get('ric')
+        results.setdefault(ric, []).append(element)
+    return results
+
+
+class RequestPlanner(object):
+    '''
+    Send the ESG and Historical Pricing requests of many RICs in packed multi-RIC requests. client is an
+    rdp_http_client.RDPHttpClient object with a token manager.
+
+    The functions return {RIC: rdp_async_client.FetchResult} in the universe order. The data of a FetchResult is the
+    message that a single-RIC request returns. A failed request sets the status_code and error of all its RICs, a RIC
+    missing from a successful response gets the error 'No data'.
+    '''
+
+    def __init__(self, client, max_rics = None, max_url_length = default_max_url_length, concurrency = 4):
+        self.client = client
+        self.max_rics = dict(default_max_rics, **(max_rics or {}))
+        self.max_url_length = max_url_length
+        self.concurrency = concurrency
+
+    def get_esg_scores_full(self, universe):
+        url = rdp_endpoints.esg_scores_full_url(self.client.base_url)
+        batches = self._pack(universe, url)
+        return self._fetch('esg', [','.join(batch) for batch in batches], universe, split_esg_message)
+
+    def get_historical_pricing_events(self, universe, params = None):
+        url = rdp_endpoints.historical_pricing_events_universes_url(self.client.base_url)
+        batches = self._pack(universe, url, params)
+        return self._fetch('historical-pricing-universes', [','.join(batch) for batch in batches], universe,
+                           split_events_message, params = params)
+
+    # -- Internal functions
+
+    def _pack(self, universe, url, params = None):
+        return pack_universe(universe, url, params, self.max_rics[rdp_endpoints.endpoint_name(url)], self.max_url_length)
+
+    def _fetch(self, endpoint, packed_universes, universe, split, **kwargs):
+        batch_results = rdp_async_client.fetch_all(endpoint, packed_universes, client = self.client,
+                                                   concurrency = self.concurrency, **kwargs)
+        results = {}
+        for batch_result in batch_results:
+            rics = batch_result.universe.split(',')
+            if batch_result.error is not None:
+                for ric in rics:
+                    results[ric] = FetchResult(ric, batch_result.status_code, None, batch_result.error)
+                continue
+            messages = split(batch_result.data)
+            for ric in rics:
+                if ric in messages:
+                    results[ric] = FetchResult(ric, batch_result.status_code, messages[ric], None)
+                else:
+                    results[ric] = FetchResult(ric, batch_result.status_code, None, 'No data')
+        return {ric: results[ric] for ric in dict.fromkeys(universe)}
@@ -0,0 +1,336 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+TTL response cache for the slow-changing RDP APIs data: ESG scores and Business summary.
+
+ResponseCache keeps the GET responses in memory (LRU, max_entries) and on disk (LRU by file time, max_bytes), with a
+time to live for every Service Endpoint (see rdp_endpoints.endpoint_name()). Endpoints without a TTL are not cached.
+
+- CachingAdapter is a requests transport adapter for the direct calls. A fresh response is answered from the cache. An
+  expired response is revalidated with the If-None-Match (ETag) and If-Modified-Since (Last-Modified) headers, a
+  304 (Not Modified) answer has no body and the cached body is used for another TTL.
+- CachedEndpoint wraps the rdp.Endpoint object of the RDP Libraries. The library does not give the response headers, so
+  its responses are only cached for the TTL.
+
+The cache keys include the user (i.e. the RDP login), so the users of one cache directory never get the responses of
+another user. A CachingAdapter without a user keys the responses by the Authorization header: they are reused until the
+Access Token is refreshed.
+
+install_cache() keeps a mounted transport adapter (i.e. rdp_http2.HTTP2Adapter, rdp_metrics.InstrumentedAdapter) and
+sends the requests that the cache does not answer through it.
+The rdp_response_cache_total counter of rdp_metrics counts the hit, revalidated and miss results.
+
+Example:
+
+    install_cache(client, ResponseCache())
+    response = client.get_esg_scores_full('IBM.N')
+'''
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import rdp_endpoints
+import rdp_json_codec
+import rdp_metrics
+from rdp_transport import ReplayEndpointResponse, install, request_key
+
+default_cache_dir = os.path.join('.rdp_cache', 'responses')
+
+# seconds
+default_ttls = {
+    'esg-scores-full': 24 * 60 * 60,
+    'business-summary': 7 * 24 * 60 * 60
+}
+
+CacheEntry = namedtuple('CacheEntry', ['status_code', 'reason', 'headers', 'body', 'expires_at'])
+
+
+class ResponseCache(object):
+    '''
+    Memory and disk cache of responses. ttls is a dict of endpoint name to seconds, default_ttls if None. If cache_dir is
+    None, the responses are kept in memory only.
+    '''
+
+    def __init__(self, cache_dir = default_cache_dir, ttls = None, max_entries = 256, max_bytes = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttls = dict(default_ttls if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl(self, url):
+        '''
+        Return the TTL in seconds of the Service Endpoint of url, or None if its responses are not cached.
+        '''
+        return self.ttls.get(rdp_endpoints.endpoint_name(url))
+
+    def get(self, key):
+        '''
+        Return the CacheEntry of key (fresh or expired), or None.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, status_code, reason, headers, body, ttl):
+        entry = CacheEntry(status_code, reason, _cached_headers(headers), bytes(body), time.time() + ttl)
+        self._remember(key, entry)
+        self._write(key, entry)
+        return entry
+
+    def renew(self, key, entry, ttl):
+        '''
+        Keep the body of entry for another ttl seconds, after a 304 (Not Modified) response.
+        '''
+        return self.put(key, entry.status_code, entry.reason, entry.headers, entry.body, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for file_name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, file_name))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    # -- Disk storage: <sha1 of key>.json (status, headers, expiry) and <sha1 of key>.body
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + extension)
+
+    def _read(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(key, '.json')) as meta_file:
+                meta = json.load(meta_file)
+            with open(self._path(key, '.body'), 'rb') as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('key') != key:
+            return None
+        now = time.time()
+        os.utime(self._path(key, '.body'), (now, now))
+        return CacheEntry(meta['status_code'], meta['reason'], meta['headers'], body, meta['expires_at'])
+
+    def _write(self, key, entry):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok = True)
+        # write and rename, so a concurrent reader never sees a half written file. The processes can share the directory
+        temporary = '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        body_path = self._path(key, '.body')
+        with open(body_path + temporary, 'wb') as body_file:
+            body_file.write(entry.body)
+        os.replace(body_path + temporary, body_path)
+        meta = {'key': key, 'status_code': entry.status_code, 'reason': entry.reason, 'headers': entry.headers,
+                'expires_at': entry.expires_at}
+        meta_path = self._path(key, '.json')
+        with open(meta_path + temporary, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(meta_path + temporary, meta_path)
+        self._evict()
+
+    def _evict(self):
+        bodies = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.body'):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                bodies.append((stat.st_mtime, stat.st_size, file_name[:-len('.body')]))
+        total = sum(size for _, size, _ in bodies)
+        for _, size, name in sorted(bodies):
+            if total <= self.max_bytes:
+                break
+            for extension in ('.body', '.json'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name + extension))
+                except OSError:
+                    pass
+            total -= size
+
+
+def _cached_headers(headers):
+    # the body is kept decoded, the transfer headers do not apply to it anymore
+    return {name: value for name, value in headers.items()
+            if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie',
+                                    'date', 'age')}
+
+
+def _count(url, result):
+    rdp_metrics.registry.increment('rdp_response_cache_total', {'endpoint': rdp_endpoints.endpoint_name(url), 'result': result})
+
+
+# -- RDP APIs direct calls
+
+class CachingAdapter(HTTPAdapter):
+    '''
+    requests transport adapter that answers the cached GET requests from a ResponseCache and revalidates the expired
+    responses. The answered responses have the X-RDP-Cache header: hit or revalidated. The responses of stream=True
+    requests (i.e. rdp_json_stream) are not stored, a cached response is still answered.
+
+    user separates the responses of the users of the cache, see user_key(). The requests that are not answered from the
+    cache are sent by transport (another requests adapter), or by this HTTPAdapter if transport is None.
+    '''
+
+    def __init__(self, cache, user = None, transport = None, **kwargs):
+        HTTPAdapter.__init__(self, **kwargs)
+        self.cache = cache
+        self.user = user
+        self.transport = transport
+
+    def send(self, request, **kwargs):
+        ttl = self.cache.ttl(request.url)
+        if request.method != 'GET' or ttl is None:
+            return self._send(request, **kwargs)
+
+        user = self.user if self.user is not None else 'authorization:' + request.headers.get('Authorization', '')
+        key = user_key(request_key(request.method, request.url), user)
+        entry = self.cache.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            _count(request.url, 'hit')
+            return self._cached_response(request, entry, 'hit')
+
+        if entry is not None:
+            headers = CaseInsensitiveDict(entry.headers)
+            if 'ETag' in headers:
+                request.headers['If-None-Match'] = headers['ETag']
+            if 'Last-Modified' in headers:
+                request.headers['If-Modified-Since'] = headers['Last-Modified']
+
+        response = self._send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            _count(request.url, 'revalidated')
+            return self._cached_response(request, self.cache.renew(key, entry, ttl), 'revalidated')
+
+        _count(request.url, 'miss')
+        # a stream=True response is not cached, reading its body here would consume the stream of the caller
+        if (response.status_code == 200 and not kwargs.get('stream')
+                and 'no-store' not in response.headers.get('Cache-Control', '')):
+            self.cache.put(key, response.status_code, response.reason, response.headers, response.content, ttl)
+        return response
+
+    def close(self):
+        HTTPAdapter.close(self)
+        if self.transport is not None:
+            self.transport.close()
+
+    def _send(self, request, **kwargs):
+        if self.transport is not None:
+            return self.transport.send(request, **kwargs)
+        return HTTPAdapter.send(self, request, **kwargs)
+
+    def _cached_response(self, request, entry, result):
+        response = requests.Response()
+        response.status_code = entry.status_code
+        response.reason = entry.reason
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.headers['X-RDP-Cache'] = result
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(entry.body)
+        response.connection = self
+        return response
+
+
+def user_key(key, user):
+    '''
+    Return the cache key of a request key for user, the user name is hashed so it is not written in the cache files.
+    '''
+    return '%s user=%s' % (key, hashlib.sha256(str(user).encode('utf-8')).hexdigest()[:32])
+
+
+def install_cache(client, cache = None, user = None):
+    '''
+    Mount a CachingAdapter on an RDPHttpClient (or requests.Session) and return it. user is the RDP login (or any
+    string that identifies the account), see CachingAdapter.
+
+    The requests HTTPAdapter of the session is replaced with the same pool configuration. Another mounted adapter is
+    kept as the transport of the cache.
+    '''
+    session = getattr(client, 'session', client)
+    current = session.get_adapter('https://')
+    cache = cache if cache is not None else ResponseCache()
+    if isinstance(current, CachingAdapter):
+        raise ValueError('A CachingAdapter is already mounted')
+    if type(current) is HTTPAdapter:
+        adapter = CachingAdapter(cache, user, pool_connections = getattr(current, '_pool_connections', 10),
+                                 pool_maxsize = getattr(current, '_pool_maxsize', 10),
+                                 pool_block = getattr(current, '_pool_block', False))
+    else:
+        adapter = CachingAdapter(cache, user, transport = current)
+    return install(session, adapter)
+
+
+# -- RDP Libraries Delivery Layer
+
+class CachedEndpoint(object):
+    '''
+    Wrap an rdp.Endpoint(session, url) object, the successful GET send_request() results are cached for the TTL of url.
+    user is the RDP login of the session, the cached results of another user are not returned.
+
+    A cached result is a ReplayEndpointResponse: is_success, status, data.raw and data.df.
+    '''
+
+    def __init__(self, endpoint, url, cache, user):
+        self.endpoint = endpoint
+        self.url = url
+        self.cache = cache
+        self.user = user
+
+    def send_request(self, method = None, query_parameters = None, body_parameters = None, **kwargs):
+        if method is not None:
+            kwargs['method'] = method
+        ttl = self.cache.ttl(self.url)
+        if ttl is None or getattr(method, 'name', method or 'GET') != 'GET':
+            return self.endpoint.send_request(query_parameters = query_parameters, body_parameters = body_parameters, **kwargs)
+
+        url = self.url
+        if query_parameters:
+            url += '?' + urlencode(query_parameters)
+        key = user_key(request_key('GET', url), self.user)
+        entry = self.cache.get(key)
+        if entry is not None and entry.expires_at > time.time():
+            _count(self.url, 'hit')
+            return ReplayEndpointResponse(entry.status_code, entry.reason, memoryview(entry.body))
+
+        _count(self.url, 'miss')
+        response = self.endpoint.send_request(query_parameters = query_parameters, body_parameters = body_parameters, **kwargs)
+        if response.is_success:
+            self.cache.put(key, 200, 'OK', {'Content-Type': 'application/json'},
+                           rdp_json_codec.dumps(response.data.raw), ttl)
+        return response
@@ -0,0 +1,224 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Rate limit aware request scheduler for the RDP APIs direct calls.
+
+The RequestScheduler object sits in front of the HTTP operations of rdp_http_client.RDPHttpClient:
+- a token bucket for every RDP service limits the requests per second,
+- the HTTP 429 (Too Many Requests) and 503 (Service Unavailable) responses are sent again after the Retry-After time, or
+  after a jittered exponential backoff if the service does not send Retry-After. Retry-After also pauses the token
+  bucket, and a random time up to backoff_base is added to it, so the throttled threads do not retry at the same
+  instant,
+- an AIMD (additive increase, multiplicative decrease) limit adjusts the number of concurrent requests from the observed
+  latency and throttling.
+
+Example:
+
+    client = RDPHttpClient(token_manager, scheduler = RequestScheduler(rates = {'/data/historical-pricing/v1': (10, 20)}))
+'''
+
+import email.utils
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+retry_status_codes = (429, 503)
+
+
+def service_name(url):
+    '''
+    Return the RDP service of a URL, the path up to the version, i.e. /data/historical-pricing/v1 for the
+    /data/historical-pricing/v1/views/events/IBM.N URL.
+    '''
+    segments = urlparse(url).path.split('/')
+    for index, segment in enumerate(segments):
+        if re.match(r'^v\d+$', segment):
+            return '/'.join(segments[:index + 1])
+    return '/'.join(segments[:4])
+
+
+def retry_after_seconds(response):
+    '''
+    Return the Retry-After header of response in seconds (delay-seconds or HTTP-date format), or None.
+    '''
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket(object):
+    '''
+    rate tokens per second, up to capacity tokens for bursts.
+    '''
+
+    def __init__(self, rate, capacity = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        Wait until one token is available and take it.
+        '''
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = max(self._paused_until - now, (1.0 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        '''
+        Give no token for seconds, i.e. the Retry-After time of a throttled request.
+        '''
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class AdaptiveConcurrencyLimit(object):
+    '''
+    AIMD limit of the concurrent requests.
+
+    Each successful request adds 1/limit (about +1 per round of requests) while its latency is below latency_tolerance
+    times the lowest observed latency. A throttled or failed request multiplies the limit by decrease_factor, a slow
+    request by the square root of decrease_factor, at most once per request latency so that one burst of slow responses
+    counts once. The latency of a failed request (an exception instead of a response) is not a response time and is not
+    used for the lowest latency.
+    '''
+
+    def __init__(self, initial_limit = 4, min_limit = 1, max_limit = 64, decrease_factor = 0.5, latency_tolerance = 2.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.min_latency = None
+        self._in_flight = 0
+        self._decreased = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency, throttled, failed = False):
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if failed:
+                throttled = True
+            else:
+                # the lowest latency drifts up slowly, so a permanent change of the network is learnt again
+                self.min_latency = latency if self.min_latency is None else min(latency, self.min_latency * 1.001)
+
+            if throttled or latency > self.min_latency * self.latency_tolerance:
+                if now - self._decreased > latency:
+                    factor = self.decrease_factor if throttled else self.decrease_factor ** 0.5
+                    self.limit = max(self.min_limit, self.limit * factor)
+                    self._decreased = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+class RequestScheduler(object):
+    '''
+    Token bucket, retry and AIMD concurrency scheduler for the RDP services.
+
+    rates is a dict of service_name() to (requests per second, burst), services not in rates use default_rate (no limit
+    if None). The request is sent at most max_retries + 1 times, the backoff without Retry-After is a random time between
+    0 and min(backoff_max, backoff_base * 2 ** attempt) seconds, with Retry-After it is Retry-After plus a random time
+    between 0 and backoff_base seconds.
+    '''
+
+    def __init__(self, rates = None, default_rate = None, max_retries = 5, backoff_base = 0.5, backoff_max = 30.0,
+                 initial_concurrency = 4, max_concurrency = 64):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._buckets = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def send(self, url, send_request):
+        '''
+        Call send_request() (returns a requests.Response) under the limits of the service of url, with retries.
+        '''
+        bucket, limit = self._service(service_name(url))
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            limit.acquire()
+            started = time.monotonic()
+            try:
+                response = send_request()
+            except Exception:
+                limit.release(time.monotonic() - started, False, failed = True)
+                raise
+            throttled = response.status_code in retry_status_codes
+            limit.release(time.monotonic() - started, throttled)
+
+            if not throttled or attempt >= self.max_retries:
+                return response
+
+            delay = retry_after_seconds(response)
+            if delay is not None:
+                if bucket is not None:
+                    bucket.pause(delay)
+                # without a bucket, the threads throttled together would all retry when Retry-After ends
+                delay += random.uniform(0, self.backoff_base)
+            else:
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def concurrency_limit(self, url):
+        return self._service(service_name(url))[1].limit
+
+    def _service(self, name):
+        with self._lock:
+            if name not in self._limits:
+                rate = self.rates.get(name, self.default_rate)
+                if rate is None:
+                    self._buckets[name] = None
+                elif isinstance(rate, (tuple, list)):
+                    self._buckets[name] = TokenBucket(*rate)
+                else:
+                    self._buckets[name] = TokenBucket(rate)
+                self._limits[name] = AdaptiveConcurrencyLimit(self.initial_concurrency, max_limit = self.max_concurrency)
+            return self._buckets[name], self._limits[name]
@@ -0,0 +1,132 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Single-flight coalescing of identical in-flight RDP APIs requests.
+
+When many threads ask for the same thing at the same time (i.e. the business summary of IBM.N), the CoalescingClient
+sends one HTTP request for the first caller and gives its response body to all the callers that arrived before it
+finished. The requests are identical when the method, URL, query parameters and body are the same. A request that
+arrives after the response is sent again, this is not a cache.
+
+Every caller decodes the shared body to its own JSON message, so a caller can modify its message. The coalescing is
+opt-in: the fetchers of this project use the RDPHttpClient directly, wrap the client in a CoalescingClient where many
+threads request the same data.
+
+Example:
+
+    coalescing_client = CoalescingClient(client)
+    summary = coalescing_client.get_business_summary('IBM.N')
+'''
+
+import json
+import threading
+
+import requests
+
+import rdp_endpoints
+import rdp_metrics
+
+
+def request_key(method, url, params = None, body = None):
+    '''
+    Return the hashable key of a request, the query parameters and the body are serialized with sorted keys.
+    '''
+    return (method.upper(), url, json.dumps(params or {}, sort_keys = True, default = str),
+            json.dumps(body, sort_keys = True, default = str) if body is not None else None)
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.callers = 1
+
+
+class SingleFlight(object):
+    '''
+    Run function() once for all threads calling do() with the same key at the same time.
+    '''
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.callers += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function()
+            except BaseException as exp:
+                # a KeyboardInterrupt or SystemExit of the leader is raised to the waiters too, they never block
+                call.error = exp
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class CoalescingClient(object):
+    '''
+    Coalesce identical concurrent requests of an rdp_http_client.RDPHttpClient. The functions return a decoded JSON
+    message for each caller and raise requests.HTTPError if the HTTP status is not 200 (OK).
+    '''
+
+    def __init__(self, client):
+        self.client = client
+        self.single_flight = SingleFlight()
+
+    def request_json(self, method, url, params = None, body = None):
+        def send():
+            response = self.client.request(method, url, params = params, body = body)
+            if response.status_code != 200:  # HTTP Status 'OK'
+                raise requests.HTTPError('%s %s' % (response.status_code, response.reason), response = response)
+            # read the body once, the callers decode it
+            response.content
+            return response
+        response = self.single_flight.do(request_key(method, url, params, body), send)
+        return rdp_metrics.decode_json(response)
+
+    def get_json(self, url, params = None):
+        return self.request_json('GET', url, params = params)
+
+    def post_json(self, url, body):
+        return self.request_json('POST', url, body = body)
+
+    # -- RDP APIs Service Endpoints
+
+    def get_historical_pricing_events(self, universe, params = None):
+        return self.get_json(rdp_endpoints.historical_pricing_events_url(universe, self.client.base_url), params)
+
+    def get_esg_scores_full(self, universe):
+        return self.get_json(rdp_endpoints.esg_scores_full_url(self.client.base_url), {'universe': universe})
+
+    def get_business_summary(self, universe):
+        return self.get_json(rdp_endpoints.business_summary_url(universe, self.client.base_url))
+
+    def post_financial_contracts(self, ipa_request_message):
+        return self.post_json(rdp_endpoints.financial_contracts_url(self.client.base_url), ipa_request_message)
@@ -0,0 +1,321 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Local RDP Access Token broker for the worker processes of one machine.
+
+The password grant of the demo applications sends takeExclusiveSignOnControl = true, so N worker processes that
+authenticate on their own sign each other out. The TokenBroker process owns the only RDPTokenManager session, keeps it
+refreshed and gives the current Access Token to the workers over a Unix domain socket. The workers use a
+BrokerTokenSource object as the token_manager of their RDPHttpClient. It keeps the token in memory until shortly before
+it expires, so get_bearer_header() costs a time check for most requests and one socket round trip otherwise.
+
+The broker saves the auth_obj to state_file (owner read/write only, 0600) after every refresh. A restarted broker uses
+the saved Access Token if it is still valid, or its refresh_token, before it sends a new password grant.
+
+The socket protocol is one text line per request and one JSON line per response:
+- TOKEN: {"access_token": ..., "expires_at": ...}
+- REFRESH <access_token>: refresh the session if access_token is still the current one (a worker got HTTP 401 with
+  it), then answer like TOKEN. The workers that send the same rejected token cause one refresh only.
+
+Run the broker in a console with:
+
+    $>python rdp_token_broker.py
+
+and in the workers:
+
+    client = RDPHttpClient(BrokerTokenSource())
+'''
+
+import argparse
+import getpass
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+import rdp_endpoints
+from rdp_token_manager import RDPTokenManager
+
+default_socket_path = os.path.join(tempfile.gettempdir(), 'rdp_token_broker_%s.sock' % getpass.getuser())
+default_state_file = os.path.join('.rdp_cache', 'token.json')
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode('utf-8').split()
+            try:
+                if command and command[0] == 'REFRESH':
+                    message = self.server.broker.refresh(command[1] if len(command) > 1 else None)
+                elif command and command[0] == 'TOKEN':
+                    message = self.server.broker.token()
+                else:
+                    message = {'error': 'Unknown command %s' % line.strip()}
+            except Exception as exp:
+                message = {'error': str(exp)}
+            self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # many workers start together, the default listen backlog of 5 refuses their connections
+    request_queue_size = 128
+
+
+class TokenBroker(object):
+    '''
+    Serve the Access Token of token_manager (an RDPTokenManager object, not opened) on socket_path.
+    '''
+
+    def __init__(self, token_manager, socket_path = default_socket_path, state_file = default_state_file, min_valid = 30):
+        self.token_manager = token_manager
+        self.socket_path = socket_path
+        self.state_file = state_file
+        # a saved Access Token with less than min_valid seconds left is refreshed before use
+        self.min_valid = min_valid
+        self._server = None
+        self._thread = None
+        self._refresh_lock = threading.Lock()
+
+    def start(self):
+        '''
+        Restore or open the RDP session and serve the socket in a background thread.
+        '''
+        self._open_session()
+        self.token_manager.add_listener(lambda auth_obj: self._save())
+        self._save()
+
+        self._remove_stale_socket()
+        # the socket is created with owner only permissions, other users cannot connect
+        umask = os.umask(0o177)
+        try:
+            self._server = _BrokerServer(self.socket_path, _BrokerRequestHandler)
+        finally:
+            os.umask(umask)
+        self._server.broker = self
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self, revoke = False):
+        '''
+        Stop serving. The saved token stays valid for the next start, unless revoke is True.
+        '''
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+        if revoke:
+            self.token_manager.close()
+            try:
+                os.remove(self.state_file)
+            except OSError:
+                pass
+        else:
+            # keep the session for the next broker
+            self.token_manager.stop_refresh()
+
+    def token(self):
+        token_manager = self.token_manager
+        return {'access_token': token_manager.access_token, 'expires_at': token_manager.expires_at}
+
+    def refresh(self, rejected_token = None):
+        with self._refresh_lock:
+            if rejected_token is None or rejected_token == self.token_manager.access_token:
+                self.token_manager.refresh()
+        return self.token()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # -- Internal functions
+
+    def _identity(self):
+        return {'username': self.token_manager.username, 'app_key': self.token_manager.app_key,
+                'auth_endpoint': self.token_manager.auth_endpoint}
+
+    def _open_session(self):
+        state = self._load()
+        if state is None:
+            self.token_manager.open()
+            return
+        expiring = state['expires_at'] - time.time() < self.min_valid
+        # an expiring token is refreshed here only, the timer of restore() would send a second refresh at once
+        self.token_manager.restore(state['auth_obj'], state['expires_at'], schedule = not expiring)
+        if expiring:
+            # refresh() falls back to the password grant if the saved refresh_token is not accepted
+            self.token_manager.refresh()
+
+    def _load(self):
+        try:
+            with open(self.state_file) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        if state.get('identity') != self._identity() or not state.get('auth_obj'):
+            return None
+        return state
+
+    def _save(self):
+        token_manager = self.token_manager
+        if token_manager.auth_obj is None:
+            return
+        state = {'identity': self._identity(), 'auth_obj': token_manager.auth_obj, 'expires_at': token_manager.expires_at}
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        # the file has the refresh_token, write it with owner only permissions and rename it
+        temporary = '%s.%d.tmp' % (self.state_file, os.getpid())
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temporary, self.state_file)
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError('A token broker is already running on %s' % self.socket_path)
+
+
+class BrokerTokenSource(object):
+    '''
+    token_manager for an RDPHttpClient in a worker process, the Access Token comes from a TokenBroker.
+
+    The token is used until margin seconds before it expires and at most max_age seconds, then it is asked again.
+    '''
+
+    def __init__(self, socket_path = default_socket_path, margin = 30, max_age = 60, timeout = 10):
+        self.socket_path = socket_path
+        self.margin = margin
+        self.max_age = max_age
+        self.timeout = timeout
+        self.expires_at = 0
+        self._bearer_header = None
+        self._access_token = None
+        self._valid_until = 0
+        self._socket = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def get_bearer_header(self):
+        '''
+        Return the current Authorization header, i.e. {'Authorization': 'Bearer <RDP Access Token>'}.
+        '''
+        if time.time() < self._valid_until:
+            return self._bearer_header
+        return self._request('TOKEN')
+
+    @property
+    def access_token(self):
+        self.get_bearer_header()
+        return self._access_token
+
+    def invalidate(self):
+        '''
+        Tell the broker that the current Access Token was rejected (HTTP 401) and get the refreshed one.
+        '''
+        return self._request('REFRESH %s' % self._access_token if self._access_token else 'REFRESH')
+
+    def close(self):
+        # the session belongs to the broker, nothing is revoked
+        with self._lock:
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # -- Internal functions
+
+    def _request(self, command):
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._socket is None:
+                        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        self._socket.settimeout(self.timeout)
+                        self._socket.connect(self.socket_path)
+                        self._reader = self._socket.makefile('rb')
+                    self._socket.sendall(command.encode('utf-8') + b'\n')
+                    line = self._reader.readline()
+                    if not line:
+                        raise ConnectionError('The token broker closed the connection')
+                    break
+                except OSError:
+                    # the broker was restarted, connect again once
+                    self._disconnect()
+                    if attempt == 2:
+                        raise
+
+            message = json.loads(line)
+            if 'error' in message:
+                raise RuntimeError('RDP token broker: %s' % message['error'])
+            if not message.get('access_token'):
+                raise RuntimeError('RDP token broker has no Access Token')
+            now = time.time()
+            self._access_token = message['access_token']
+            self.expires_at = message['expires_at']
+            self._bearer_header = {'Authorization': 'Bearer {}'.format(self._access_token)}
+            self._valid_until = min(self.expires_at - self.margin, now + self.max_age)
+            return self._bearer_header
+
+    def _disconnect(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Local RDP Access Token broker')
+    parser.add_argument('--app-key', default = os.environ.get('RDP_APP_KEY', ''))
+    parser.add_argument('--login', default = os.environ.get('RDP_LOGIN', ''))
+    parser.add_argument('--password', default = os.environ.get('RDP_PASSWORD', ''))
+    parser.add_argument('--base-url', default = rdp_endpoints.base_URL)
+    parser.add_argument('--socket', default = default_socket_path)
+    parser.add_argument('--state-file', default = default_state_file)
+    parser.add_argument('--revoke-on-exit', action = 'store_true', help = 'revoke the Access Token when the broker stops')
+    args = parser.parse_args()
+
+    token_manager = RDPTokenManager(args.app_key, args.login, args.password, base_url = args.base_url)
+    broker = TokenBroker(token_manager, args.socket, args.state_file)
+    broker.start()
+    print('RDP token broker on %s, the Access Token expires in %d seconds' % (args.socket, token_manager.expires_at - time.time()))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        broker.stop(revoke = args.revoke_on_exit)
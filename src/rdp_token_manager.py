@@ -0,0 +1,253 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+RDP Auth Service token manager for the direct call applications.
+
+The manager sends the password grant once, then keeps the Access Token valid by sending the refresh_token grant in a
+background timer before expires_in runs out. The application gets the current Authorization header with
+get_bearer_header() which never waits for the network. The close() function revokes the Access Token with the RDP Auth
+Service /revoke endpoint.
+'''
+
+import threading
+import time
+
+import requests
+
+import rdp_endpoints
+import rdp_json_codec
+
+
+class RDPTokenManager(object):
+    '''
+    Owns the RDP Auth Service auth_obj (access_token, refresh_token, expires_in) for one RDP session.
+
+    refresh_ratio is the part of expires_in after which the refresh_token grant is sent, i.e. 0.8 of a 300 seconds token
+    sends the refresh request after 240 seconds. retry_interval is the delay in seconds before a failed refresh is sent again.
+    '''
+
+    def __init__(self, app_key, username, password, scope = rdp_endpoints.scope, client_secret = rdp_endpoints.client_secret,
+                 base_url = rdp_endpoints.base_URL, take_exclusive_sign_on_control = True, refresh_ratio = 0.8,
+                 retry_interval = 5, http = None):
+        self.app_key = app_key
+        self.username = username
+        self.password = password
+        self.scope = scope
+        self.client_secret = client_secret
+        self.take_exclusive_sign_on_control = take_exclusive_sign_on_control
+        self.refresh_ratio = refresh_ratio
+        self.retry_interval = retry_interval
+
+        self.auth_endpoint = rdp_endpoints.auth_token_url(base_url)
+        self.revoke_endpoint = rdp_endpoints.auth_revoke_url(base_url)
+
+        # requests module or a requests.Session object
+        self.http = http if http is not None else requests
+
+        self.auth_obj = None
+        self.expires_at = 0
+        self._bearer_header = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._closed = False
+        # set by close(), a token received after close() is revoked at once
+        self._revoked = False
+
+    # -- Public interfaces
+
+    def open(self):
+        '''
+        Authenticate with the password grant and start the background refresh timer.
+        '''
+        with self._lock:
+            self._closed = False
+            self._revoked = False
+        self._set_auth_obj(self._request_token(self._password_grant_msg()))
+        return self.auth_obj
+
+    def restore(self, auth_obj, expires_at, schedule = True):
+        '''
+        Use a saved auth_obj that expires at expires_at (a time.time() value) instead of a password grant, and start the
+        background refresh timer. A token after its refresh time is refreshed by the timer at once. If schedule is False,
+        the timer is not started: the caller sends refresh() itself, which starts it.
+        '''
+        with self._lock:
+            self._closed = False
+            self._revoked = False
+        self._set_auth_obj(auth_obj, expires_at, schedule)
+        return self.auth_obj
+
+    def stop_refresh(self):
+        '''
+        Stop the background refresh timer, the Access Token is not revoked.
+        '''
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def close(self):
+        '''
+        Stop the background refresh timer and revoke the current Access Token. A refresh that is running is not
+        interrupted, the Access Token that it receives is revoked when it arrives.
+        '''
+        self.stop_refresh()
+        with self._lock:
+            self._revoked = True
+            auth_obj = self.auth_obj
+            self.auth_obj = None
+            self._bearer_header = None
+
+        if auth_obj is None:
+            return None
+        return self._revoke(auth_obj)
+
+    def get_bearer_header(self):
+        '''
+        Return the current Authorization header, i.e. {'Authorization': 'Bearer <RDP Access Token>'}.
+        '''
+        bearer_header = self._bearer_header
+        if bearer_header is None:
+            raise RuntimeError('RDP token manager is not opened')
+        return bearer_header
+
+    @property
+    def access_token(self):
+        auth_obj = self.auth_obj
+        return auth_obj['access_token'] if auth_obj is not None else None
+
+    def add_listener(self, callback):
+        '''
+        Register callback(auth_obj) to be called every time the manager receives a new Access Token.
+        '''
+        self._listeners.append(callback)
+
+    def refresh(self):
+        '''
+        Send the refresh_token grant now. Falls back to the password grant if there is no refresh_token or the Auth
+        Service rejects it (HTTP 400 or 401 invalid_grant), another error is raised. Return None if the manager is closed.
+        '''
+        with self._lock:
+            if self._revoked:
+                return None
+            auth_obj = self.auth_obj
+        if auth_obj is None or 'refresh_token' not in auth_obj:
+            new_auth_obj = self._request_token(self._password_grant_msg())
+        else:
+            try:
+                new_auth_obj = self._request_token(self._refresh_grant_msg(auth_obj['refresh_token']))
+            except requests.HTTPError as exp:
+                # a 5xx or 429 of a flaky Auth Service is retried by the timer, not turned into a password grant
+                if not _invalid_grant(exp.response):
+                    raise
+                new_auth_obj = self._request_token(self._password_grant_msg())
+        self._set_auth_obj(new_auth_obj)
+        return self.auth_obj
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # -- Internal functions
+
+    def _password_grant_msg(self):
+        auth_request_msg = {
+            'username': self.username,
+            'password': self.password,
+            'grant_type': 'password',
+            'scope': self.scope,
+            'takeExclusiveSignOnControl': 'true' if self.take_exclusive_sign_on_control else 'false'
+        }
+        return auth_request_msg
+
+    def _refresh_grant_msg(self, refresh_token):
+        refresh_request_msg = {
+            'username': self.username,
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token
+        }
+        return refresh_request_msg
+
+    def _request_token(self, request_msg):
+        response = self.http.post(self.auth_endpoint, headers = {'Accept':'application/json'}, data = request_msg,
+                                  auth = (self.app_key, self.client_secret))
+        response.raise_for_status()
+        return rdp_json_codec.decode_response(response)
+
+    def _revoke(self, auth_obj):
+        close_request_msg = {
+            'token': auth_obj['access_token']
+        }
+        response = self.http.post(self.revoke_endpoint, headers = {'Accept':'application/json'}, data = close_request_msg,
+                                  auth = (self.app_key, self.client_secret))
+        response.raise_for_status()
+        return response
+
+    def _set_auth_obj(self, auth_obj, expires_at = None, schedule = True):
+        expires_in = int(auth_obj['expires_in'])
+        now = time.time()
+        with self._lock:
+            revoked = self._revoked
+            if not revoked:
+                self.auth_obj = auth_obj
+                self.expires_at = expires_at if expires_at is not None else now + expires_in
+                self._bearer_header = {'Authorization': 'Bearer {}'.format(auth_obj['access_token'])}
+                # refresh after refresh_ratio of the token life time
+                if schedule:
+                    self._schedule(max(0.0, self.expires_at - expires_in * (1 - self.refresh_ratio) - now))
+
+        if revoked:
+            # the manager was closed while the token request was sent
+            self._revoke(auth_obj)
+            return
+
+        for callback in self._listeners:
+            callback(auth_obj)
+
+    def _schedule(self, delay):
+        if self._closed:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        if self._closed:
+            return
+        try:
+            self.refresh()
+        except Exception as exp:
+            print('RDP APIs: Refresh token failure: %s' % str(exp))
+            # keep the current Access Token, try again before it expires
+            with self._lock:
+                remaining = self.expires_at - time.time()
+                self._schedule(min(self.retry_interval, remaining / 2) if remaining > 1 else self.retry_interval)
+
+
+def _invalid_grant(response):
+    '''
+    Return True if a token endpoint response rejects the grant, i.e. an expired or revoked refresh_token.
+    '''
+    if response is None or response.status_code not in (400, 401):
+        return False
+    try:
+        error = rdp_json_codec.decode_response(response).get('error')
+    except (ValueError, AttributeError):
+        return False
+    return error == 'invalid_grant'
@@ -0,0 +1,421 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Record/replay transport for the RDP APIs direct calls and the RDP Libraries Delivery Layer Endpoint.
+
+RecordingAdapter is a requests transport adapter that sends the requests to RDP and saves every response to an
+ArchiveWriter file. ReplayAdapter answers the same requests from the archive without network or credentials, at an
+optional fixed rate. The archive is memory-mapped, so the response bodies stay in the OS page cache and are not copied
+into the Python heap until the application reads them (response.body_view is a zero-copy memoryview).
+
+The responses are matched by HTTP method, URL path, sorted query parameters and the request body. The host name and the
+Authorization header are ignored, so an archive recorded from api.refinitiv.com replays with any base_URL.
+
+The archive holds no credentials: the RDP Auth Service requests are matched by their path only (their form body has the
+username, password and refresh_token), and the access_token and refresh_token of the recorded token responses are
+replaced by placeholders. ReplayAdapter answers a token request that is not in the archive with a placeholder token, so
+any credentials replay the archive.
+
+Example:
+
+    writer = ArchiveWriter('rdp_responses.rdpr')
+    install(client, RecordingAdapter(writer))
+    ... run the application ...
+    writer.close()
+
+    install(client, ReplayAdapter(Archive('rdp_responses.rdpr'), rate = 1000))
+
+The requests.Session processing limits ReplayAdapter to a few thousand requests per second per thread. ReplayEndpoint
+skips requests.Session and replays tens of thousands of responses per second for load tests of the parsing code.
+'''
+
+import hashlib
+import json
+import mmap
+import struct
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import rdp_endpoints
+import rdp_json_codec
+
+archive_magic = b'RDPR1\n'
+footer_format = '<Q'
+
+# the token fields of the RDP Auth Service responses that are not saved in an archive
+redacted_token_fields = ('access_token', 'refresh_token')
+
+
+def request_key(method, url, body = None):
+    '''
+    Return the archive key of a request: 'METHOD /path?sorted query' plus a hash of the body (of the canonical JSON
+    message if the body is JSON). The key of an RDP Auth Service request is 'METHOD /path', its body has credentials.
+    '''
+    parsed = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values = True)))
+    key = '%s %s' % (method.upper(), parsed.path)
+    if _is_auth_path(parsed.path):
+        return key
+    if query:
+        key += '?' + query
+    if body:
+        try:
+            # the same JSON message has the same key whatever the codec that encoded it
+            body = json.dumps(json.loads(body), sort_keys = True, separators = (',', ':'))
+        except ValueError:
+            pass
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        key += ' ' + hashlib.sha1(body).hexdigest()
+    return key
+
+
+# -- Archive file: magic, response bodies, JSON index, index offset
+
+class ArchiveWriter(object):
+    '''
+    Append responses to an archive file. The index is written by close().
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(archive_magic)
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, status_code, reason, headers, body):
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(body)
+            self._index.setdefault(key, []).append([offset, len(body), status_code, reason, dict(headers)])
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            index_offset = self._file.tell()
+            self._file.write(json.dumps(self._index).encode('utf-8'))
+            self._file.write(struct.pack(footer_format, index_offset))
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Archive(object):
+    '''
+    Memory-mapped read only view of an archive file. A key recorded many times is replayed round-robin.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._mmap[:len(archive_magic)] != archive_magic:
+            raise ValueError('%s is not an RDP response archive' % path)
+        footer_size = struct.calcsize(footer_format)
+        index_offset = struct.unpack(footer_format, self._mmap[-footer_size:])[0]
+        self._index = json.loads(self._mmap[index_offset:-footer_size].decode('utf-8'))
+        self._positions = dict.fromkeys(self._index, 0)
+        self._lock = threading.Lock()
+
+    def keys(self):
+        return list(self._index)
+
+    def lookup(self, key):
+        '''
+        Return (status_code, reason, headers, body memoryview) of the next recorded response of key, or None.
+        '''
+        entries = self._index.get(key)
+        if not entries:
+            return None
+        with self._lock:
+            position = self._positions[key]
+            self._positions[key] = (position + 1) % len(entries)
+        offset, length, status_code, reason, headers = entries[position]
+        return status_code, reason, headers, self._view[offset:offset + length]
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+# -- requests transport adapters
+
+class RecordingAdapter(HTTPAdapter):
+    '''
+    Send the requests to the network and save the responses to an ArchiveWriter, the tokens of the RDP Auth Service
+    responses are redacted.
+    '''
+
+    def __init__(self, writer, **kwargs):
+        HTTPAdapter.__init__(self, **kwargs)
+        self.writer = writer
+
+    def send(self, request, **kwargs):
+        response = HTTPAdapter.send(self, request, **kwargs)
+        body = response.content
+        if _is_auth_path(urlparse(request.url).path):
+            body = _redacted_token_body(body)
+        self.writer.add(request_key(request.method, request.url, request.body), response.status_code, response.reason,
+                        _recorded_headers(response.headers), body)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    '''
+    Answer the requests from an Archive. If rate is set, the responses are paced to `rate` responses per second over all
+    threads. A request that is not in the archive raises requests.ConnectionError, except the RDP Auth Service requests
+    that get a placeholder token.
+    '''
+
+    def __init__(self, archive, rate = None):
+        BaseAdapter.__init__(self)
+        self.archive = archive
+        self.rate = rate
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None, proxies = None):
+        self._pace()
+        recorded = self.archive.lookup(request_key(request.method, request.url, request.body))
+        if recorded is None and _is_auth_path(urlparse(request.url).path):
+            recorded = _placeholder_auth_response(request.url)
+        if recorded is None:
+            raise requests.ConnectionError('No recorded response for %s %s' % (request.method, request.url), request = request)
+        status_code, reason, headers, body = recorded
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = _MemoryViewReader(body)
+        response.body_view = body
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+    def _pace(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            start_time = max(now, self._next_time)
+            self._next_time = start_time + 1.0 / self.rate
+        if start_time > now:
+            time.sleep(start_time - now)
+
+
+class _MemoryViewReader(object):
+    '''
+    File-like object over a memoryview for requests.Response.raw.
+    '''
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def read(self, size = -1, **kwargs):
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        data = self._view[self._position:end].tobytes()
+        self._position = end
+        return data
+
+    def stream(self, chunk_size = 65536, decode_content = True):
+        while self._position < len(self._view):
+            yield self.read(chunk_size)
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+def _recorded_headers(headers):
+    # the body is saved decoded, the transfer headers do not apply to it anymore
+    return {name: value for name, value in headers.items()
+            if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')}
+
+
+def _is_auth_path(path):
+    return path.startswith(rdp_endpoints.auth_category_URL + '/')
+
+
+def _redacted_token_body(body):
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(message, dict):
+        return body
+    for field in redacted_token_fields:
+        if field in message:
+            message[field] = 'replay_%s' % field
+    return json.dumps(message).encode('utf-8')
+
+
+def _placeholder_auth_response(url):
+    if not urlparse(url).path.endswith('/token'):
+        # revoke
+        return 200, 'OK', {}, memoryview(b'')
+    message = {'access_token': 'replay_access_token', 'refresh_token': 'replay_refresh_token', 'expires_in': '300',
+               'scope': rdp_endpoints.scope, 'token_type': 'Bearer'}
+    return 200, 'OK', {'Content-Type': 'application/json'}, memoryview(json.dumps(message).encode('utf-8'))
+
+
+def install(client, adapter):
+    '''
+    Mount adapter for all http:// and https:// URLs of an RDPHttpClient or a requests.Session object.
+
+    Only the requests HTTPAdapter of the session is replaced. Another mounted adapter (i.e. a RecordingAdapter or an
+    rdp_metrics InstrumentedAdapter) raises ValueError instead of being replaced silently.
+    '''
+    session = getattr(client, 'session', client)
+    current = session.get_adapter('https://')
+    # an adapter that wraps the mounted adapter (rdp_response_cache.CachingAdapter transport) replaces it
+    if current is not adapter and current is not getattr(adapter, 'transport', None) and type(current) is not HTTPAdapter:
+        raise ValueError('%s is already mounted, %s cannot replace it' % (type(current).__name__, type(adapter).__name__))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
+
+
+def install_transport(client, adapter):
+    '''
+    Mount adapter as the network transport of an RDPHttpClient or a requests.Session object. If an
+    rdp_response_cache.CachingAdapter is mounted, adapter becomes its transport and the cache keeps answering first,
+    else adapter is mounted with install().
+    '''
+    session = getattr(client, 'session', client)
+    current = session.get_adapter('https://')
+    if getattr(current, 'transport', False) is None:
+        current.transport = adapter
+        return adapter
+    return install(session, adapter)
+
+
+# -- RDP Libraries Delivery Layer
+
+class RecordingEndpoint(object):
+    '''
+    Wrap an rdp.Endpoint object and save the response.data.raw messages of send_request() to an ArchiveWriter.
+    '''
+
+    def __init__(self, endpoint, url, writer):
+        self.endpoint = endpoint
+        self.url = url
+        self.writer = writer
+
+    def send_request(self, method = None, query_parameters = None, body_parameters = None, **kwargs):
+        if method is not None:
+            kwargs['method'] = method
+        response = self.endpoint.send_request(query_parameters = query_parameters, body_parameters = body_parameters, **kwargs)
+        method_name = _method_name(method)
+        body = json.dumps(body_parameters) if body_parameters is not None else None
+        self.writer.add(request_key(method_name, _url_with_query(self.url, query_parameters), body),
+                        200 if response.is_success else 500, 'OK' if response.is_success else 'Error',
+                        {'Content-Type': 'application/json'}, rdp_json_codec.dumps(response.data.raw))
+        return response
+
+
+class ReplayEndpoint(object):
+    '''
+    Drop-in replacement of rdp.Endpoint(session, url) that answers send_request() from an Archive. It looks the
+    responses up directly without a requests.Session, for the highest replay rate.
+    '''
+
+    def __init__(self, archive, url, rate = None):
+        self.archive = archive
+        self.url = url
+        self._adapter = ReplayAdapter(archive, rate)
+
+    def send_request(self, method = None, query_parameters = None, body_parameters = None, **kwargs):
+        url = _url_with_query(self.url, query_parameters)
+        body = json.dumps(body_parameters) if body_parameters is not None else None
+        self._adapter._pace()
+        recorded = self.archive.lookup(request_key(_method_name(method), url, body))
+        if recorded is None:
+            raise requests.ConnectionError('No recorded response for %s' % url)
+        status_code, reason, _, body_view = recorded
+        return ReplayEndpointResponse(status_code, reason, body_view)
+
+
+class ReplayEndpointResponse(object):
+    '''
+    The subset of the rdp.Endpoint response interface used by the demo applications: is_success, status, data.raw and
+    data.df.
+    '''
+
+    class Data(object):
+        def __init__(self, body_view):
+            self.body_view = body_view
+            self._raw = None
+
+        @property
+        def raw(self):
+            if self._raw is None:
+                self._raw = rdp_json_codec.loads(self.body_view)
+            return self._raw
+
+        @property
+        def df(self):
+            '''
+            pandas DataFrame of the headers/data message (the first element of a Historical Pricing response), None if
+            the message has no headers and data.
+            '''
+            import pandas as pd
+
+            message = self.raw
+            if isinstance(message, list):
+                message = message[0] if message else None
+            if not isinstance(message, dict):
+                return None
+            headers = message.get('headers', message.get('Headers'))
+            data = message.get('data', message.get('Data'))
+            if headers is None or data is None:
+                return None
+            return pd.DataFrame(data, columns = [header['name'] if isinstance(header, dict) else header for header in headers])
+
+    def __init__(self, status_code, reason, body_view):
+        self.is_success = status_code == 200
+        self.status = {'http_status_code': status_code, 'http_reason': reason}
+        self.data = ReplayEndpointResponse.Data(body_view)
+
+
+def _method_name(method):
+    if method is None:
+        return 'GET'
+    return getattr(method, 'name', str(method)).upper()
+
+
+def _url_with_query(url, query_parameters):
+    if not query_parameters:
+        return url
+    return url + '?' + urlencode(query_parameters)
@@ -0,0 +1,312 @@
+# |-----------------------------------------------------------------------------
+# |            This source code is provided under the Apache 2.0 license      --
+# |  and is provided AS IS with no warranty or guarantee of fit for purpose.  --
+# |                See the project's LICENSE.md for details.                  --
+# |           Copyright Refinitiv 2020. All rights reserved.                  --
+# |-----------------------------------------------------------------------------
+
+# |-----------------------------------------------------------------------------
+# |   Refinitiv Data Platform APIs direct call vs RDP ease-of-use libraries   --
+# |-----------------------------------------------------------------------------
+
+'''
+Content addressed cache of the IPA /financial-contracts valuations.
+
+A contract with a fixed pricingParameters.valuationDate always gets the same valuation, i.e. the EURGBP FX Forward of
+ipa_request_message. The ValuationCache keeps the output fields of every priced contract under the SHA-256 hash of its
+canonical JSON form: instrumentType, instrumentDefinition (without the instrumentTag label), pricingParameters and the
+requested fields. The same contract in another batch, or with another instrumentTag, is answered from the cache, so a
+repeated revaluation only sends the new contracts to /financial-contracts.
+
+A contract without valuationDate is priced on the current market data and is never cached. The rows with an error code
+or message are not cached either.
+
+- FinancialContractsPricer(client, cache = ValuationCache()) in rdp_ipa uses the cache for the direct calls.
+- price_request_message() takes any send function, i.e. the RDP Libraries rdp.Endpoint POST request.
+
+The rdp_valuation_cache_total counter of rdp_metrics counts the hit and miss results.
+
+Example:
+
+    cache = ValuationCache()
+    message = price_request_message(ipa_request_message, lambda message: endpoint.send_request(
+        method = rdp.Endpoint.RequestMethod.POST, body_parameters = message).data.raw, cache)
+'''
+
+import hashlib
+import json
+import copy
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+import rdp_metrics
+
+default_cache_dir = os.path.join('.rdp_cache', 'valuations')
+
+# the fields that identify a row and are not a part of the valuation
+label_fields = ('InstrumentTag',)
+
+# the fields of a failed valuation
+error_fields = ('ErrorCode', 'ErrorMessage')
+
+
+def cacheable(contract):
+    '''
+    Return True if the valuation of contract is deterministic, i.e. it has a pricingParameters.valuationDate.
+    '''
+    return bool((contract.get('pricingParameters') or {}).get('valuationDate'))
+
+
+def contract_key(contract, fields):
+    '''
+    Return the SHA-256 hex digest of the canonical JSON of contract and the requested fields.
+    '''
+    definition = dict(contract.get('instrumentDefinition') or {})
+    definition.pop('instrumentTag', None)
+    canonical = {
+        'instrumentType': contract.get('instrumentType'),
+        'instrumentDefinition': definition,
+        'pricingParameters': contract.get('pricingParameters') or {},
+        'fields': sorted(set(fields) - set(label_fields))
+    }
+    text = json.dumps(canonical, sort_keys = True, separators = (',', ':'), ensure_ascii = False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def valuation_values(values):
+    '''
+    Return the cacheable {field: value} of a priced row dict, or None if the row is an error. A row without any
+    valuation value is an error too, i.e. if ErrorCode and ErrorMessage are not among the requested fields.
+    '''
+    if any(values.get(field) for field in error_fields):
+        return None
+    values = {field: value for field, value in values.items() if field not in label_fields and field not in error_fields}
+    if all(value is None for value in values.values()):
+        return None
+    return values
+
+
+class ValuationCache(object):
+    '''
+    Memory (LRU, max_entries) and disk (LRU by file time, max_files) cache of {field: value} valuations by contract key.
+    If cache_dir is None, the valuations are kept in memory only. ttl (seconds) limits the age of a valuation, None
+    keeps it until it is evicted.
+    '''
+
+    def __init__(self, cache_dir = default_cache_dir, max_entries = 10000, max_files = 100000, ttl = None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        Return the {field: value} valuation of key, or None.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None or (self.ttl is not None and time.time() - entry['created'] > self.ttl):
+            _count('miss')
+            return None
+        _count('hit')
+        return dict(entry['values'])
+
+    def put(self, key, values):
+        self.put_many({key: values})
+
+    def put_many(self, valuations):
+        '''
+        Store {key: {field: value}} valuations, the disk is evicted once for all of them.
+        '''
+        if not valuations:
+            return
+        now = time.time()
+        for key, values in valuations.items():
+            entry = {'key': key, 'created': now, 'values': values}
+            self._remember(key, entry)
+            self._write(key, entry)
+        self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for file_name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, file_name))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    # -- Disk storage: <key>.json
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _read(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        now = time.time()
+        os.utime(path, (now, now))
+        return entry
+
+    def _write(self, key, entry):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok = True)
+        # write and rename, so a concurrent reader never sees a half written file. Another process can write the same key
+        path = self._path(key)
+        temporary = path + '.%d.%d.tmp' % (os.getpid(), threading.get_ident())
+        with open(temporary, 'w') as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temporary, path)
+
+    def _evict(self):
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        file_names = [file_name for file_name in os.listdir(self.cache_dir) if file_name.endswith('.json')]
+        if len(file_names) <= self.max_files:
+            return
+        files = sorted((os.stat(os.path.join(self.cache_dir, file_name)).st_mtime, file_name) for file_name in file_names)
+        for _, file_name in files[:len(files) - self.max_files]:
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except OSError:
+                pass
+
+
+def _count(result):
+    rdp_metrics.registry.increment('rdp_valuation_cache_total', {'endpoint': 'financial-contracts', 'result': result})
+
+
+def price_request_message(ipa_request_message, send, cache):
+    '''
+    Price an ipa_request_message with the cache: send(message) gets the response message (headers and data) of a request
+    message with the contracts that are not cached (and only one of the identical contracts), then the response rows are
+    merged with the cached valuations in the ipa_request_message universe order. Return a message with the headers and
+    data of all contracts.
+
+    The response rows are matched with the contracts by InstrumentTag if it is one of the fields and the response has
+    the tags, else by position. The sent contracts without an instrumentTag, or with the tag of another sent contract,
+    get the tag 'contract_<position>' as in rdp_ipa.FinancialContractsPricer, the returned rows have the tags of
+    ipa_request_message. A response row that matches no contract, and a contract without a response row, raise a
+    RuntimeWarning and the contract has no row.
+    '''
+    fields = list(ipa_request_message.get('fields') or [])
+    contracts = ipa_request_message.get('universe', [])
+
+    rows = [None] * len(contracts)
+    keys = {}
+    sent = []
+    duplicates = {}
+    first_of_key = {}
+    for position, contract in enumerate(contracts):
+        if not cacheable(contract):
+            sent.append(position)
+            continue
+        key = keys[position] = contract_key(contract, fields)
+        if key in first_of_key:
+            duplicates[position] = first_of_key[key]
+            continue
+        values = cache.get(key)
+        if values is not None:
+            rows[position] = values
+            continue
+        first_of_key[key] = position
+        sent.append(position)
+
+    headers = [{'name': field} for field in fields]
+    if sent:
+        tags = _sent_tags(contracts, sent)
+        message = dict(ipa_request_message, universe = [_tagged(contracts[position], tag) for tag, position in tags.items()])
+        response_message = send(message)
+        headers = response_message.get('headers', response_message.get('Headers', headers))
+        names = [header['name'] if isinstance(header, dict) else header for header in headers]
+        data = response_message.get('data', response_message.get('Data', []))
+        tag_index = names.index('InstrumentTag') if 'InstrumentTag' in names else None
+        # a service that does not echo the tags (null or '') is matched by position
+        if tag_index is not None and any(row[tag_index] for row in data):
+            matched = [(tags.get(row[tag_index]), row) for row in data]
+        else:
+            matched = list(zip(sent, data))
+            matched += [(None, row) for row in data[len(sent):]]
+
+        unmatched = [row for position, row in matched if position is None]
+        if unmatched:
+            warnings.warn('%d IPA response rows match no contract, i.e. %s' % (len(unmatched), unmatched[0]),
+                          RuntimeWarning, stacklevel = 2)
+        returned = set(position for position, row in matched)
+        missing = [position for position in sent if position not in returned]
+        if missing:
+            warnings.warn('No IPA response row for the contracts at the positions %s' % ', '.join(map(str, missing)),
+                          RuntimeWarning, stacklevel = 2)
+
+        valuations = {}
+        for position, row in matched:
+            if position is None:
+                continue
+            values = dict(zip(names, row))
+            rows[position] = values
+            cached_values = valuation_values(values) if position in keys else None
+            if cached_values is not None:
+                valuations[keys[position]] = cached_values
+        cache.put_many(valuations)
+
+    for position, first in duplicates.items():
+        rows[position] = rows[first]
+
+    names = [header['name'] if isinstance(header, dict) else header for header in headers]
+    data = []
+    for contract, values in zip(contracts, rows):
+        if values is None:
+            continue
+        values = dict(values)
+        if 'InstrumentTag' in names:
+            values['InstrumentTag'] = (contract.get('instrumentDefinition') or {}).get('instrumentTag')
+        data.append([values.get(name) for name in names])
+    return {'headers': headers, 'data': data}
+
+
+def _sent_tags(contracts, sent):
+    # {distinct tag: position} of the sent contracts, the same tags as rdp_ipa.FinancialContractsPricer._tag_contracts
+    tags = OrderedDict()
+    used = set((contracts[position].get('instrumentDefinition') or {}).get('instrumentTag') for position in sent)
+    for position in sent:
+        tag = (contracts[position].get('instrumentDefinition') or {}).get('instrumentTag')
+        if not tag or tag in tags:
+            tag = 'contract_%d' % position
+            while tag in used:
+                tag += '_'
+            used.add(tag)
+        tags[tag] = position
+    return tags
+
+
+def _tagged(contract, tag):
+    if (contract.get('instrumentDefinition') or {}).get('instrumentTag') == tag:
+        return contract
+    contract = copy.deepcopy(contract)
+    contract['instrumentDefinition'] = dict(contract.get('instrumentDefinition') or {}, instrumentTag = tag)
+    return contract